@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: batch plots of longitude vs elevation transects. A transect file
+         (see Transect_Output.py) is read column-wise in one go, and one
+         figure is built once per worker process: its axes, legend, lines and
+         annotations are created for the first transect, and every further
+         transect only swaps the line data (set_data), the title and the
+         y limits before the figure is saved. The figures are drawn with the
+         Agg canvas, so no display is needed, and the latitudes are split
+         into batches rendered by parallel worker processes.
+
+         The location annotations (towns, borders) come from a csv file:
+
+             kind,longitude,text,position,linestyle,latitude
+             line,-114.66,BC/AB border,,-.,50.12    a dashed vertical line
+             text,-114.60,AB->,top,,50.12           a label (top or bottom)
+
+         An annotation is drawn on the transects within LAT_TOLERANCE of its
+         latitude, or on every transect when the latitude is left blank.
+
+         usage: python Batch_Plots.py TRANSECT_FILE OUT_PATTERN
+                       [--annotations FILE] [--grids 4,9,12] [--workers N]
+         e.g.   python Batch_Plots.py cases.npz 'Elevation_%.2fN.png'
+
+Created on Sun Oct 18 12:35:07 2026
+"""
+
+import csv
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from Transect_Output import readTransects
+
+RAW_STYLE = 'b'
+GRID_STYLES = {'0.444': 'g', '1.333': 'c', '4': 'r', '9': 'c', '12': 'm',
+               '27': 'y', '36': 'k', '108': 'g'}
+GRIDS = ('4', '9', '12', '27', '36', '108')   # grids plotted by default
+TITLE = 'British Columbia %.2f$^\\circ$N Terrain Elevation'
+FIGSIZE = (16, 4)
+ANNOTATION_Y = {'top': 0.93, 'bottom': 0.02}  # label heights (axes fraction)
+LAT_TOLERANCE = 0.05                          # degrees
+
+
+# This function reads the location annotations of a case study
+# Inputs: file_path (str), the annotation csv file
+# Output: a list of dicts, one per row, with longitude and latitude (None
+#         when blank) as floats
+def readAnnotations(file_path):
+    with open(file_path, newline='') as csv_file:
+        rows = list(csv.DictReader(csv_file))
+    for row in rows:
+        row['longitude'] = float(row['longitude'])
+        row['latitude'] = float(row['latitude']) if row['latitude'] else None
+    return rows
+
+
+class TransectFigure:
+    """One Agg figure reused to plot transect after transect."""
+
+    # Inputs: longitudes, the longitudes shared by all the transects
+    #         grids, the grid sizes (str, km) to plot
+    #         annotations, the list returned by readAnnotations
+    #         ylim, fixed (bottom, top) elevation limits, or None to fit
+    #               each transect
+    def __init__(self, longitudes, grids=GRIDS, annotations=(), ylim=None,
+                 figsize=FIGSIZE):
+        self.figure = Figure(figsize=figsize)
+        FigureCanvasAgg(self.figure)
+        self.ax = ax = self.figure.add_subplot()
+        self.grids = list(grids)
+        self.ylim = ylim
+        nan = np.full(len(longitudes), np.nan)
+        self.raw_line, = ax.plot(longitudes, nan, RAW_STYLE,
+                                 label='Topo_30s Raw Data')
+        self.grid_lines = [ax.plot(longitudes, nan, GRID_STYLES.get(size, ''),
+                                   label='WPS Smoothed (%s km grid size)'
+                                   % size)[0] for size in self.grids]
+
+        # lines span the axes and labels sit at a fixed fraction of its
+        # height, so they follow the y limits of every transect
+        self.annotations = []
+        for a in annotations:
+            if a['kind'] == 'line':
+                artist = ax.axvline(a['longitude'], color='k',
+                                    linestyle=a['linestyle'] or '--')
+            else:
+                artist = ax.text(a['longitude'], ANNOTATION_Y[a['position']],
+                                 a['text'], fontsize=10,
+                                 transform=ax.get_xaxis_transform())
+            self.annotations.append((artist, a['latitude']))
+
+        legend = ax.legend(loc='upper left', shadow=False)
+        legend.get_frame().set_facecolor('0.90')
+        ax.set_xlim(longitudes[0], longitudes[-1])
+        ax.set_xlabel('Longitude ($^\\circ$)')
+        ax.set_ylabel('Terrain Elevation (m)')
+        ax.grid()
+        self.title = ax.set_title('')
+
+    # This method puts one transect on the figure
+    # Inputs: transects, the transects dict
+    #         k (int), the index of the transect (latitude)
+    def update(self, transects, k):
+        latitude = transects['latitude'][k]
+        raw = transects['raw'][k]
+        self.raw_line.set_ydata(raw)
+        sizes = list(transects['grid_size'])
+        heights = [transects['interp'][k, sizes.index(size)]
+                   for size in self.grids]
+        for line, h in zip(self.grid_lines, heights):
+            line.set_ydata(h)
+        for artist, lat in self.annotations:
+            artist.set_visible(lat is None
+                               or abs(lat - latitude) <= LAT_TOLERANCE)
+        self.title.set_text(TITLE % latitude)
+        if self.ylim is not None:
+            self.ax.set_ylim(self.ylim)
+        else:
+            top = np.nanmax([np.nanmax(raw)] + [np.nanmax(h) for h in heights])
+            self.ax.set_ylim(min(0.0, np.nanmin(raw)), 1.1 * max(top, 1.0))
+
+    # This method saves the figure (the format follows the file extension)
+    def save(self, file_path):
+        self.figure.savefig(file_path)
+
+
+# This function plots a set of transects with one reused figure
+# Inputs: transects, the transects dict
+#         out_pattern (str), the output file name with a %-format for the
+#                            latitude, e.g. 'Elevation_%.2fN.pdf'
+#         indices, the transects to plot (default: all)
+#         grids, annotations, ylim, as for TransectFigure
+# Output: the list of the files written
+def renderTransects(transects, out_pattern, indices=None, grids=GRIDS,
+                    annotations=(), ylim=None):
+    if indices is None:
+        indices = range(len(transects['latitude']))
+    fig = TransectFigure(transects['longitude'], grids, annotations, ylim)
+    paths = []
+    for k in indices:
+        fig.update(transects, k)
+        paths.append(out_pattern % transects['latitude'][k])
+        fig.save(paths[-1])
+    return paths
+
+
+# every worker reads the file itself, so only the indices are sent to it
+def _workerRender(file_path, out_pattern, indices, grids, annotation_file,
+                  ylim):
+    annotations = readAnnotations(annotation_file) if annotation_file else ()
+    return renderTransects(readTransects(file_path), out_pattern, indices,
+                           grids, annotations, ylim)
+
+
+# This function plots every transect of a file, in batches rendered by
+# parallel worker processes (one figure per worker)
+# Inputs: file_path (str), the transect file
+#         out_pattern (str), as for renderTransects
+#         grids, ylim, as for TransectFigure
+#         annotation_file (str), the annotation csv file, or None
+#         workers (int), number of worker processes (1 renders in this
+#                        process, None uses one per CPU)
+# Output: the list of the files written, in the order of the transects
+def renderFile(file_path, out_pattern, grids=GRIDS, annotation_file=None,
+               ylim=None, workers=None):
+    n_lat = len(readTransects(file_path)['latitude'])
+    workers = min(workers or os.cpu_count(), n_lat)
+    if workers == 1:
+        return _workerRender(file_path, out_pattern, None, grids,
+                             annotation_file, ylim)
+    # one contiguous batch per worker keeps the per-figure setup to one
+    # per process
+    batches = np.array_split(np.arange(n_lat), workers)
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context(
+                                 'spawn')) as pool:
+        results = [pool.submit(_workerRender, file_path, out_pattern,
+                               batch.tolist(), grids, annotation_file, ylim)
+                   for batch in batches]
+        return [path for r in results for path in r.result()]
+
+
+"""
+START OF PROGRAM
+"""
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    options = {'--annotations': None, '--grids': ','.join(GRIDS),
+               '--workers': None}
+    for flag in options:
+        if flag in args:
+            k = args.index(flag)
+            options[flag] = args[k + 1]
+            del args[k:k + 2]
+    file_path, out_pattern = args
+    workers = int(options['--workers']) if options['--workers'] else None
+
+    paths = renderFile(file_path, out_pattern,
+                       options['--grids'].split(','),
+                       options['--annotations'], workers=workers)
+    print('Wrote %d figures' % len(paths))
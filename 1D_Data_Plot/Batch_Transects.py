@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: batch extraction of constant-latitude transects. The tiles and the
+         geo_em grids are loaded once, the raw heights of every latitude are
+         read in one mosaic access, and the interpolation of the geo_em
+         grids onto each latitude line is spread over a process pool.
+         The geo_em files are loaded concurrently in spawned worker
+         processes (netCDF4 reads take turns within one process, since
+         HDF5 is not thread safe). For a single line each grid is loaded and
+         interpolated in its own worker process, so the parent never holds
+         the grids and the run takes about as long as the largest grid
+         alone.
+
+Created on Sun Oct 18 15:00:00 2026
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from netCDF4 import Dataset
+from wrf import to_np, getvar, latlon_coords
+from Tile_Index import latToRow, lonToCol
+from Interp_Cache import InterpCache, fileHash, mergeLatsLons
+from Lambert_Grid import LambertGrid, LAMBERT, interpolateGrid
+from Dtype_Policy import valueArray
+from Pipeline_Timer import timer
+
+_worker = dict()    # grids and settings of a pool worker process
+_netcdf_lock = threading.Lock() # the HDF5 library under netCDF4 is not thread safe
+
+
+# This function parses the latitudes given on the command line
+# Inputs: arg (str), a single latitude ('56.167'), a comma separated list
+#         ('49.5,50.12,53.92') or a range 'start:stop:step' that includes
+#         stop ('45:55:0.5')
+# Output: a 1D array of latitudes
+def parseLatitudes(arg):
+    if ':' in arg:
+        start, stop, step = [float(x) for x in arg.split(':')]
+        return np.arange(start, stop + step / 2.0, step)
+    return np.array([float(x) for x in arg.split(',')])
+
+
+# This function reads the terrain height and coordinates of a geo_em file
+# Inputs: file_path (str), the path of the geo_em netCDF file
+# Output: a dict holding the file name ('name'), the content hash of the
+#         file ('key'), the (lat, lon) grid points ('points'), the
+#         flattened terrain height ('elev') and the LambertGrid of the grid
+#         ('projection', None for other map projections)
+def loadGeoEm(file_path):
+    name = os.path.basename(file_path)
+    with timer.stage('geo_em load [%s]' % name):
+        # threads of one process may hash concurrently; their netCDF reads
+        # take turns
+        key = fileHash(file_path)
+        with _netcdf_lock:
+            nc = Dataset(file_path, 'r')
+            try:
+                hgt = getvar(nc, 'ter')  # Model terrain height (from wrf-python)
+                lats, lons = latlon_coords(hgt, as_np=True)
+                elev = valueArray(to_np(hgt)).ravel()
+                projection = LambertGrid.fromGeoEm(nc) \
+                    if int(nc.MAP_PROJ) == LAMBERT else None
+            finally:
+                nc.close()
+    with timer.stage('mergeLatsLons [%s]' % name):
+        points = mergeLatsLons(lats, lons)
+    return {'name': name, 'key': key, 'points': points, 'elev': elev,
+            'projection': projection}
+
+
+# a loader worker returns the grid and its stage records
+def _workerLoad(file_path):
+    timer.stages = dict()
+    return loadGeoEm(file_path), timer.stages
+
+
+# This function loads several geo_em files concurrently, each in a worker
+# process (threads would only take turns on the netCDF reads)
+# Inputs: file_paths, a list of paths of geo_em netCDF files
+#         workers (int), the number of loader processes (1 loads in this
+#                        process, None uses one per file, up to one per CPU)
+# Output: the list of grids returned by loadGeoEm, in the order of file_paths
+def loadGeoEmFiles(file_paths, workers=None):
+    if workers == 1 or len(file_paths) < 2:
+        return [loadGeoEm(path) for path in file_paths]
+
+    workers = workers or min(len(file_paths), os.cpu_count())
+    grids = []
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context(
+                                 'spawn')) as pool:
+        for grid, stages in pool.map(_workerLoad, file_paths):
+            grids.append(grid)
+            timer.merge(stages)
+    return grids
+
+
+# This function interpolates every grid onto one latitude line
+# Inputs: grids, the list of grids returned by loadGeoEm
+#         latitude (float), the latitude of the line
+#         lons, a 1D array of the longitudes of the line
+#         method (str), 'nearest', 'linear', 'cubic', 'bilinear' or
+#                       'bicubic' (see Lambert_Grid.py)
+#         cache, the InterpCache holding the grid triangulations
+# Output: a 2D array of heights, one row per grid
+def interpolateLatitude(grids, latitude, lons, method, cache):
+    plot_pts = np.column_stack([np.full(len(lons), latitude), lons])
+    interpElev = []
+    for g in grids:
+        with timer.stage('interpolation [%s]' % g['name']):
+            interpElev.append(interpolateGrid(cache, g, plot_pts, method))
+    return np.array(interpElev)
+
+
+def _initWorker(grids, lons, method, cache_dir):
+    _worker.update(grids=grids, lons=lons, method=method,
+                   cache=InterpCache(cache_dir))
+
+# a worker returns the stage records of each latitude along with the heights,
+# so the parent can report where the time went
+def _workerLatitude(latitude):
+    timer.stages = dict()
+    interpElev = interpolateLatitude(_worker['grids'], latitude,
+                                     _worker['lons'], _worker['method'],
+                                     _worker['cache'])
+    return interpElev, timer.stages
+
+
+# a worker loads and interpolates one whole grid, and returns its stage
+# records too
+def _workerFile(file_path, plot_pts, method, cache_dir):
+    timer.stages = dict()
+    grid = loadGeoEm(file_path)
+    with timer.stage('interpolation [%s]' % grid['name']):
+        heights = interpolateGrid(InterpCache(cache_dir), grid, plot_pts,
+                                  method)
+    return heights, timer.stages
+
+
+# This function loads geo_em files and interpolates each of them onto the
+# same points. Every worker process loads its own file, so only the paths
+# are sent to the workers and only the heights come back; the grids are
+# never held in this process.
+# Inputs: file_paths, a list of paths of geo_em netCDF files
+#         plot_pts, the (lat, lon) coordinates of the points
+#         method (str), 'nearest', 'linear', 'cubic', 'bilinear' or
+#                       'bicubic' (see Lambert_Grid.py)
+#         workers (int), number of worker processes (1 runs in this process,
+#                        None uses one per file, up to one per CPU)
+#         cache_dir (str), the directory of the interpolation cache
+# Output: a 2D array of heights, one row per file
+def interpolateGeoEmFiles(file_paths, plot_pts, method, workers=None,
+                          cache_dir='interp_cache'):
+    if workers == 1:
+        cache = InterpCache(cache_dir)
+        interpElev = []
+        for path in file_paths:
+            grid = loadGeoEm(path)
+            with timer.stage('interpolation [%s]' % grid['name']):
+                interpElev.append(interpolateGrid(cache, grid, plot_pts,
+                                                  method))
+            timer.log('Interpolated', grid['name'])
+        return np.array(interpElev)
+
+    # the workers are spawned, not forked, so none of them inherits the
+    # netCDF / HDF5 state (or a lock held by another thread) of this process
+    workers = workers or min(len(file_paths), os.cpu_count())
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context(
+                                 'spawn')) as pool:
+        interpolating = [pool.submit(_workerFile, path, plot_pts, method,
+                                     cache_dir) for path in file_paths]
+        interpElev = []
+        for path, result in zip(file_paths, interpolating):
+            heights, stages = result.result()
+            interpElev.append(heights)
+            timer.merge(stages)
+            timer.log('Interpolated', os.path.basename(path))
+    return np.array(interpElev)
+
+
+# This function extracts the raw and interpolated heights along many latitudes
+# Inputs: tiles, the TileIndex of the topo_30s tiles
+#         grids, the list of grids returned by loadGeoEm
+#         latitudes, a 1D array of latitudes
+#         x0, xN, the longitudes to start and end at
+#         method (str), 'nearest', 'linear', 'cubic', 'bilinear' or
+#                       'bicubic' (see Lambert_Grid.py)
+#         workers (int), number of worker processes (1 runs in this process,
+#                        None uses one per CPU)
+#         cache_dir (str), the directory of the interpolation cache
+# Outputs: lons, a 1D array of the longitudes of the raw data points
+#          rawElev, a 2D array of raw heights (latitude, longitude)
+#          interpElev, a 3D array of interpolated heights
+#                      (latitude, grid, longitude)
+def extractTransects(tiles, grids, latitudes, x0, xN, method,
+                     workers=None, cache_dir='interp_cache'):
+    with timer.stage('tile read'):
+        window = tiles.window(min(latitudes), max(latitudes), x0, xN)
+        rows = np.array([latToRow(lat) for lat in latitudes])
+        cols = np.arange(window.col0, window.col1)
+        rawElev = window.readPoints(rows, cols)
+    lons = x0 + (cols - lonToCol(x0)) * (10.0 / 1200.0)
+
+    cache = InterpCache(cache_dir)
+    if workers == 1:
+        interpElev = []
+        for lat in latitudes:
+            interpElev.append(interpolateLatitude(grids, lat, lons, method,
+                                                  cache))
+            timer.log('Interpolated latitude', lat)
+        return lons, rawElev, np.array(interpElev)
+
+    # build the triangulations once here, not once in every worker (the
+    # projection methods need none)
+    if method in ('linear', 'cubic'):
+        for g in grids:
+            with timer.stage('triangulation [%s]' % g['name']):
+                cache.triangulation(g['key'], g['points'])
+    interpElev = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                             initializer=_initWorker,
+                             initargs=(grids, lons, method,
+                                       cache_dir)) as pool:
+        for lat, (heights, stages) in zip(latitudes,
+                                          pool.map(_workerLatitude,
+                                                   latitudes)):
+            interpElev.append(heights)
+            timer.merge(stages)
+            timer.log('Interpolated latitude', lat)
+    return lons, rawElev, np.array(interpElev)
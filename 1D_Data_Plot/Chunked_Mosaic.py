@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: out-of-core processing of large topo_30s mosaics. A mosaic window
+         is cut into fixed-size blocks; each block is read (with a halo of
+         neighbouring points when the operation needs one), processed and
+         written straight into an on-disk .npy array, so memory holds only a
+         few blocks at a time whatever the size of the region. A global
+         30-arc-second mosaic (43200 x 21600) is 1.8 GB as int16 on disk and
+         needs only ~20 MB of memory per 2048-point block.
+
+         The blocks run one after the other, on a thread pool, or as tasks
+         of a local Dask scheduler (scheduler='dask', if dask is installed).
+
+             writeMosaic        the window, halos stripped and tiles fused
+             wpsSmoothChunked   the WPS 1-2-1 / smth-desmth smoothers
+             mapBlocks          any other block operation
+             differenceGeoEm    geo_em terrain minus the raw mosaic, in
+                                chunks of grid points
+
+         The 2D spectral smoother streams the same way:
+         smoothMosaic(window, response, out=openOutput(path, window.shape)).
+
+Created on Sun Oct 18 23:00:00 2026
+"""
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from WPS_Smoothing import SMOOTH_STEPS, wpsSmooth
+from Transects import sampleMosaic
+
+BLOCK = 2048    # side of a block in points
+
+
+# This function creates (or overwrites) an on-disk .npy array
+# Inputs: file_path (str), the .npy file
+#         shape, dtype, the shape and type of the array
+# Output: a writable np.memmap of the file
+def openOutput(file_path, shape, dtype=np.float32):
+    return np.lib.format.open_memmap(file_path, mode='w+', dtype=dtype,
+                                     shape=tuple(shape))
+
+
+# This function cuts a 2D shape into blocks
+# Output: a list of (r0, r1, c0, c1), half-open index ranges of each block
+def blockSlices(shape, block=BLOCK):
+    return [(r0, min(r0 + block, shape[0]), c0, min(c0 + block, shape[1]))
+            for r0 in range(0, shape[0], block)
+            for c0 in range(0, shape[1], block)]
+
+
+# This function applies an operation to a window block by block
+# Inputs: window, the MosaicWindow (or any 2D array) to process
+#         func, the operation: func(data, bounds) gets a block of the window
+#                  with depth points of halo on every side (mirrored past the
+#                  window edges) and bounds = (row_lo, row_hi, col_lo,
+#                  col_hi), the window edges in the indices of data; it
+#                  returns an array of the shape of data
+#         out, the 2D array (e.g. from openOutput) the results go to
+#         depth (int), the halo width func needs around each block
+#         block (int), the side of a block
+#         scheduler, None (one block at a time), 'threads' or 'dask'
+#         workers (int), threads (or Dask workers) to use
+# Output: out
+def mapBlocks(window, func, out, depth=0, block=BLOCK, scheduler=None,
+              workers=None):
+    blocks = blockSlices(window.shape, block)
+    task = lambda b: _runBlock(window, func, out, depth, b)
+    if scheduler is None:
+        for b in blocks:
+            task(b)
+    elif scheduler == 'threads':
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(task, blocks))
+    elif scheduler == 'dask':
+        try:
+            import dask
+        except ImportError:
+            raise ImportError("scheduler='dask' needs the dask package")
+        dask.compute(*[dask.delayed(task)(b) for b in blocks],
+                     scheduler='threads', num_workers=workers)
+    else:
+        raise ValueError('unknown scheduler: %s' % scheduler)
+    if hasattr(out, 'flush'):
+        out.flush()
+    return out
+
+
+# read one block with its halo, run the operation and write the core
+def _runBlock(window, func, out, depth, block):
+    r0, r1, c0, c1 = block
+    n_rows, n_cols = window.shape
+    pr0, pr1 = max(r0 - depth, 0), min(r1 + depth, n_rows)
+    pc0, pc1 = max(c0 - depth, 0), min(c1 + depth, n_cols)
+    data = np.asarray(window[pr0:pr1, pc0:pc1])
+    if depth:
+        data = np.pad(data, ((depth - (r0 - pr0), depth - (pr1 - r1)),
+                             (depth - (c0 - pc0), depth - (pc1 - c1))),
+                      mode='symmetric')
+    bounds = (depth - r0, depth - r0 + n_rows, depth - c0, depth - c0 + n_cols)
+    result = func(data, bounds)
+    out[r0:r1, c0:c1] = result[depth:depth + r1 - r0, depth:depth + c1 - c0]
+
+
+# This function writes a window of the mosaic (halos stripped, tiles fused)
+# to a .npy file block by block
+# Inputs: window, the MosaicWindow
+#         file_path (str), the .npy file
+#         block, scheduler, workers, as for mapBlocks
+# Output: the np.memmap of the file (int16)
+def writeMosaic(window, file_path, block=BLOCK, scheduler=None, workers=None):
+    out = openOutput(file_path, window.shape, np.int16)
+    return mapBlocks(window, lambda data, bounds: data, out, 0, block,
+                     scheduler, workers)
+
+
+# This function runs a WPS smoother over a window block by block; each
+# block reads the halo the passes need, so the result equals
+# wpsSmooth(window.read(), option, passes)
+# Inputs: window, the MosaicWindow
+#         file_path (str), the .npy file
+#         option (str), passes (int), as for wpsSmooth
+#         block, scheduler, workers, as for mapBlocks
+# Output: the np.memmap of the file (float32)
+def wpsSmoothChunked(window, file_path, option='smth-desmth', passes=1,
+                     block=BLOCK, scheduler=None, workers=None):
+    depth = passes * len(SMOOTH_STEPS[option])
+    out = openOutput(file_path, window.shape, np.float32)
+    return mapBlocks(window,
+                     lambda data, bounds: wpsSmooth(data, option, passes,
+                                                    bounds),
+                     out, depth, block, scheduler, workers)
+
+
+# This function differences the terrain of a geo_em grid against the raw
+# mosaic (bilinearly interpolated at the grid points), a chunk of grid rows
+# at a time
+# Inputs: tiles, the TileIndex of the topo_30s tiles
+#         lats, lons, elev, 2D arrays of the grid coordinates and terrain
+#         chunk (int), the number of grid points per chunk
+#         fill_value, the height of points with no tile data (None raises)
+# Output: a float32 array of the grid shape, geo_em height minus raw height
+def differenceGeoEm(tiles, lats, lons, elev, chunk=1 << 20, fill_value=None):
+    diff = np.empty(np.shape(elev), dtype=np.float32)
+    rows = max(chunk // max(diff.shape[1], 1), 1)
+    for r0 in range(0, diff.shape[0], rows):
+        part = slice(r0, r0 + rows)
+        raw = sampleMosaic(tiles, lats[part], lons[part], fill_value)
+        diff[part] = np.asarray(elev[part], dtype=np.float64) - raw
+    return diff
+
+
+"""
+START OF PROGRAM
+"""
+
+if __name__ == '__main__':
+    from Tile_Index import TileIndex
+
+    # usage: python Chunked_Mosaic.py TILE_DIR lat_min lat_max lon_min lon_max OUT.npy
+    #                                 [OPTION PASSES] [threads|dask]
+    tile_dir = sys.argv[1]
+    region = [float(x) for x in sys.argv[2:6]]
+    output = sys.argv[6]
+    option = sys.argv[7] if len(sys.argv) > 8 else None # e.g. '1-2-1' or 'smth-desmth'
+    passes = int(sys.argv[8]) if len(sys.argv) > 8 else 0
+    scheduler = sys.argv[-1] if sys.argv[-1] in ('threads', 'dask') else None
+
+    window = TileIndex(tile_dir).window(*region, fill_value=0)
+    if option is None:
+        writeMosaic(window, output, scheduler=scheduler)
+    else:
+        wpsSmoothChunked(window, output, option, passes, scheduler=scheduler)
+    print('Wrote %d x %d points to %s' % (window.shape + (output,)))
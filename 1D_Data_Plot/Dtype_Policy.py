@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: the array types of the terrain pipeline, in one place. Every stage
+         keeps its data in the smallest type that holds it exactly enough:
+
+             raw heights         int16    the topo_30s tiles are int16 on
+                                          disk; tiles, windows and stores
+                                          stay int16 (native byte order)
+             grid coordinates    float32  the geo_em XLAT_M / XLONG_M are
+                                          float32 in the file (0.5 m)
+             heights             float32  geo_em terrain, interpolated,
+                                          smoothed and regridded heights
+             accumulations       float64  sums, means, interpolation and
+                                          FFT weights, statistics; the
+                                          result is cast back to float32
+
+         Query coordinates (the (n, 2) points of a transect or path) stay
+         float64: they are small, they are written to the outputs, and in
+         float32 they would move by up to 4e-6 degrees. Setting
+         TERRAIN_FLOAT=float64 in the environment runs the coordinates and
+         heights in float64 instead (e.g. to check a result); it is read at
+         import, so spawned worker processes follow it too.
+
+         Memory per stage (B = bytes, float32 policy; see memoryBudget):
+
+             tile window             2 B per cell        (2 x 2 tiles: 11 MB)
+             geo_em heights          4 B per grid point
+             geo_em points (lat/lon) 8 B per grid point
+             k-d tree ('nearest')    24 B per grid point (float64 inside)
+             triangulation ('linear', 'cubic')
+                                     230 B per grid point, whatever the
+                                     type of the points (scipy Delaunay
+                                     keeps float64 points and transforms)
+             projection ('bilinear', 'bicubic', Lambert_Grid.py)
+                                     nothing per grid point
+             transects               4 B per (latitude, grid, longitude)
+                                     and 2 B per raw point
+             smoothing               8 B per window cell (two float32
+                                     copies while a pass runs)
+             2D spectrum             8 B per cell (float32 field and its
+                                     complex64 half spectrum)
+
+         usage: python Dtype_Policy.py NX NY [N_TILES]   prints the budget
+                of a geo_em grid of NX x NY points and a window of N_TILES
+
+Created on Sun Oct 18 12:49:38 2026
+"""
+
+import os
+import sys
+import numpy as np
+
+HEIGHT_DTYPE = np.dtype(np.int16)       # raw topo_30s heights
+ACCUM_DTYPE = np.dtype(np.float64)      # sums, means and weights
+FLOAT_DTYPE = np.dtype(os.environ.get('TERRAIN_FLOAT', 'float32'))
+COORD_DTYPE = FLOAT_DTYPE               # geo_em grid coordinates
+VALUE_DTYPE = FLOAT_DTYPE               # geo_em and interpolated heights
+
+if FLOAT_DTYPE not in (np.float32, np.float64):
+    raise ValueError('TERRAIN_FLOAT must be float32 or float64, not %s'
+                     % FLOAT_DTYPE)
+
+TILE_CELLS = 1200 * 1200        # interior cells of a topo_30s tile
+TRIANGULATION_BYTES = 230       # Delaunay bytes per grid point
+TREE_BYTES = 24                 # k-d tree bytes per grid point
+
+
+# This function converts grid coordinates to the coordinate type; an array
+# already of that type is returned as is (no copy)
+# Inputs: arr, an array of latitudes or longitudes (degrees)
+# Output: the array in COORD_DTYPE
+def coordArray(arr):
+    return np.asarray(arr, dtype=COORD_DTYPE)
+
+
+# This function converts heights to the height type; an array already of
+# that type is returned as is (no copy)
+# Inputs: arr, an array of heights (m)
+# Output: the array in VALUE_DTYPE
+def valueArray(arr):
+    return np.asarray(arr, dtype=VALUE_DTYPE)
+
+
+# This function estimates the memory each stage holds for a run
+# Inputs: nx, ny (int), the size of the geo_em grid
+#         n_tiles (int), the topo_30s tiles of the window read
+#         n_lat, n_grid, n_lon (int), the shape of the transects
+# Output: a list of (stage, bytes) pairs
+def memoryBudget(nx, ny, n_tiles=4, n_lat=1, n_grid=8, n_lon=3600):
+    points, cells = nx * ny, n_tiles * TILE_CELLS
+    value, coord = VALUE_DTYPE.itemsize, COORD_DTYPE.itemsize
+    return [('tile window', cells * HEIGHT_DTYPE.itemsize),
+            ('geo_em heights', points * value),
+            ('geo_em points', points * 2 * coord),
+            ('k-d tree', points * TREE_BYTES),
+            ('triangulation', points * TRIANGULATION_BYTES),
+            ('projection', 0),
+            ('transects', n_lat * n_lon * (n_grid * value +
+                                           HEIGHT_DTYPE.itemsize)),
+            ('smoothing', cells * 2 * 4),
+            ('2D spectrum', cells * 8)]
+
+
+"""
+START OF PROGRAM
+"""
+
+if __name__ == '__main__':
+    nx, ny = int(sys.argv[1]), int(sys.argv[2])
+    n_tiles = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    print('%s policy, %d x %d grid, %d tiles' % (FLOAT_DTYPE.name, nx, ny,
+                                                 n_tiles))
+    for stage, size in memoryBudget(nx, ny, n_tiles):
+        print('%-16s %10.1f MB' % (stage, size / float(1 << 20)))
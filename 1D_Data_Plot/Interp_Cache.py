@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: disk cache for the griddata interpolation of a geo_em grid. The
+         Delaunay triangulation of a grid is built once per geo_em file
+         (keyed by a hash of the file content) and kept on disk, together
+         with the nearest-point indices and the linear interpolation weights
+         of every query set it has seen. Re-running a transect only pays for
+         the (cached) lookups, and the nearest, linear and cubic methods all
+         share the one triangulation. A cache may be shared by threads: the
+         triangulations, trees and cubic interpolators are built under a
+         lock, once each.
+
+Created on Sun Oct 18 14:00:00 2026
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+import numpy as np
+from scipy.spatial import Delaunay, cKDTree
+from scipy.interpolate import CloughTocher2DInterpolator
+from Dtype_Policy import COORD_DTYPE
+
+
+# This function computes a hash of the content of a file
+# Inputs: file_path (str), the path of the file
+# Output: the SHA-1 hex digest of the file content (str)
+def fileHash(file_path):
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as data_file:
+        for block in iter(lambda: data_file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# This function computes a hash of the values, shape and type of an array
+# Inputs: arr, a numpy array
+# Output: the SHA-1 hex digest of the array (str)
+def arrayHash(arr):
+    arr = np.ascontiguousarray(arr)
+    digest = hashlib.sha1(str((arr.shape, arr.dtype.str)).encode())
+    digest.update(arr.tobytes())
+    return digest.hexdigest()
+
+
+# This function merge two arrays of latitudes and longitudes into one single array of coordinates
+# Inputs: lats, a 2D array that stores the latitudes of several points
+#         lons, a 2D array that stores the longitudes of several points
+# Outputs: a 2D array of points made by merging lats and lons, in the
+#          coordinate type of the dtype policy (float32, as in the file)
+# Requires: lats and lons must have the same shapes (dimensions)
+def mergeLatsLons(lats, lons):
+    points = np.empty((np.size(lats), 2), dtype=COORD_DTYPE)
+    points[:, 0] = np.ravel(lats)
+    points[:, 1] = np.ravel(lons)
+    return points
+
+
+class InterpCache:
+    """Triangulations and interpolation weights of geo_em grids on disk."""
+
+    # Inputs: cache_dir (str), the directory holding the cached files
+    def __init__(self, cache_dir='interp_cache'):
+        self.cache_dir = cache_dir
+        self._tris = dict()     # triangulations loaded in this run
+        self._trees = dict()    # nearest-point trees built in this run
+        self._cubic = dict()    # (values hash, cubic interpolator) per grid
+        self._lock = threading.RLock()  # held while any of them is built
+
+    def _path(self, *parts):
+        return os.path.join(self.cache_dir, '.'.join(parts))
+
+    # This method returns the Delaunay triangulation of a grid, building it
+    # and storing it on disk the first time the grid is seen
+    # Inputs: grid_key (str), the content hash of the geo_em file
+    #         points, the (lat, lon) coordinates of the grid points
+    # Output: a scipy.spatial.Delaunay triangulation of points
+    def triangulation(self, grid_key, points):
+        tri = self._tris.get(grid_key)
+        if tri is not None:
+            return tri
+        with self._lock:
+            if grid_key in self._tris:  # built by another thread meanwhile
+                return self._tris[grid_key]
+            path = self._path(grid_key, 'tri', 'pkl')
+            if os.path.exists(path):
+                with open(path, 'rb') as tri_file:
+                    tri = pickle.load(tri_file)
+            else:
+                tri = Delaunay(points)
+                self._save(path, lambda f: pickle.dump(tri, f, protocol=4))
+            # scipy fills in the barycentric transforms on the first point
+            # lookup, and threads doing that at once crash; do it here
+            tri.find_simplex(tri.points[:1])
+            self._tris[grid_key] = tri
+            return tri
+
+    # This method interpolates the grid values at the query points; it gives
+    # the same result as scipy.interpolate.griddata(points, values, xi, method)
+    # Inputs: grid_key (str), the content hash of the geo_em file
+    #         points, the (lat, lon) coordinates of the grid points
+    #         values, the values at the grid points (e.g. terrain height)
+    #         xi, the (lat, lon) coordinates of the query points
+    #         method (str), 'nearest', 'linear' or 'cubic'
+    #         persist (bool), False keeps the weights of this query set off
+    #                         the disk (e.g. for one-off queries)
+    # Output: the interpolated values at xi (NaN outside the grid for the
+    #         linear and cubic methods)
+    def griddata(self, grid_key, points, values, xi, method='linear',
+                 persist=True):
+        values = np.ravel(values)
+        xi = np.asarray(xi, dtype=np.float64)
+        if method == 'nearest':
+            idx = self._weights(grid_key, xi, method,
+                                lambda: self._nearest(grid_key, points, xi),
+                                persist)['idx']
+            return values[idx]
+        if method == 'linear':
+            weights = self._weights(grid_key, xi, method,
+                                    lambda: self._linear(grid_key, points, xi),
+                                    persist)
+            interp = np.einsum('ij,ij->i', values[weights['vertices']],
+                               weights['bary'])
+            interp[weights['outside']] = np.nan
+            return interp
+        if method == 'cubic':
+            # the gradient estimation of the interpolator costs about as much
+            # as the triangulation, so it is done once per grid and field;
+            # the interpolator of the last field seen on a grid is kept
+            values_key = arrayHash(values)
+            cached = self._cubic.get(grid_key)
+            if cached is None or cached[0] != values_key:
+                with self._lock:
+                    cached = self._cubic.get(grid_key)
+                    if cached is None or cached[0] != values_key:
+                        tri = self.triangulation(grid_key, points)
+                        cached = (values_key,
+                                  CloughTocher2DInterpolator(tri, values))
+                        self._cubic[grid_key] = cached
+            return cached[1](xi)
+        raise ValueError('unknown interpolation method: %s' % method)
+
+    # This method loads the weights of a query set from disk, computing and
+    # storing them first if this query set has not been seen for the grid
+    def _weights(self, grid_key, xi, method, compute, persist=True):
+        if not persist:
+            return compute()
+        path = self._path(grid_key, method, arrayHash(xi), 'npz')
+        if os.path.exists(path):
+            with np.load(path) as weights:
+                return dict(weights)
+        weights = compute()
+        self._save(path, lambda f: np.savez(f, **weights))
+        return weights
+
+    # griddata's 'nearest' method picks the closest point in (lat, lon) space
+    def _nearest(self, grid_key, points, xi):
+        tree = self._trees.get(grid_key)
+        if tree is None:
+            with self._lock:
+                tree = self._trees.get(grid_key)
+                if tree is None:
+                    tree = self._trees[grid_key] = cKDTree(points)
+        return {'idx': tree.query(xi)[1]}
+
+    # barycentric weights of the query points in their enclosing triangles
+    def _linear(self, grid_key, points, xi):
+        tri = self.triangulation(grid_key, points)
+        simplex = tri.find_simplex(xi)
+        outside = simplex < 0
+        simplex[outside] = 0
+        transform = tri.transform[simplex]
+        bary2 = np.einsum('ijk,ik->ij', transform[:, :2],
+                          xi - transform[:, 2])
+        bary = np.column_stack([bary2, 1.0 - bary2.sum(axis=1)])
+        return {'vertices': tri.simplices[simplex], 'bary': bary,
+                'outside': outside}
+
+    # write a cache file atomically, so an interrupted run never leaves a
+    # truncated file behind (the temporary name is unique per thread)
+    def _save(self, path, write):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = '%s.%d.%d.tmp' % (path, os.getpid(), threading.get_ident())
+        with open(tmp_path, 'wb') as cache_file:
+            write(cache_file)
+        os.replace(tmp_path, path)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: analytic lookup on a Lambert conformal geo_em grid. A geo_em grid
+         is a regular grid in a known map projection, so instead of treating
+         its points as scattered data (a k-d tree or a Delaunay
+         triangulation of the whole domain), the fractional grid index
+         (i, j) of any latitude and longitude is computed directly from the
+         projection attributes geogrid writes: MAP_PROJ, TRUELAT1/2,
+         STAND_LON, DX/DY and a reference point (the first corner of the
+         mass grid). This is the same spherical projection WPS uses (radius
+         6370 km), so grid points map back onto integer indices.
+
+         With the fractional indices, sampling is plain array indexing:
+         nearest, bilinear (4 points) or bicubic (Keys cubic convolution on
+         16 points) interpolation in grid space, all vectorized over the
+         query points. Points off the grid are NaN. Only MAP_PROJ = 1
+         (Lambert conformal) grids are handled.
+
+         The methods 'bilinear' and 'bicubic' of the transect and server
+         code (see interpolateGrid) go through this lookup; 'nearest',
+         'linear' and 'cubic' still give scipy griddata's results.
+
+Created on Sun Oct 18 12:47:06 2026
+"""
+
+import math
+import numpy as np
+from Nearest_Grid_Point import EARTH_RADIUS
+from Dtype_Policy import ACCUM_DTYPE, VALUE_DTYPE, valueArray
+
+EARTH_RADIUS_WRF = 6370000.0    # sphere radius of the WPS projections (m)
+LAMBERT = 1                     # MAP_PROJ of the Lambert conformal projection
+KEYS_A = -0.5                   # the cubic convolution parameter of Keys
+
+
+class LambertGrid:
+    """The Lambert conformal projection of a geo_em mass grid."""
+
+    # Inputs: truelat1, truelat2, stand_lon, the projection (degrees)
+    #         dx, dy (float), the grid spacing (m)
+    #         ref_lat, ref_lon, the coordinates of a reference grid point
+    #         ref_i, ref_j (float), its 0-based column and row index
+    #         nx, ny (int), the number of columns (west_east) and rows
+    #                       (south_north) of the grid
+    def __init__(self, truelat1, truelat2, stand_lon, dx, dy, ref_lat,
+                 ref_lon, ref_i, ref_j, nx, ny):
+        self.truelat1, self.truelat2 = float(truelat1), float(truelat2)
+        self.stand_lon = float(stand_lon)
+        self.dx, self.dy = float(dx), float(dy)
+        self.shape = (int(ny), int(nx))
+        self.hemi = -1.0 if self.truelat1 < 0 else 1.0
+        t1, t2 = math.radians(self.truelat1), math.radians(self.truelat2)
+        if abs(self.truelat1 - self.truelat2) > 0.1:
+            self.cone = (math.log(math.cos(t1)) - math.log(math.cos(t2))) / \
+                (math.log(math.tan(math.pi / 4 - abs(t1) / 2)) -
+                 math.log(math.tan(math.pi / 4 - abs(t2) / 2)))
+        else:
+            self.cone = math.sin(abs(t1))
+        # rho(lat) = rho1 (tan((90 hemi - lat) / 2) / tan1) ** cone, the
+        # distance from the pole in the plane (rho1 at truelat1)
+        self.rho1 = EARTH_RADIUS_WRF * math.cos(t1) / self.cone
+        self.tan1 = math.tan(math.radians(90.0 * self.hemi -
+                                          self.truelat1) / 2)
+        x, y = self._project(ref_lat, ref_lon)
+        # the projected coordinates of the grid index origin
+        self.x0 = float(x) - float(ref_i) * self.dx
+        self.y0 = float(y) - float(ref_j) * self.dy
+
+    # This method builds the projection of a geo_em file from its global
+    # attributes; the reference point is the south-west corner of the mass
+    # grid (corner_lats[0], corner_lons[0]) or, without corners, the domain
+    # centre (CEN_LAT, CEN_LON)
+    # Inputs: nc, an open netCDF4 Dataset (or the path) of a geo_em file
+    # Output: a LambertGrid
+    @classmethod
+    def fromGeoEm(cls, nc):
+        if isinstance(nc, str):
+            from netCDF4 import Dataset
+            with Dataset(nc, 'r') as dataset:
+                return cls.fromGeoEm(dataset)
+        attrs = nc.ncattrs()
+        if int(nc.MAP_PROJ) != LAMBERT:
+            raise ValueError('MAP_PROJ %d is not a Lambert conformal grid'
+                             % int(nc.MAP_PROJ))
+        nx = len(nc.dimensions['west_east'])
+        ny = len(nc.dimensions['south_north'])
+        if 'corner_lats' in attrs:
+            ref = (float(nc.corner_lats[0]), float(nc.corner_lons[0]), 0, 0)
+        else:
+            ref = (float(nc.CEN_LAT), float(nc.CEN_LON),
+                   (nx - 1) / 2.0, (ny - 1) / 2.0)
+        return cls(nc.TRUELAT1, nc.TRUELAT2, nc.STAND_LON, nc.DX, nc.DY,
+                   *ref, nx=nx, ny=ny)
+
+    # projected (x, y) in metres of latitudes and longitudes, pole at (0, 0)
+    def _project(self, lats, lons):
+        lats = np.asarray(lats, dtype=np.float64)
+        dlon = (np.asarray(lons, dtype=np.float64) - self.stand_lon + 180.0) \
+            % 360.0 - 180.0
+        rho = self.rho1 * (np.tan(np.radians(90.0 * self.hemi - lats) / 2) /
+                           self.tan1) ** self.cone
+        theta = self.cone * np.radians(dlon)
+        return rho * np.sin(theta), -self.hemi * rho * np.cos(theta)
+
+    # This method computes the fractional grid index of points
+    # Inputs: lats, lons, scalars or arrays (of the same shape) in degrees
+    # Outputs: i, j, float arrays of the column (west_east) and row
+    #          (south_north) index of each point; grid points fall on
+    #          integers, and points off the grid lie outside 0 .. n - 1
+    def fractionalIndex(self, lats, lons):
+        x, y = self._project(lats, lons)
+        return (x - self.x0) / self.dx, (y - self.y0) / self.dy
+
+    # This method computes the coordinates of fractional grid indices (the
+    # inverse of fractionalIndex)
+    # Inputs: i, j, scalars or arrays of column and row indices
+    # Outputs: lats, lons, arrays in degrees
+    def latLon(self, i, j):
+        x = self.x0 + np.asarray(i, dtype=np.float64) * self.dx
+        y = self.y0 + np.asarray(j, dtype=np.float64) * self.dy
+        rho = np.hypot(x, y)
+        theta = np.arctan2(x, -self.hemi * y)
+        lats = 90.0 * self.hemi - 2.0 * np.degrees(
+            np.arctan((rho / self.rho1) ** (1.0 / self.cone) * self.tan1))
+        lons = (self.stand_lon + np.degrees(theta / self.cone) + 180.0) \
+            % 360.0 - 180.0
+        return lats, lons
+
+    # This method interpolates grid fields at points
+    # Inputs: field, an array (ny, nx) on the grid, or a stack (..., ny, nx)
+    #         lats, lons, scalars or arrays (of the same shape) in degrees
+    #         method (str), 'nearest', 'bilinear' or 'bicubic'
+    # Output: an array (..., *lats.shape) of the height type of the dtype
+    #         policy, NaN where a point is off the grid
+    def sample(self, field, lats, lons, method='bilinear'):
+        field = np.asarray(field)
+        if field.shape[-2:] != self.shape:
+            raise ValueError('field of shape %s is not on a %d x %d grid'
+                             % ((field.shape,) + self.shape))
+        i, j = self.fractionalIndex(lats, lons)
+        ny, nx = self.shape
+        inside = (i >= 0) & (i <= nx - 1) & (j >= 0) & (j <= ny - 1)
+        i, j = np.where(inside, i, 0.0), np.where(inside, j, 0.0)
+        if method == 'nearest':
+            out = field[..., np.rint(j).astype(np.intp),
+                        np.rint(i).astype(np.intp)].astype(VALUE_DTYPE)
+        elif method == 'bilinear':
+            out = _convolve(field, i, j, 2, _linearWeights)
+        elif method == 'bicubic':
+            out = _convolve(field, i, j, 4, _cubicWeights)
+        else:
+            raise ValueError('unknown interpolation method: %s' % method)
+        out[..., ~inside] = np.nan
+        return out
+
+    # This method finds the grid points closest to each query point, as
+    # NearestGridPoint.query does (the nearest point in grid space, which
+    # only differs from the nearest on the sphere at near ties); points off
+    # the grid get the closest edge point
+    # Inputs: lat, lon, scalars or arrays (of the same shape) in degrees
+    # Outputs: rows, cols, the grid indices of the closest points
+    #          dists, the great circle distances to them in km
+    def query(self, lat, lon):
+        i, j = self.fractionalIndex(lat, lon)
+        ny, nx = self.shape
+        cols = np.clip(np.rint(i), 0, nx - 1).astype(np.intp)
+        rows = np.clip(np.rint(j), 0, ny - 1).astype(np.intp)
+        grid_lats, grid_lons = self.latLon(cols, rows)
+        lat1, lat2 = np.radians(lat), np.radians(grid_lats)
+        a = np.sin((lat2 - lat1) / 2)**2 + np.cos(lat1) * np.cos(lat2) * \
+            np.sin(np.radians(grid_lons - np.asarray(lon)) / 2)**2
+        dists = 2.0 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        return rows, cols, dists
+
+
+# weights of the 2 points of linear interpolation at offsets 0, 1
+def _linearWeights(t):
+    return [1.0 - t, t]
+
+
+# weights of the 4 points of Keys cubic convolution at offsets -1 .. 2
+def _cubicWeights(t):
+    a = KEYS_A
+    s = 1.0 - t
+    return [a * t * s * s,
+            ((a + 2.0) * t - (a + 3.0)) * t * t + 1.0,
+            ((a + 2.0) * s - (a + 3.0)) * s * s + 1.0,
+            a * s * t * t]
+
+
+# interpolate with a separable kernel of n x n points around (i, j), summed
+# in float64 and returned in the height type; the points past the grid
+# edges are clamped onto the edge
+def _convolve(field, i, j, n, weights):
+    ny, nx = field.shape[-2:]
+    first = 1 - n // 2
+    i0 = np.clip(np.floor(i), 0, nx - 2).astype(np.intp)
+    j0 = np.clip(np.floor(j), 0, ny - 2).astype(np.intp)
+    w_i, w_j = weights(i - i0), weights(j - j0)
+    out = np.zeros(field.shape[:-2] + np.shape(i), dtype=ACCUM_DTYPE)
+    for b in range(n):
+        rows = np.clip(j0 + first + b, 0, ny - 1)
+        for a in range(n):
+            cols = np.clip(i0 + first + a, 0, nx - 1)
+            out += (w_j[b] * w_i[a]) * field[..., rows, cols]
+    return out.astype(VALUE_DTYPE)
+
+
+# This function interpolates a loaded geo_em grid (see
+# Batch_Transects.loadGeoEm) at query points: 'bilinear' and 'bicubic' go
+# through the grid's projection, the griddata methods through the cache
+# Inputs: cache, the InterpCache of the griddata methods
+#         grid, the grid dict
+#         xi, an array (n, 2) of the (lat, lon) query points
+#         method (str), 'nearest', 'linear', 'cubic', 'bilinear' or
+#                       'bicubic'
+#         persist (bool), False keeps griddata weights off the disk
+# Output: a 1D array of the heights at the query points (in the height
+#         type of the dtype policy)
+def interpolateGrid(cache, grid, xi, method, persist=True):
+    if method in ('bilinear', 'bicubic'):
+        projection = grid.get('projection')
+        if projection is None:
+            raise ValueError('%s is not a Lambert conformal grid, use griddata'
+                             ' methods' % grid['name'])
+        xi = np.asarray(xi)
+        return projection.sample(grid['elev'].reshape(projection.shape),
+                                 xi[:, 0], xi[:, 1], method)
+    return valueArray(cache.griddata(grid['key'], grid['points'],
+                                     grid['elev'], xi, method=method,
+                                     persist=persist))
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: nearest-grid-point lookup on a geo_em grid. The grid points are
+         placed on the unit sphere and stored in a k-d tree once per grid;
+         a whole vector of lat/lon queries is then answered in one call.
+         Straight-line (chord) distance on the sphere increases with the
+         great circle distance, so the nearest point is the same one the
+         haversine formula would pick.
+
+Created on Sun Oct 18 12:00:00 2026
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS = 6371.0 # Radius of Earth in km
+
+
+# This function converts latitudes and longitudes into points on the unit sphere
+# Inputs: lats, lons, arrays of latitudes and longitudes in degrees
+# Output: an array of shape lats.shape + (3,) holding the x, y, z coordinates
+def latLonToXYZ(lats, lons):
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+    cos_lat = np.cos(lats)
+    return np.stack([cos_lat * np.cos(lons),
+                     cos_lat * np.sin(lons),
+                     np.sin(lats)], axis=-1)
+
+
+class NearestGridPoint:
+    """Nearest-neighbour search over the points of a 2D lat/lon grid."""
+
+    # Inputs: lats, a 2D array that stores the latitudes of the grid points
+    #         lons, a 2D array that stores the longitudes of the grid points
+    # Requires: lats and lons must have the same shapes (dimensions)
+    def __init__(self, lats, lons):
+        lats = np.asarray(lats)
+        self.shape = lats.shape
+        self.tree = cKDTree(latLonToXYZ(lats, lons).reshape(-1, 3))
+
+    # This method finds the grid points closest to each query point
+    # Inputs: lat, lon, scalars or arrays (of the same shape) in degrees
+    # Outputs: rows, cols, the grid indices of the closest points
+    #          dists, the great circle distances to them in km
+    #          (all three have the shape of the query)
+    def query(self, lat, lon):
+        chord, flat = self.tree.query(latLonToXYZ(lat, lon))
+        dists = 2.0 * EARTH_RADIUS * np.arcsin(np.minimum(chord / 2.0, 1.0))
+        rows, cols = np.unravel_index(flat, self.shape)
+        return rows, cols, dists
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: per-stage timing and memory instrumentation for the extraction
+         pipeline. Each stage (tile read, geo_em load, mergeLatsLons,
+         interpolation, write, ...) is wrapped in timer.stage(name) or
+         decorated with @timer.timed(name); the timer records the wall
+         time, the peak traced Python allocation (when memory tracing is
+         on) and the peak resident set size of the process, and can dump a
+         per-stage report as JSON. Progress messages go through timer.log,
+         which stays silent in quiet mode.
+
+         Stages may run on several threads at once (e.g. the server's
+         request threads): each thread keeps its own stack of running
+         stages. The traced memory of tracemalloc is one
+         peak for the whole process, though, so a traced peak recorded
+         while other threads run stages includes their allocations, and
+         may miss allocations made before another stage started.
+
+Created on Sun Oct 18 17:00:00 2026
+"""
+
+import functools
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+
+# This function returns the peak resident set size of this process
+# Output: the peak RSS in MB, or None where it cannot be measured
+def peakRSS():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return rss / 2.0**20 if sys.platform == 'darwin' else rss / 2.0**10
+
+
+class StageTimer:
+    """Wall time and memory of named pipeline stages."""
+
+    # Inputs: quiet (bool), suppress the messages passed to log
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+        self.stages = dict()    # stage name -> accumulated record
+        self._local = threading.local() # per thread: the traced peaks of
+                                        # the stages it is running
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()   # stages may be recorded from threads
+
+    # This method starts tracing Python allocations, so that every stage
+    # also records its peak traced memory (this slows the pipeline down)
+    def traceMemory(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    # This method prints a progress message unless the timer is quiet
+    def log(self, *args):
+        if not self.quiet:
+            print(*args)
+
+    # This context manager times the code inside it as one call of a stage
+    # Inputs: name (str), the name of the stage
+    @contextmanager
+    def stage(self, name):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            if not hasattr(self._local, 'peaks'):
+                self._local.peaks = []
+            peaks = self._local.peaks
+            # the peak of an enclosing stage must survive our reset
+            if peaks:
+                peaks[-1] = max(peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            peaks.append(0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            traced = None
+            if tracing:
+                traced = max(peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if peaks:
+                    peaks[-1] = max(peaks[-1], traced)
+                traced = traced / 2.0**20
+            self.record(name, seconds, traced, peakRSS())
+
+    # This method returns a decorator that times every call of a function
+    # Inputs: name (str), the name of the stage (default: the function name)
+    def timed(self, name=None):
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(name or func.__name__):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # This method adds one call of a stage to the records
+    # Inputs: name (str), the name of the stage
+    #         seconds (float), the wall time of the call
+    #         traced_mb, rss_mb, the peak traced memory and peak RSS in MB
+    #                            (None when not measured)
+    #         calls (int), the number of calls the time stands for
+    def record(self, name, seconds, traced_mb=None, rss_mb=None, calls=1):
+        with self._lock:
+            rec = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0,
+                                                'peak_traced_mb': None,
+                                                'peak_rss_mb': None})
+            rec['calls'] += calls
+            rec['seconds'] += seconds
+            for key, value in (('peak_traced_mb', traced_mb),
+                               ('peak_rss_mb', rss_mb)):
+                if value is not None:
+                    rec[key] = (value if rec[key] is None
+                                else max(rec[key], value))
+
+    # This method adds the records of another timer (e.g. from a worker
+    # process) to this one
+    # Inputs: stages, the stages dict of the other timer
+    def merge(self, stages):
+        for name, rec in stages.items():
+            self.record(name, rec['seconds'], rec['peak_traced_mb'],
+                        rec['peak_rss_mb'], rec['calls'])
+
+    # This method returns the per-stage report, slowest stage first (the
+    # time of a stage includes the time of the stages nested inside it)
+    def report(self):
+        stages = sorted(self.stages.items(), key=lambda s: -s[1]['seconds'])
+        return {'wall_seconds': time.perf_counter() - self._start,
+                'peak_rss_mb': peakRSS(),
+                'stages': [dict(rec, stage=name) for name, rec in stages]}
+
+    # This method writes the per-stage report to a JSON file
+    # Inputs: file_path (str), the path of the report file
+    def dumpReport(self, file_path):
+        with open(file_path, 'w') as report_file:
+            json.dump(self.report(), report_file, indent=2)
+
+
+# This function removes the instrumentation flags from the command line
+# arguments: --quiet silences progress messages, --report FILE dumps the
+# per-stage report to FILE and --trace-memory also records the peak traced
+# memory of every stage
+# Inputs: argv, the list of command line arguments
+# Outputs: args, the remaining arguments
+#          report (str or None), the report file
+#          quiet (bool), trace (bool)
+def parseFlags(argv):
+    args, report, quiet, trace = [], None, False, False
+    argv = iter(argv)
+    for arg in argv:
+        if arg == '--quiet':
+            quiet = True
+        elif arg == '--trace-memory':
+            trace = True
+        elif arg == '--report':
+            report = next(argv)
+        elif arg.startswith('--report='):
+            report = arg.split('=', 1)[1]
+        else:
+            args.append(arg)
+    return args, report, quiet, trace
+
+
+timer = StageTimer()    # the timer shared by the pipeline modules
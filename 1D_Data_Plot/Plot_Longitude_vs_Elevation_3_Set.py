@@ -4,47 +4,29 @@
 Author:  Chris Jing 
 Email:   zjing@eoas.ubc.ca
 For:     UBC EOAS WFRT 
-Purpose: this program read in a csv file containing two sets of longtidue 
+Purpose: this program read in transect files containing two sets of longtidue 
              vs elevation data, and generate a plot with three types of 
              smoothing schemes: nearest, bilinear, and cubic
              
 Created on Wed Jan 31 12:48:00 2018         
 """
 
-import csv 
 import matplotlib.pyplot as plt
+from Transect_Output import readTransects, gridHeights
 
 latitude = 53.92
 
-with open('53.92N_TwoMethodsComparison.csv') as csvfile: 
-    readCSV = csv.reader(csvfile, delimiter=',') 
+# one transect file per interpolation method, all along the same latitude
+#transects_Nearest = readTransects('53.92N_nearest.npz')
+transects_Bilinear = readTransects('53.92N_linear.npz')
+transects_Cubic = readTransects('53.92N_cubic.npz')
 
-    longitudes = [] # longitudes in degree decimal (DD) format
-    elevations_raw = []  # elevations in metres (raw data)
-    
-    elevations_12_Nearest = [] 
-    elevations_12_Bilinear = [] 
-    elevations_12_Cubic = [] 
-
-    
-    
-    reader = csv.reader(csvfile)
-    next(reader, None)
-   
-    for row in readCSV:
-        longitude       = float(row[0])
-        elevation_raw   = float(row[1])
-        
+longitudes = transects_Cubic['longitude'] # longitudes in degree decimal (DD) format
+elevations_raw = transects_Cubic['raw'][0]  # elevations in metres (raw data)
 
-        #elevation_12_Nearest    = float(row[3])
-        elevation_12_Bilinear   = float(row[4])
-        elevation_12_Cubic      = float(row[5])
-        
-        longitudes.append(longitude)
-        elevations_raw.append(elevation_raw)
-        #elevations_12_Nearest.append(elevation_12_Nearest)
-        elevations_12_Bilinear.append(elevation_12_Bilinear)
-        elevations_12_Cubic.append(elevation_12_Cubic)
+#elevations_12_Nearest = gridHeights(transects_Nearest, '12')
+elevations_12_Bilinear = gridHeights(transects_Bilinear, '12')
+elevations_12_Cubic = gridHeights(transects_Cubic, '12')
         
 # Set figure width to 12.0 and height to 4.0
 fig_size = plt.rcParams["figure.figsize"] 
@@ -4,7 +4,7 @@
 Author:  Chris Jing 
 Email:   zjing@eoas.ubc.ca
 For:     UBC EOAS WFRT 
-Purpose: this program read in a csv file containing two sets of longtidue 
+Purpose: this program read in a transect file containing two sets of longtidue 
          vs elevation data, and generate a plot 
              
 Created on Wed Jan 31 12:48:00 2018
@@ -12,45 +12,26 @@ Created on Wed Jan 31 12:48:00 2018
              
 """
 
-import csv 
+import numpy as np
 import matplotlib.pyplot as plt
+from Transect_Output import readTransects, gridHeights
 
 latitude = 50.12
 
-with open('50.12_Bilinear_Interp_Complete_Set.csv') as csvfile: 
-    readCSV = csv.reader(csvfile, delimiter=',') 
+transects = readTransects('50.12_Bilinear_Interp_Complete_Set.npz')
 
-    longitudes = [] # longitudes in degree decimal (DD) format
-    elevations_raw = []  # elevations in metres (raw data)
-    
-    
-    longitudes_0_444 = []
-    longitudes_1_3 = []
-    
-    elevations_0_444 = [] # elevations in metres (grid size = 0.444 km)
-    elevations_1_3 = [] # elevations in metres (grid size = 1.3km)
-    
-    reader = csv.reader(csvfile)
-    next(reader, None)
-   
-    for row in readCSV:
-        longitude       = float(row[0])
-        longitudes.append(longitude)
-        elevation_raw   = float(row[1])
-        elevations_raw.append(elevation_raw)
-        
-        if str(row[3]) != "nan" :
-            
-            elevation_0_444 = float(row[3])
-            elevations_0_444.append(elevation_0_444)
-            longitudes_0_444.append(longitude)
-            
-        if str(row[4]) != "nan" :
-            elevation_1_3   = float(row[4])
-            elevations_1_3.append(elevation_1_3)
-            longitudes_1_3.append(longitude)
+longitudes = transects['longitude'] # longitudes in degree decimal (DD) format
+elevations_raw = transects['raw'][0]  # elevations in metres (raw data)
+
+# the small grids do not cover the whole line, so keep the points inside them
+elevations_0_444 = gridHeights(transects, '0.444') # elevations in metres (grid size = 0.444 km)
+longitudes_0_444 = longitudes[~np.isnan(elevations_0_444)]
+elevations_0_444 = elevations_0_444[~np.isnan(elevations_0_444)]
+
+elevations_1_3 = gridHeights(transects, '1.333') # elevations in metres (grid size = 1.3km)
+longitudes_1_3 = longitudes[~np.isnan(elevations_1_3)]
+elevations_1_3 = elevations_1_3[~np.isnan(elevations_1_3)]
 
-      
 # Set figure width to 16.0 and height to 4.0
 fig_size = plt.rcParams["figure.figsize"] 
 fig_size[0] = 16
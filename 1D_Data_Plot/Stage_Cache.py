@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: on-disk cache of the results of the pipeline stages (tile read,
+         geo_em interpolation, Fourier filtering, plots ...). The result of
+         a stage is stored under a key hashed from the content of its input
+         files and its parameters (latitude, method, grid sizes, threshold);
+         a stage that reads the result of another passes that stage's key as
+         a parameter, so a change anywhere upstream makes every stage below
+         it stale, and only the stale stages are run again. Tweaking a
+         threshold or a figure then reruns the filter or the plot, not the
+         tile reads and the interpolation.
+
+             <cache_dir>/<key>.npz      the arrays returned by a stage
+             <cache_dir>/hashes.json    content hashes of the input files,
+                                        reused while size and mtime match
+
+         The cache is bounded in size: after each store the least recently
+         used results are deleted until the total is under max_bytes.
+
+         usage: python Stage_Cache.py [CACHE_DIR] [--max-mb N] [--clear]
+
+Created on Sun Oct 18 12:38:17 2026
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import numpy as np
+from Interp_Cache import fileHash, arrayHash
+from Pipeline_Timer import timer
+
+MAX_BYTES = 1 << 30     # 1 GB
+HASHES = 'hashes.json'
+
+
+class StageCache:
+    """Results of pipeline stages on disk, keyed by inputs and parameters."""
+
+    # Inputs: cache_dir (str), the directory holding the results
+    #         max_bytes (int), the size the results are evicted down to
+    def __init__(self, cache_dir='stage_cache', max_bytes=MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        path = os.path.join(cache_dir, HASHES)
+        self._hashes = dict()
+        if os.path.exists(path):
+            with open(path) as hash_file:
+                self._hashes = json.load(hash_file)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.npz')
+
+    # This method returns the content hash of a file; the hash is stored and
+    # reused as long as the size and modification time of the file match
+    def fileKey(self, file_path):
+        stat = os.stat(file_path)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        name = os.path.abspath(file_path)
+        with self._lock:
+            known = self._hashes.get(name)
+        if known is not None and known[:2] == stamp:
+            return known[2]
+        digest = fileHash(file_path)
+        with self._lock:
+            self._hashes[name] = stamp + [digest]
+            _writeJSON(os.path.join(self.cache_dir, HASHES), self._hashes)
+        return digest
+
+    # This method computes the key of a stage
+    # Inputs: stage (str), the name of the stage
+    #         files, the paths of the files the stage reads
+    #         params, the parameters of the stage (numbers, strings, arrays,
+    #                 lists of them, or keys of upstream stages)
+    # Output: the key (str, SHA-1 hex digest)
+    def key(self, stage, files=(), **params):
+        description = {'stage': stage,
+                       'files': [self.fileKey(f) for f in files],
+                       'params': {name: _canonical(value)
+                                  for name, value in params.items()}}
+        return hashlib.sha1(json.dumps(description, sort_keys=True)
+                            .encode()).hexdigest()
+
+    # This method returns the stored result of a key, or None
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                result = {name: data[name] for name in data.files}
+            os.utime(path)      # mark it as recently used
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        return result
+
+    # This method stores the result of a key, then evicts old results
+    # Inputs: key (str), the key of the stage
+    #         result, a dict of arrays
+    def put(self, key, result):
+        path = self._path(key)
+        tmp_path = '%s.%d.%d.tmp' % (path, os.getpid(), threading.get_ident())
+        with open(tmp_path, 'wb') as npz_file:
+            np.savez(npz_file, **result)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    # This method runs a stage unless its result is already stored
+    # Inputs: stage (str), the name of the stage
+    #         compute, a function returning the result (a dict of arrays)
+    #         files, params, as for key
+    # Outputs: the result of the stage, and its key (to pass downstream)
+    def run(self, stage, compute, files=(), **params):
+        key = self.key(stage, files, **params)
+        result = self.get(key)
+        if result is not None:
+            timer.log('Reused stage', stage)
+            return result, key
+        with timer.stage(stage):
+            result = compute()
+        self.put(key, result)
+        return result, key
+
+    # This method writes an output file (e.g. a figure) unless the file
+    # written for the same inputs and parameters is still in place
+    # Inputs: stage (str), the name of the stage
+    #         file_path (str), the output file
+    #         write, a function that writes file_path
+    #         files, params, as for key
+    # Output: the key of the stage
+    def output(self, stage, file_path, write, files=(), **params):
+        key = self.key(stage, files, output=os.path.abspath(file_path),
+                       **params)
+        stored = self.get(key)
+        if stored is not None and os.path.exists(file_path):
+            stat = os.stat(file_path)
+            if list(stored['stamp']) == [stat.st_size, stat.st_mtime_ns]:
+                timer.log('Reused stage', stage)
+                return key
+        with timer.stage(stage):
+            write(file_path)
+        stat = os.stat(file_path)
+        self.put(key, {'stamp': np.array([stat.st_size, stat.st_mtime_ns])})
+        return key
+
+    # This method deletes the least recently used results until the cache
+    # holds at most max_bytes
+    # Output: the number of results deleted
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npz'):
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:   # evicted by another process
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        deleted = 0
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+            deleted += 1
+        return deleted
+
+    # This method deletes every stored result
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npz'):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    # This method returns the number and total size (bytes) of the results
+    def usage(self):
+        sizes = [os.path.getsize(os.path.join(self.cache_dir, name))
+                 for name in os.listdir(self.cache_dir)
+                 if name.endswith('.npz')]
+        return len(sizes), sum(sizes)
+
+
+# parameters in a form json can hash: arrays by their content hash
+def _canonical(value):
+    if isinstance(value, np.ndarray):
+        return 'array:' + arrayHash(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return value
+
+def _writeJSON(path, data):
+    tmp_path = '%s.%d.%d.tmp' % (path, os.getpid(), threading.get_ident())
+    with open(tmp_path, 'w') as json_file:
+        json.dump(data, json_file)
+    os.replace(tmp_path, path)
+
+
+"""
+START OF PROGRAM
+"""
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    max_bytes = MAX_BYTES
+    if '--max-mb' in args:
+        k = args.index('--max-mb')
+        max_bytes = int(float(args[k + 1]) * (1 << 20))
+        del args[k:k + 2]
+    clear = '--clear' in args
+    args = [a for a in args if a != '--clear']
+
+    cache = StageCache(args[0] if args else 'stage_cache', max_bytes)
+    if clear:
+        cache.clear()
+    deleted = cache.evict()
+    count, size = cache.usage()
+    print('%d results, %.1f MB in %s (%d evicted)'
+          % (count, size / float(1 << 20), cache.cache_dir, deleted))
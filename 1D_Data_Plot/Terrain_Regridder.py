@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: area-averaging regridder from the topo_30s mosaic to the cells of a
+         WRF (geo_em) grid, to make candidate model terrain without running
+         geogrid. Every 30-arc-second cell of the window around the domain
+         is given to the model cell that contains its centre, and each model
+         cell height is the mean of the cells it was given; a model cell too
+         small to contain any cell centre (the 0.444 km grid) takes the
+         cell under its own centre. This map is stored as a sparse matrix
+         (model cells x window cells), so regridding a field on the window -
+         the raw terrain or any smoothed version of it - is one sparse
+         matrix product, and a stack of fields is regridded in one go.
+
+         The matrix is built from the grid coordinates alone (latlon_coords
+         of the cell centres): a point belongs to its nearest cell centre,
+         and points past the outer cells (more than half a cell from the
+         centre along the local grid axes) are left out. It is cached on
+         disk per grid, keyed by a hash of the grid coordinates.
+
+         usage: python Terrain_Regridder.py TILE_DIR GEO_EM_FILE...
+
+Created on Sun Oct 18 12:43:18 2026
+"""
+
+import math
+import os
+import sys
+import numpy as np
+from scipy import sparse
+from scipy.spatial import cKDTree
+from Tile_Index import (boxToIndices, rowToLat, colToLon, MosaicWindow,
+                        LAT_ORIGIN, LON_ORIGIN, POINTS_PER_DEGREE)
+from Interp_Cache import arrayHash
+from Nearest_Grid_Point import latLonToXYZ
+from Pipeline_Timer import timer
+from Dtype_Policy import ACCUM_DTYPE, valueArray
+
+ROW_CHUNK = 256         # window rows assigned to model cells at a time
+
+
+class Regridder:
+    """Sparse area-averaging map from a topo_30s window to a model grid."""
+
+    # Inputs: lats, lons, 2D arrays of the model cell centres (degrees)
+    #         cache_dir (str), the directory of the cached matrices (None
+    #                          keeps the matrix in memory only)
+    def __init__(self, lats, lons, cache_dir='regrid_cache'):
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        self.shape = lats.shape
+        # the window covers the domain and half a cell (with room to spare)
+        # past its outer centres
+        xyz = latLonToXYZ(lats, lons)
+        step = max(np.linalg.norm(np.diff(xyz, axis=0), axis=-1).max(),
+                   np.linalg.norm(np.diff(xyz, axis=1), axis=-1).max())
+        pad = math.degrees(step)
+        lat_min, lat_max = lats.min() - pad, lats.max() + pad
+        lon_pad = pad / max(math.cos(math.radians(max(abs(lat_min),
+                                                      abs(lat_max)))), 0.01)
+        self.bounds = boxToIndices(lat_min, lat_max, lons.min() - lon_pad,
+                                   lons.max() + lon_pad)
+        self.window_shape = (self.bounds[1] - self.bounds[0],
+                             self.bounds[3] - self.bounds[2])
+
+        key = arrayHash(np.stack([lats, lons]))
+        path = None if cache_dir is None else os.path.join(
+            cache_dir, '%s.%d-%d-%d-%d.npz' % ((key,) + self.bounds))
+        if path is not None and os.path.exists(path):
+            self.matrix = sparse.load_npz(path).astype(ACCUM_DTYPE,
+                                                        copy=False)
+            return
+        with timer.stage('regrid matrix [%d x %d]' % self.shape):
+            self.matrix = _buildMatrix(lats, lons, xyz, self.bounds)
+        if path is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = '%s.%d.tmp.npz' % (path[:-4], os.getpid())
+            sparse.save_npz(tmp_path, self.matrix)
+            os.replace(tmp_path, path)
+
+    # This method returns the mosaic window the matrix reads from
+    # Inputs: tiles, the TileIndex (or TileStore) of the topo_30s tiles
+    #         fill_value, as for TileIndex.window
+    # Output: a MosaicWindow
+    def window(self, tiles, fill_value=None):
+        if hasattr(tiles, 'readBlock'):     # a TileStore
+            from Tile_Store import StoreWindow
+            return StoreWindow(tiles, *self.bounds, fill_value=fill_value)
+        return MosaicWindow(tiles, *self.bounds, fill_value=fill_value)
+
+    # This method regrids fields on the window onto the model grid
+    # Inputs: fields, an array (rows, cols) of the window shape, or a stack
+    #         (n, rows, cols) of them
+    # Output: an array (ny, nx), or (n, ny, nx) for a stack, in the height
+    #         type of the dtype policy (the averages are summed in float64)
+    def regrid(self, fields):
+        fields = np.asarray(fields)
+        stack = fields.reshape((-1,) + self.window_shape)
+        flat = stack.reshape(len(stack), -1).T.astype(ACCUM_DTYPE)
+        out = (self.matrix @ flat).T.reshape((len(stack),) + self.shape)
+        out = valueArray(out)
+        return out if fields.ndim == 3 else out[0]
+
+
+# every window cell is given to its nearest model centre, then kept only if
+# it lies within half a cell of that centre along the two local grid axes
+def _buildMatrix(lats, lons, xyz, bounds):
+    row0, row1, col0, col1 = bounds
+    ny, nx = lats.shape
+    n_cols = col1 - col0
+    tree = cKDTree(xyz.reshape(-1, 3))
+    # local grid axes of every cell (one cell steps), and the inverse of
+    # their 2 x 2 Gram matrix to split an offset along them
+    e_i = np.gradient(xyz, axis=1).reshape(-1, 3)
+    e_j = np.gradient(xyz, axis=0).reshape(-1, 3)
+    g_ii, g_jj = (e_i * e_i).sum(-1), (e_j * e_j).sum(-1)
+    g_ij = (e_i * e_j).sum(-1)
+    det = g_ii * g_jj - g_ij**2
+
+    cell_lons = colToLon(np.arange(col0, col1))
+    model, raw = [], []
+    for r in range(row0, row1, ROW_CHUNK):
+        rows = np.arange(r, min(r + ROW_CHUNK, row1))
+        pts = latLonToXYZ(np.repeat(rowToLat(rows), n_cols),
+                          np.tile(cell_lons, len(rows)))
+        m = tree.query(pts)[1]
+        d = pts - xyz.reshape(-1, 3)[m]
+        b_i, b_j = (d * e_i[m]).sum(-1), (d * e_j[m]).sum(-1)
+        a_i = (g_jj[m] * b_i - g_ij[m] * b_j) / det[m]
+        a_j = (g_ii[m] * b_j - g_ij[m] * b_i) / det[m]
+        inside = (np.abs(a_i) <= 0.5 + 1e-9) & (np.abs(a_j) <= 0.5 + 1e-9)
+        model.append(m[inside])
+        raw.append(np.flatnonzero(inside) + (r - row0) * n_cols)
+    model, raw = np.concatenate(model), np.concatenate(raw)
+
+    # model cells that hold no window cell centre take the cell under them
+    # (clipped onto the window, for a centre on its very edge)
+    empty = np.flatnonzero(np.bincount(model, minlength=ny * nx) == 0)
+    if len(empty):
+        rows = np.floor((lats.ravel()[empty] - LAT_ORIGIN) * POINTS_PER_DEGREE)
+        cols = np.floor((lons.ravel()[empty] - LON_ORIGIN) * POINTS_PER_DEGREE)
+        rows = np.clip(rows.astype(np.int64) - row0, 0, row1 - row0 - 1)
+        cols = np.clip(cols.astype(np.int64) - col0, 0, n_cols - 1)
+        model, raw = np.r_[model, empty], np.r_[raw, rows * n_cols + cols]
+    counts = np.bincount(model, minlength=ny * nx)
+    weights = (1.0 / counts[model]).astype(ACCUM_DTYPE)
+    return sparse.csr_matrix((weights, (model, raw)),
+                             shape=(ny * nx, (row1 - row0) * n_cols))
+
+
+# This function reads the terrain and cell centres of a geo_em file
+# Inputs: file_path (str), the path of the geo_em netCDF file
+# Outputs: ter, lats, lons, 2D arrays of the model terrain height (m) and
+#          the coordinates of the cell centres
+def readGrid(file_path):
+    from netCDF4 import Dataset
+    from wrf import to_np, getvar, latlon_coords
+    with Dataset(file_path, 'r') as nc:
+        hgt = getvar(nc, 'ter')  # Model terrain height (from wrf-python)
+        lats, lons = latlon_coords(hgt, as_np=True)
+        return valueArray(to_np(hgt)), lats, lons
+
+
+"""
+START OF PROGRAM
+"""
+
+if __name__ == '__main__':
+    from Tile_Index import TileIndex
+
+    tile_dir, geo_files = sys.argv[1], sys.argv[2:]
+    tiles = TileIndex(tile_dir)
+    timer.quiet = False
+    for path in geo_files:
+        ter, lats, lons = readGrid(path)
+        regridder = Regridder(lats, lons)
+        heights = regridder.regrid(regridder.window(tiles).read())
+        output = os.path.basename(path).replace('.nc', '_regridded.npz')
+        np.savez(output, height=heights, lats=lats, lons=lons)
+        diff = heights - ter
+        print('%s: %d x %d cells, %d window cells averaged; regridded - geo_em'
+              ' terrain: bias %.1f m, rmse %.1f m -> %s'
+              % (os.path.basename(path), lats.shape[0], lats.shape[1],
+                 regridder.matrix.nnz, diff.mean(),
+                 np.sqrt((diff**2).mean()), output))
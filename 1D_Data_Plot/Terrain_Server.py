@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: long-lived terrain query server. The topo_30s tile index (every
+         tile memory-mapped) and the geo_em grids (with their triangulations,
+         nearest-point trees and cubic interpolators) are loaded once, and
+         transect, point and statistics queries are then answered from
+         memory by a threaded HTTP server on localhost or on a Unix socket.
+         A notebook or dashboard gets an answer in milliseconds instead of
+         paying for the imports, the tile reads and the geo_em loads on
+         every run.
+
+             GET /grids                                the loaded grid sizes
+             GET /point?lat=50.12,49.3&lon=-122.9,-121 raw and grid heights
+             GET /transect?lat=50.12[&x0=-140&xN=-110]  a latitude transect
+             GET /path?vertices=49.38,-121.44;50.23,-121.58[&spacing=0.5]
+             GET /statistics?lat=50.12[&x0=..&xN=..]   error statistics of a
+                                                       latitude transect
+         every query takes &method=nearest|linear|cubic|bilinear|bicubic
+         (default linear; see Lambert_Grid.py for the last two).
+         The answers are JSON, with null where a height is not known.
+
+         usage: python Terrain_Server.py TILE_DIR GEO_EM_FILE...
+                       [--port 8765 | --socket PATH] [--method linear]
+
+         from a notebook:
+             queryServer(('localhost', 8765), '/transect', lat=50.12)
+             queryServer('/tmp/terrain.sock', '/point', lat=50.12, lon=-123)
+
+Created on Sun Oct 18 12:37:00 2026
+"""
+
+import http.client
+import json
+import os
+import re
+import socket
+import socketserver
+import sys
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from Tile_Index import TileIndex, lonToCol
+from Interp_Cache import InterpCache
+from Lambert_Grid import interpolateGrid
+from Batch_Transects import loadGeoEmFiles
+from Transect_Output import makeTransects
+from Transects import polylinePath, pathTransect, sampleMosaic
+from Terrain_Statistics import transectSummary
+from Pipeline_Timer import timer
+
+PORT = 8765
+X0, XN = -140.0, -110.0        # default longitude range of a transect
+DX = 10.0 / 1200.0             # displacement between adjacent raw points
+GEO_EM_NAME = re.compile(r'^geo_em\.(.+)\.nc$')
+
+
+class TerrainService:
+    """The tiles and geo_em grids of a session, held in memory."""
+
+    # Inputs: tile_dir (str), the directory of the topo_30s tiles
+    #         geo_files, the paths of the geo_em files
+    #         warm, the interpolation methods to prepare at start-up
+    #         cache_dir (str), the directory of the interpolation cache
+    def __init__(self, tile_dir, geo_files, warm=('linear',),
+                 cache_dir='interp_cache'):
+        self.tiles = TileIndex(tile_dir)
+        for origin in self.tiles.paths:
+            self.tiles.tile(origin)
+        self.grids = loadGeoEmFiles(geo_files)
+        self.grid_size = [_gridSize(path) for path in geo_files]
+        self.cache = InterpCache(cache_dir)
+        # the structures of the warm methods are built here, before the
+        # first request; any other method builds its own on first use (the
+        # cache builds each one once, under its lock, while other request
+        # threads wait for it)
+        probe = self.grids[0]['points'][:1] if self.grids else None
+        for method in warm:
+            for g in self.grids:
+                with timer.stage('warm-up %s [%s]' % (method, g['name'])):
+                    interpolateGrid(self.cache, g, probe, method,
+                                    persist=False)
+
+    # one-off query points are not worth a weight file on disk
+    def _interp(self, plot_pts, method):
+        return np.array([interpolateGrid(self.cache, g, plot_pts, method,
+                                         persist=False)
+                         for g in self.grids]).reshape(len(self.grids), -1)
+
+    # This method returns the raw and grid heights at scattered points
+    # Inputs: lats, lons, 1D arrays of the coordinates in degrees
+    #         method (str), 'nearest', 'linear', 'cubic', 'bilinear' or
+    #                       'bicubic'
+    # Output: a dict of the points, 'raw' (n,) and 'interp' (n_grid, n)
+    def point(self, lats, lons, method='linear'):
+        lats, lons = np.broadcast_arrays(np.atleast_1d(lats),
+                                         np.atleast_1d(lons))
+        return {'latitude': lats, 'longitude': lons,
+                'raw': sampleMosaic(self.tiles, lats, lons, np.nan),
+                'grid_size': self.grid_size,
+                'interp': self._interp(np.column_stack([lats, lons]), method),
+                'method': method}
+
+    # This method returns the transect along one latitude
+    # Inputs: latitude (float), x0, xN, the latitude and longitude range
+    #         method (str), 'nearest', 'linear', 'cubic', 'bilinear' or
+    #                       'bicubic'
+    # Output: the transects dict (see Transect_Output.py) of the latitude
+    def transect(self, latitude, x0=X0, xN=XN, method='linear'):
+        window = self.tiles.window(latitude, latitude, x0, xN)
+        rawElev = window.read()[0]
+        lons = x0 + (np.arange(window.col0, window.col1) - lonToCol(x0)) * DX
+        plot_pts = np.column_stack([np.full(len(lons), latitude), lons])
+        return makeTransects(latitude, lons, rawElev, self.grid_size,
+                             self._interp(plot_pts, method), method)
+
+    # This method returns the transect along a polyline
+    # Inputs: vertices, a sequence of (lat, lon) points in degrees
+    #         spacing (float), the distance between samples in km
+    #         method (str), 'nearest', 'linear', 'cubic', 'bilinear' or
+    #                       'bicubic'
+    # Output: the path transect dict (see Transects.py)
+    def path(self, vertices, spacing=0.5, method='linear'):
+        lats, lons, distance = polylinePath(vertices, spacing)
+        return pathTransect(self.tiles, self.grids, self.grid_size, lats,
+                            lons, distance, method, self.cache, persist=False)
+
+    # This method returns the error statistics of a latitude transect
+    # Output: the summary dict of Terrain_Statistics.transectSummary
+    def statistics(self, latitude, x0=X0, xN=XN, method='linear'):
+        return transectSummary(self.transect(latitude, x0, xN, method))
+
+
+# the grid size of a geo_em file is read from its name (geo_em.<size>.nc)
+def _gridSize(file_path):
+    name = os.path.basename(file_path)
+    match = GEO_EM_NAME.match(name)
+    return match.group(1) if match else name
+
+
+# This function turns the arrays of an answer into JSON lists, with null for
+# NaN (which JSON has no literal for)
+def toJSON(answer):
+    def convert(value):
+        if isinstance(value, dict):
+            return {k: convert(v) for k, v in value.items()}
+        arr = np.asarray(value)
+        if arr.dtype.kind == 'f':
+            return np.where(np.isfinite(arr), arr.astype(object), None).tolist()
+        return arr.tolist()
+    return json.dumps(convert(answer))
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Answers the GET queries of one connection from the TerrainService."""
+
+    # query name -> function of (service, parsed query arguments)
+    ROUTES = {
+        '/grids': lambda s, q: {'grid_size': s.grid_size,
+                                'files': [g['name'] for g in s.grids]},
+        '/point': lambda s, q: s.point(_floats(q, 'lat'), _floats(q, 'lon'),
+                                       _method(q)),
+        '/transect': lambda s, q: s.transect(_float(q, 'lat'),
+                                             _float(q, 'x0', X0),
+                                             _float(q, 'xN', XN), _method(q)),
+        '/path': lambda s, q: s.path(
+            [[float(x) for x in v.split(',')]
+             for v in _arg(q, 'vertices').split(';')],
+            _float(q, 'spacing', 0.5), _method(q)),
+        '/statistics': lambda s, q: s.statistics(_float(q, 'lat'),
+                                                 _float(q, 'x0', X0),
+                                                 _float(q, 'xN', XN),
+                                                 _method(q)),
+    }
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        route = self.ROUTES.get(url.path)
+        if route is None:
+            return self._reply(404, {'error': 'unknown query %s' % url.path})
+        query = urllib.parse.parse_qs(url.query)
+        try:
+            with timer.stage('query %s' % url.path):
+                answer = route(self.server.service, query)
+        except (KeyError, ValueError, IOError) as err:
+            return self._reply(400, {'error': str(err)})
+        except Exception as err:
+            # any other failure still gets a JSON answer, not a dropped
+            # connection
+            self.log_error('query %s failed: %r', self.path, err)
+            return self._reply(500, {'error': '%s: %s'
+                                     % (type(err).__name__, err)})
+        self._reply(200, answer)
+
+    def _reply(self, status, answer):
+        body = toJSON(answer).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # a Unix socket peer has no address
+    def address_string(self):
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        timer.log(self.address_string(), format % args)
+
+
+def _arg(query, name, default=None):
+    if name in query:
+        return query[name][0]
+    if default is None:
+        raise ValueError('missing query argument: %s' % name)
+    return default
+
+def _float(query, name, default=None):
+    return float(_arg(query, name, default))
+
+def _floats(query, name):
+    return np.array([float(x) for x in _arg(query, name).split(',')])
+
+def _method(query):
+    method = _arg(query, 'method', 'linear')
+    if method not in ('nearest', 'linear', 'cubic', 'bilinear',
+                      'bicubic'):
+        raise ValueError('unknown interpolation method: %s' % method)
+    return method
+
+
+# the default backlog of 5 pending connections makes bursts of concurrent
+# queries wait on connection retries
+BACKLOG = 128
+
+
+class TerrainHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server on localhost."""
+    request_queue_size = BACKLOG
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn,
+                     socketserver.UnixStreamServer):
+    """Threaded HTTP server on a Unix socket."""
+    daemon_threads = True
+    request_queue_size = BACKLOG
+
+
+# This function creates the server of a TerrainService
+# Inputs: service, the TerrainService
+#         address, ('localhost', port) for HTTP, or the path of a Unix socket
+# Output: the server; call serve_forever() to answer queries
+def makeServer(service, address=('localhost', PORT)):
+    if isinstance(address, str):
+        if os.path.exists(address):
+            os.remove(address)      # left behind by a previous server
+        server = UnixHTTPServer(address, RequestHandler)
+    else:
+        server = TerrainHTTPServer(address, RequestHandler)
+    server.service = service
+    return server
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__('localhost')
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+# This function sends one query to a running server
+# Inputs: address, the server address as for makeServer
+#         query (str), e.g. '/transect'
+#         params, the query arguments, e.g. lat=50.12, method='cubic'
+# Output: the decoded JSON answer (lists, None where a height is not known)
+def queryServer(address, query, **params):
+    if isinstance(address, str):
+        connection = _UnixConnection(address)
+    else:
+        connection = http.client.HTTPConnection(*address)
+    try:
+        connection.request('GET', query + '?' + urllib.parse.urlencode(params))
+        response = connection.getresponse()
+        answer = json.loads(response.read())
+    finally:
+        connection.close()
+    if response.status != 200:
+        raise ValueError(answer.get('error', 'query failed'))
+    return answer
+
+
+"""
+START OF PROGRAM
+"""
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    options = {'--port': str(PORT), '--socket': None, '--method': 'linear'}
+    for flag in options:
+        if flag in args:
+            k = args.index(flag)
+            options[flag] = args[k + 1]
+            del args[k:k + 2]
+    tile_dir, geo_files = args[0], args[1:]
+    address = options['--socket'] or ('localhost', int(options['--port']))
+
+    timer.quiet = False
+    service = TerrainService(tile_dir, geo_files, warm=(options['--method'],))
+    server = makeServer(service, address)
+    timer.log('Serving %d tiles and %d grids on' % (len(service.tiles),
+                                                    len(service.grids)),
+              address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if isinstance(address, str) and os.path.exists(address):
+            os.remove(address)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: error statistics of smoothed (WPS grid) terrain against the raw
+         topo_30s heights, for many transects and grid sizes at once. For
+         every transect and grid size:
+
+             bias          mean of (grid - raw)                        m
+             rmse          root mean square of (grid - raw)            m
+             max_abs       largest |grid - raw|                        m
+             peak_loss     highest raw point minus highest grid point  m
+             valley_fill   lowest grid point minus lowest raw point    m
+             relief_ratio  (max - min) of grid over (max - min) of raw
+             points        points where both heights are known
+
+         Points where either height is NaN (outside a grid) are left out.
+         The statistics of all the transects are reduced to one row per
+         grid size (rmse over all points, max_abs over all transects, the
+         others averaged), so thousands of transects give one small table.
+
+         usage: python Terrain_Statistics.py TRANSECT_FILE... [--output FILE]
+
+Created on Sun Oct 18 12:32:48 2026
+"""
+
+import sys
+import numpy as np
+from Transect_Output import readTransects
+
+STATISTICS = ('bias', 'rmse', 'max_abs', 'peak_loss', 'valley_fill',
+              'relief_ratio', 'points')
+
+
+# This function computes the error statistics of every transect and grid
+# Inputs: raw, an array (n_transect, n_point) of raw heights
+#         interp, an array (n_transect, n_grid, n_point) of grid heights
+# Output: a dict of arrays (n_transect, n_grid), one per statistic
+def transectStatistics(raw, interp):
+    raw = np.asarray(raw, dtype=np.float64)[:, None, :]
+    interp = np.asarray(interp, dtype=np.float64)
+    valid = np.isfinite(raw) & np.isfinite(interp)
+    points = valid.sum(axis=-1)
+    n = np.where(points > 0, points, 1)
+    err = np.where(valid, interp - raw, 0.0)
+    stats = {'bias': err.sum(axis=-1) / n,
+             'rmse': np.sqrt((err**2).sum(axis=-1) / n),
+             'max_abs': np.abs(err).max(axis=-1),
+             'points': points}
+    raw_max = np.where(valid, raw, -np.inf).max(axis=-1)
+    raw_min = np.where(valid, raw, np.inf).min(axis=-1)
+    grid_max = np.where(valid, interp, -np.inf).max(axis=-1)
+    grid_min = np.where(valid, interp, np.inf).min(axis=-1)
+    with np.errstate(invalid='ignore'):  # inf - inf where points == 0
+        stats['peak_loss'] = raw_max - grid_max
+        stats['valley_fill'] = grid_min - raw_min
+        relief = raw_max - raw_min
+        stats['relief_ratio'] = (grid_max - grid_min) / \
+            np.where(relief > 0, relief, np.nan)
+    for name in STATISTICS[:-1]:
+        stats[name] = np.where(points > 0, stats[name], np.nan)
+    return stats
+
+
+# This function reduces the statistics of many transects to one row per grid
+# Inputs: stats, the dict returned by transectStatistics
+# Output: a dict of arrays (n_grid,), one per statistic, plus 'transects'
+def summarize(stats):
+    points = stats['points']
+    used = points > 0
+    total = points.sum(axis=0)
+    transects = used.sum(axis=0)
+    # point-weighted means for bias and rmse, plain means over the transects
+    # for the extremes
+    mean = lambda s, w, n: (np.where(used, s, 0.0) * w).sum(axis=0) / \
+        np.where(n > 0, n, 1)
+    summary = {'bias': mean(stats['bias'], points, total),
+               'rmse': np.sqrt(mean(stats['rmse']**2, points, total)),
+               'max_abs': np.where(used, stats['max_abs'],
+                                   -np.inf).max(axis=0)}
+    for name in ('peak_loss', 'valley_fill', 'relief_ratio'):
+        summary[name] = mean(np.nan_to_num(stats[name]), 1, transects)
+    for name in summary:
+        summary[name] = np.where(transects > 0, summary[name], np.nan)
+    summary['points'] = total
+    summary['transects'] = transects
+    return summary
+
+
+# This function computes the summary statistics of a set of transects
+# Inputs: transects, a transects dict (see Transect_Output.py) or a path
+#         transect dict (see Transects.py)
+# Output: the summary dict of summarize, with the 'grid_size' of each row
+def transectSummary(transects):
+    raw, interp = transects['raw'], transects['interp']
+    if np.ndim(raw) == 1:      # a single path transect
+        raw, interp = raw[None], interp[None]
+    summary = summarize(transectStatistics(raw, interp))
+    summary['grid_size'] = np.asarray(transects['grid_size'])
+    return summary
+
+
+# This function computes the statistics of whole fields (e.g. a smoothed
+# mosaic, or geo_em terrain sampled on the raw grid) against the raw field
+# Inputs: raw, a 2D array of raw heights
+#         smoothed, an array (n_grid, rows, cols) or (rows, cols) of heights
+# Output: the statistics dict of transectStatistics, of one transect
+def fieldStatistics(raw, smoothed):
+    smoothed = np.asarray(smoothed)
+    if smoothed.ndim == 2:
+        smoothed = smoothed[None]
+    return transectStatistics(np.ravel(raw)[None],
+                              smoothed.reshape(1, smoothed.shape[0], -1))
+
+
+# This function formats a summary as a table, one row per grid size
+# Output: the table (str), comma separated with a header line
+def summaryTable(summary):
+    columns = ['grid_size'] + list(STATISTICS) + ['transects']
+    lines = [','.join(columns)]
+    for g, size in enumerate(summary['grid_size']):
+        row = [str(size)] + ['%.6g' % summary[name][g]
+                             for name in columns[1:]]
+        lines.append(','.join(row))
+    return '\n'.join(lines)
+
+
+"""
+START OF PROGRAM
+"""
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    output = None
+    if '--output' in args:
+        k = args.index('--output')
+        output = args[k + 1]
+        del args[k:k + 2]
+
+    # transects read from several files are pooled, as long as they share
+    # the grid sizes
+    sets = [readTransects(path) for path in args]
+    raw = np.concatenate([np.atleast_2d(t['raw']) for t in sets])
+    interp = np.concatenate([t['interp'] if np.ndim(t['raw']) == 2
+                             else t['interp'][None] for t in sets])
+    summary = summarize(transectStatistics(raw, interp))
+    summary['grid_size'] = sets[0]['grid_size']
+
+    table = summaryTable(summary)
+    print(table)
+    if output is not None:
+        with open(output, 'w') as table_file:
+            table_file.write(table + '\n')
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: spatial index over a directory of topo_30s tiles. The tile names
+         (e.g. 06001-07200.16801-18000) encode the global 30-arc-second
+         column and row ranges of each tile, counted from 180 W and 90 S.
+         The index maps a lat/lon bounding box to the tiles it covers and
+         hands back a mosaic window that only reads the tiles (and the rows
+         and columns of those tiles) it actually touches.
+
+Created on Sun Oct 18 11:00:00 2026
+"""
+
+import math
+import os
+import re
+import numpy as np
+from Tile_Reader import TILE_SIZE, HALO, binaryTo2DArray, readTileWindow
+
+POINTS_PER_DEGREE = 120       # 30 arc-second points per degree
+GLOBAL_COLS = 360 * POINTS_PER_DEGREE
+GLOBAL_ROWS = 180 * POINTS_PER_DEGREE
+LON_ORIGIN = -180.0           # western edge of global column 0
+LAT_ORIGIN = -90.0            # southern edge of global row 0
+
+TILE_NAME = re.compile(r'^(\d{5})-(\d{5})\.(\d{5})-(\d{5})$')
+
+
+# This function parses a topo_30s tile file name
+# Inputs: name (str), the tile file name, e.g. '06001-07200.16801-18000'
+# Output: (row0, col0), the global index of the south-west interior point
+#         of the tile (0-based), or None if the name is not a tile name
+def parseTileName(name):
+    match = TILE_NAME.match(name)
+    if match is None:
+        return None
+    col0, col1, row0, row1 = [int(g) for g in match.groups()]
+    if col1 - col0 + 1 != TILE_SIZE or row1 - row0 + 1 != TILE_SIZE:
+        return None
+    return (row0 - 1, col0 - 1)
+
+
+# This function returns the topo_30s tile name of a tile
+# Inputs: row0, col0, the global index of the south-west interior point
+# Output: the tile file name (str)
+def tileName(row0, col0):
+    return '%05d-%05d.%05d-%05d' % (col0 + 1, col0 + TILE_SIZE,
+                                    row0 + 1, row0 + TILE_SIZE)
+
+
+# These functions convert between degrees and global 30-arc-second indices
+# (rows go from south to north, columns from west to east) and return
+# the coordinates of the centre of a cell
+def lonToCol(lon):
+    return int(math.floor((lon - LON_ORIGIN) * POINTS_PER_DEGREE))
+
+def latToRow(lat):
+    return int(math.floor((lat - LAT_ORIGIN) * POINTS_PER_DEGREE))
+
+def colToLon(col):
+    return LON_ORIGIN + (np.asarray(col) + 0.5) / POINTS_PER_DEGREE
+
+def rowToLat(row):
+    return LAT_ORIGIN + (np.asarray(row) + 0.5) / POINTS_PER_DEGREE
+
+
+# This function returns the global index range of the cells that intersect
+# a bounding box (minimum edges included, maximum edges excluded); a box of
+# zero height or width covers the single cell that contains it
+# Inputs: lat_min, lat_max, lon_min, lon_max, the bounding box in degrees
+# Output: (row0, row1, col0, col1), half-open global index ranges
+def boxToIndices(lat_min, lat_max, lon_min, lon_max):
+    row0 = latToRow(lat_min)
+    col0 = lonToCol(lon_min)
+    row1 = int(math.ceil((lat_max - LAT_ORIGIN) * POINTS_PER_DEGREE))
+    col1 = int(math.ceil((lon_max - LON_ORIGIN) * POINTS_PER_DEGREE))
+    return (row0, max(row1, row0 + 1), col0, max(col1, col0 + 1))
+
+
+# This function turns a run of consecutive indices into a slice, so that
+# reading it from a memory-mapped tile is a view rather than a gather
+# Inputs: idx, a 1D array of indices
+# Output: a slice when idx is consecutive and ascending, otherwise idx
+def _asIndex(idx):
+    if len(idx) > 0 and idx[-1] - idx[0] == len(idx) - 1 and \
+            np.all(np.diff(idx) == 1):
+        return slice(int(idx[0]), int(idx[-1]) + 1)
+    return idx
+
+
+# This function returns the type of the heights read with a fill value: the
+# tiles' int16, promoted to hold fill_value (e.g. float32 for np.nan)
+# Inputs: fill_value, the height of points with no tile data, or None
+# Output: a numpy dtype
+def fillType(fill_value):
+    if fill_value is None:
+        return np.dtype(np.int16)
+    return np.result_type(np.int16, np.min_scalar_type(fill_value))
+
+
+class TileIndex:
+    """Index of the topo_30s tiles found in one directory."""
+
+    # Inputs: tile_dir (str), the directory holding the binary tile files
+    def __init__(self, tile_dir):
+        self.tile_dir = tile_dir
+        self.paths = dict()     # (row0, col0) -> path of the tile file
+        for name in sorted(os.listdir(tile_dir)):
+            origin = parseTileName(name)
+            if origin is not None:
+                self.paths[origin] = os.path.join(tile_dir, name)
+        self._tiles = dict()    # memory-mapped tiles opened so far
+
+    def __len__(self):
+        return len(self.paths)
+
+    # This method memory-maps a tile (halo included) the first time it is used
+    # Inputs: origin, the (row0, col0) key of the tile
+    # Output: the 1206 x 1206 memory-mapped tile
+    def tile(self, origin):
+        if origin not in self._tiles:
+            self._tiles[origin] = binaryTo2DArray(self.paths[origin])
+        return self._tiles[origin]
+
+    # This method lists the tiles covering a global index range
+    # Inputs: row0, row1, col0, col1, half-open global index ranges
+    # Output: list of the (row0, col0) keys of every tile in the range,
+    #         whether or not the tile file exists in the directory
+    def tilesInRange(self, row0, row1, col0, col1):
+        tile_rows = range(row0 // TILE_SIZE, (row1 - 1) // TILE_SIZE + 1)
+        tile_cols = range(col0 // TILE_SIZE, (col1 - 1) // TILE_SIZE + 1)
+        return [(tr * TILE_SIZE, tc * TILE_SIZE)
+                for tr in tile_rows for tc in tile_cols]
+
+    # This method lists the tile files covering a lat/lon bounding box
+    # Inputs: lat_min, lat_max, lon_min, lon_max, the bounding box in degrees
+    # Output: list of the paths of the tiles found in the directory
+    def tilesCovering(self, lat_min, lat_max, lon_min, lon_max):
+        origins = self.tilesInRange(*boxToIndices(lat_min, lat_max,
+                                                  lon_min, lon_max))
+        return [self.paths[o] for o in origins if o in self.paths]
+
+    # This method reads the heights at scattered global grid points, reading
+    # only the tiles (and the pages of them) the points fall in
+    # Inputs: rows, cols, integer arrays (of the same shape) of global indices
+    #         fill_value, the height given to points with no tile data;
+    #                     None raises an IOError instead
+    # Output: an array of heights of the shape of rows (int16, or the type
+    #         of fill_value when it is a float)
+    def gather(self, rows, cols, fill_value=None):
+        rows, cols = np.broadcast_arrays(np.asarray(rows, dtype=np.int64),
+                                         np.asarray(cols, dtype=np.int64))
+        out = np.full(rows.shape, 0 if fill_value is None else fill_value,
+                      dtype=fillType(fill_value))
+        keys = (rows // TILE_SIZE) * (GLOBAL_COLS // TILE_SIZE) + \
+            cols // TILE_SIZE
+        missing = []
+        for key in np.unique(keys):
+            at = keys == key
+            origin = (int(key // (GLOBAL_COLS // TILE_SIZE)) * TILE_SIZE,
+                      int(key % (GLOBAL_COLS // TILE_SIZE)) * TILE_SIZE)
+            if origin not in self.paths:
+                missing.append(tileName(*origin))
+                continue
+            out[at] = self.tile(origin)[rows[at] - origin[0] + HALO,
+                                        cols[at] - origin[1] + HALO]
+        if missing and fill_value is None:
+            raise IOError('missing topo_30s tiles in %s: %s'
+                          % (self.tile_dir, ', '.join(missing)))
+        return out
+
+    # This method returns a lazily assembled mosaic over a bounding box
+    # Inputs: lat_min, lat_max, lon_min, lon_max, the bounding box in degrees
+    #         fill_value, the height given to points with no tile data;
+    #                     None raises an IOError instead
+    # Output: a MosaicWindow
+    def window(self, lat_min, lat_max, lon_min, lon_max, fill_value=None):
+        return MosaicWindow(self, *boxToIndices(lat_min, lat_max,
+                                                lon_min, lon_max),
+                            fill_value=fill_value)
+
+
+class MosaicWindow:
+    """A rectangular window of the global topo_30s mosaic.
+
+    Nothing is read until the window is indexed; indexing only reads the
+    tiles, rows and columns it touches. Rows go from south to north. Points
+    outside every tile interior are taken from the halo of a neighbouring
+    tile when one is present, so windows may extend up to three points past
+    the edge of the available tiles.
+    """
+
+    # Inputs: index, the TileIndex the window reads from
+    #         row0, row1, col0, col1, half-open global index ranges
+    #         fill_value, the height given to points with no tile data
+    def __init__(self, index, row0, row1, col0, col1, fill_value=None):
+        self.index = index
+        self.row0, self.row1 = row0, row1
+        self.col0, self.col1 = col0, col1
+        self.fill_value = fill_value
+        self.shape = (row1 - row0, col1 - col0)
+        self.lats = rowToLat(np.arange(row0, row1))    # cell centres
+        self.lons = colToLon(np.arange(col0, col1))
+
+    def __array__(self, dtype=None, copy=None):
+        arr = self.read()
+        return arr if dtype is None else arr.astype(dtype)
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key, slice(None))
+        rows = np.arange(self.row0, self.row1)[key[0]]
+        cols = np.arange(self.col0, self.col1)[key[1]]
+        arr = self.readPoints(np.atleast_1d(rows), np.atleast_1d(cols))
+        if np.ndim(rows) == 0 and np.ndim(cols) == 0:
+            return arr[0, 0]
+        if np.ndim(rows) == 0:
+            return arr[0]
+        if np.ndim(cols) == 0:
+            return arr[:, 0]
+        return arr
+
+    # This method reads the whole window
+    # Output: a native array of shape self.shape (int16, or the type of
+    #         fill_value when it is a float)
+    def read(self):
+        return self.readPoints(np.arange(self.row0, self.row1),
+                               np.arange(self.col0, self.col1))
+
+    # This method reads the outer product of global rows and columns
+    # Inputs: rows, cols, 1D arrays of global indices
+    # Output: a native array of shape (len(rows), len(cols)) (int16, or the
+    #         type of fill_value when it is a float)
+    def readPoints(self, rows, cols):
+        out = np.zeros((len(rows), len(cols)), dtype=fillType(self.fill_value))
+        filled = np.zeros(out.shape, dtype=bool)
+        if len(rows) == 0 or len(cols) == 0:
+            return out
+        origins = self.index.tilesInRange(rows.min() - HALO,
+                                          rows.max() + HALO + 1,
+                                          cols.min() - HALO,
+                                          cols.max() + HALO + 1)
+        origins = [o for o in origins if o in self.index.paths]
+
+        # interiors first, then the halos for points no interior covers
+        for halo in (0, HALO):
+            for (r0, c0) in origins:
+                r_in = (rows >= r0 - halo) & (rows < r0 + TILE_SIZE + halo)
+                c_in = (cols >= c0 - halo) & (cols < c0 + TILE_SIZE + halo)
+                if not (r_in.any() and c_in.any()):
+                    continue
+                # a block of consecutive points is a view, not a gather
+                sel = (_asIndex(np.flatnonzero(r_in)),
+                       _asIndex(np.flatnonzero(c_in)))
+                if not (isinstance(sel[0], slice) and
+                        isinstance(sel[1], slice)):
+                    sel = np.ix_(r_in, c_in)
+                todo = ~filled[sel]
+                if not todo.any():
+                    continue
+                tile = self.index.tile((r0, c0))
+                block = readTileWindow(tile, _asIndex(rows[r_in] - r0 + HALO),
+                                       _asIndex(cols[c_in] - c0 + HALO))
+                if todo.all():
+                    out[sel] = block
+                else:
+                    out[sel] = np.where(todo, block, out[sel])
+                filled[sel] = True
+            if filled.all():
+                return out
+
+        if self.fill_value is None:
+            missing = self.index.tilesInRange(rows[~filled.all(1)].min(),
+                                              rows[~filled.all(1)].max() + 1,
+                                              cols[~filled.all(0)].min(),
+                                              cols[~filled.all(0)].max() + 1)
+            missing = [tileName(*o) for o in missing
+                       if o not in self.index.paths]
+            raise IOError('missing topo_30s tiles in %s: %s'
+                          % (self.index.tile_dir, ', '.join(missing)))
+        out[~filled] = self.fill_value
+        return out
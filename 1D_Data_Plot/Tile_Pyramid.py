@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: multi-resolution pyramid of the topo_30s mosaic. Every tile is
+         block-averaged by a set of factors (2, 4, 8, 16, 30, 60 and 120 by
+         default: the factors must divide the 1200-point tile, so 30, 60 and
+         120 stand in for 32, 64 and 128) and each overview is stored as its
+         own small .npy file, one level directory per factor:
+
+             <pyramid_dir>/pyramid.json        factors and source tile stamps
+             <pyramid_dir>/level_016/<tile name>.npy     75 x 75 float32
+
+         The pyramid is built incrementally: only tiles that are new or have
+         changed since the last build are averaged again. A reader picks the
+         coarsest level that still resolves a model grid size and assembles
+         a window of it, so a comparison with the 27 - 108 km geo_em grids
+         reads kilobytes instead of whole tiles.
+
+         usage: python Tile_Pyramid.py TILE_DIR PYRAMID_DIR [FACTOR,...]
+
+Created on Sun Oct 18 21:00:00 2026
+"""
+
+import json
+import math
+import os
+import sys
+import numpy as np
+from Tile_Reader import TILE_SIZE, readTile
+from Tile_Index import (TileIndex, tileName, boxToIndices, LAT_ORIGIN,
+                        LON_ORIGIN, POINTS_PER_DEGREE)
+
+FACTORS = (2, 4, 8, 16, 30, 60, 120)
+ROW_SPACING_KM = 2 * math.pi * 6371.0 / (360 * POINTS_PER_DEGREE)
+MANIFEST = 'pyramid.json'
+
+
+# This function block-averages a 2D array
+# Inputs: arr, a 2D array whose sides are multiples of factor
+#         factor (int), the side of the averaged blocks
+# Output: a float32 array of shape (rows / factor, cols / factor)
+def blockAverage(arr, factor):
+    rows, cols = arr.shape
+    blocks = np.asarray(arr, dtype=np.float32).reshape(
+        rows // factor, factor, cols // factor, factor)
+    return blocks.mean(axis=(1, 3), dtype=np.float64).astype(np.float32)
+
+
+# This function returns the directory of one level of a pyramid
+def levelDir(pyramid_dir, factor):
+    return os.path.join(pyramid_dir, 'level_%03d' % factor)
+
+
+# This function builds or updates the pyramid of a tile directory
+# Inputs: tile_dir (str), the directory of the topo_30s tiles
+#         pyramid_dir (str), the directory of the pyramid (created if needed)
+#         factors, the averaging factors (each must divide 1200)
+#         log, a function called with each tile name as it is built
+# Output: the list of the names of the tiles (re)built
+def buildPyramid(tile_dir, pyramid_dir, factors=FACTORS, log=None):
+    factors = sorted(set(int(f) for f in factors))
+    for f in factors:
+        if TILE_SIZE % f:
+            raise ValueError('factor %d does not divide the %d-point tile'
+                             % (f, TILE_SIZE))
+        os.makedirs(levelDir(pyramid_dir, f), exist_ok=True)
+    manifest = _readManifest(pyramid_dir)
+    if manifest.get('factors') != factors:
+        manifest = {'factors': factors, 'tiles': dict()}  # rebuild everything
+
+    built = []
+    for origin, path in sorted(TileIndex(tile_dir).paths.items()):
+        name = tileName(*origin)
+        stat = os.stat(path)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        if manifest['tiles'].get(name) == stamp and all(
+                os.path.exists(_levelFile(pyramid_dir, f, name))
+                for f in factors):
+            continue
+        interior = np.asarray(readTile(path), dtype=np.float32)
+        for f in factors:
+            _saveAtomic(_levelFile(pyramid_dir, f, name),
+                        blockAverage(interior, f))
+        manifest['tiles'][name] = stamp
+        # the manifest is updated after each tile, so an interrupted build
+        # resumes where it stopped
+        _writeManifest(pyramid_dir, manifest)
+        built.append(name)
+        if log is not None:
+            log(name)
+    return built
+
+
+def _levelFile(pyramid_dir, factor, name):
+    return os.path.join(levelDir(pyramid_dir, factor), name + '.npy')
+
+def _readManifest(pyramid_dir):
+    path = os.path.join(pyramid_dir, MANIFEST)
+    if not os.path.exists(path):
+        return dict()
+    with open(path) as manifest_file:
+        return json.load(manifest_file)
+
+def _writeManifest(pyramid_dir, manifest):
+    path = os.path.join(pyramid_dir, MANIFEST)
+    with open(path + '.tmp', 'w') as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(path + '.tmp', path)
+
+def _saveAtomic(path, arr):
+    with open(path + '.tmp', 'wb') as npy_file:
+        np.save(npy_file, arr)
+    os.replace(path + '.tmp', path)
+
+
+class TilePyramid:
+    """Reader of the block-averaged levels of a topo_30s pyramid."""
+
+    # Inputs: pyramid_dir (str), the directory written by buildPyramid
+    def __init__(self, pyramid_dir):
+        self.pyramid_dir = pyramid_dir
+        manifest = _readManifest(pyramid_dir)
+        if not manifest:
+            raise IOError('no topo_30s pyramid in %s' % pyramid_dir)
+        self.factors = manifest['factors']
+        self.tiles = set(manifest['tiles'])
+
+    # This method picks the coarsest level that still resolves a grid size,
+    # i.e. whose cells are at most 1 / oversample of the grid spacing
+    # Inputs: grid_km (float), the model grid spacing in km
+    #         oversample (float), level cells wanted per model grid cell
+    # Output: the averaging factor of the level (1 for the raw tiles)
+    def levelFor(self, grid_km, oversample=2.0):
+        fits = [f for f in self.factors
+                if f * ROW_SPACING_KM <= grid_km / oversample]
+        return max(fits) if fits else 1
+
+    # This method reads a window of one level
+    # Inputs: lat_min, lat_max, lon_min, lon_max, the bounding box in degrees
+    #         factor (int), the level to read (see levelFor)
+    #         fill_value, the height given to cells with no tile data
+    # Outputs: heights, a float32 array (rows south to north)
+    #          lats, lons, the coordinates of the centres of its cells
+    def window(self, lat_min, lat_max, lon_min, lon_max, factor,
+               fill_value=np.nan):
+        if factor not in self.factors:
+            raise ValueError('no level %d in %s' % (factor, self.pyramid_dir))
+        row0, row1, col0, col1 = boxToIndices(lat_min, lat_max,
+                                              lon_min, lon_max)
+        # level indices of the cells overlapping the box
+        row0, col0 = row0 // factor, col0 // factor
+        row1, col1 = -(-row1 // factor), -(-col1 // factor)
+        side = TILE_SIZE // factor
+        heights = np.full((row1 - row0, col1 - col0), fill_value,
+                          dtype=np.float32)
+        for tr in range(row0 // side, (row1 - 1) // side + 1):
+            for tc in range(col0 // side, (col1 - 1) // side + 1):
+                name = tileName(tr * TILE_SIZE, tc * TILE_SIZE)
+                if name not in self.tiles:
+                    continue
+                level = np.load(_levelFile(self.pyramid_dir, factor, name),
+                                mmap_mode='r')
+                r0, r1 = max(row0, tr * side), min(row1, (tr + 1) * side)
+                c0, c1 = max(col0, tc * side), min(col1, (tc + 1) * side)
+                heights[r0 - row0:r1 - row0, c0 - col0:c1 - col0] = \
+                    level[r0 - tr * side:r1 - tr * side,
+                          c0 - tc * side:c1 - tc * side]
+        step = float(factor) / POINTS_PER_DEGREE
+        lats = LAT_ORIGIN + (np.arange(row0, row1) + 0.5) * step
+        lons = LON_ORIGIN + (np.arange(col0, col1) + 0.5) * step
+        return heights, lats, lons
+
+    # This method reads a window at the level that suits a model grid size
+    # Inputs: lat_min, lat_max, lon_min, lon_max, the bounding box in degrees
+    #         grid_km (float), the model grid spacing in km
+    # Outputs: heights, lats, lons as for window, and the factor used
+    def windowForGrid(self, lat_min, lat_max, lon_min, lon_max, grid_km,
+                      fill_value=np.nan):
+        factor = self.levelFor(grid_km)
+        if factor == 1:
+            raise ValueError('the %g km grid needs the raw tiles' % grid_km)
+        return self.window(lat_min, lat_max, lon_min, lon_max, factor,
+                           fill_value) + (factor,)
+
+
+"""
+START OF PROGRAM
+"""
+
+if __name__ == '__main__':
+    tile_dir, pyramid_dir = sys.argv[1], sys.argv[2]
+    factors = ([int(f) for f in sys.argv[3].split(',')]
+               if len(sys.argv) > 3 else FACTORS)
+    built = buildPyramid(tile_dir, pyramid_dir, factors,
+                         log=lambda name: print('Built', name))
+    print('%d tiles built, pyramid in %s' % (len(built), pyramid_dir))
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: shared reader for the geogrid topo_30s binary tiles. Each tile is a
+         1206 x 1206 array of big-endian signed short integers (1200 x 1200
+         interior points plus a 3-cell halo on every side). The tiles are
+         memory-mapped, so nothing is read from disk until a row or column
+         is actually indexed, and stripping the halo is a view, not a copy.
+
+Created on Sun Oct 18 10:00:00 2026
+"""
+
+import numpy as np
+
+TILE_SIZE = 1200                      # interior points per tile side
+HALO = 3                              # halo width on every side of a tile
+TILE_DIM = TILE_SIZE + 2 * HALO       # points per tile side stored on disk
+TILE_DTYPE = np.dtype('>i2')          # big-endian short int of size 2 bytes
+
+
+# This function memory-maps a binary tile as a 2D array of signed integers
+# Inputs: str, the path of the binary file
+# Output: arr, a read-only 1206 x 1206 memory-mapped array (halo included)
+#         of big-endian int16; rows go from south to north
+def binaryTo2DArray(file_path):
+    return np.memmap(file_path, dtype=TILE_DTYPE, mode='r',
+                     shape=(TILE_DIM, TILE_DIM))
+
+
+# This function removes the halo columns and rows of a tile
+# Inputs: arr, a 1206 x 1206 tile array
+#         halo (int), number of halo cells to keep on every side (0 - 3)
+# Output: a view of the 1200 x 1200 interior (plus the halo kept), no copy
+def stripHalo(arr, halo=0):
+    cut = HALO - halo
+    if cut == 0:
+        return arr
+    return arr[cut:-cut, cut:-cut]
+
+
+# This function memory-maps a tile and strips its halo
+# Inputs: str, the path of the binary file
+#         halo (int), number of halo cells to keep on every side (0 - 3)
+# Output: a read-only view of the tile interior
+def readTile(file_path, halo=0):
+    return stripHalo(binaryTo2DArray(file_path), halo)
+
+
+# This function converts the part of a tile touched by a query into a
+# native-endian int16 array; only these rows and columns are read from disk
+# Inputs: tile, a memory-mapped tile (or a view of one)
+#         rows, cols, slices or 1D index arrays; the block read is their
+#                     outer product (all the columns of every row)
+# Output: a native int16 array of shape (len(rows), len(cols))
+def readTileWindow(tile, rows, cols):
+    # the rows are taken first, so a slice of rows stays a view of the map
+    return np.asarray(tile[rows][:, cols], dtype=np.int16)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: chunked, compressed store of the topo_30s mosaic. The tiles of a
+         directory are converted once into a single netCDF4 (HDF5) file
+         holding the global 30-arc-second grid as one int16 variable, cut
+         into 240 x 240 chunks compressed with zlib (shuffled bytes). Chunks
+         no tile has been written to take no space at all, so the file only
+         grows with the tiles it holds, and flat or ocean chunks compress to
+         almost nothing. The geo-referencing is kept in the file: lat / lon
+         coordinate variables of the cell centres and the grid origin and
+         resolution as attributes.
+
+         A window read decompresses only the chunks it overlaps, so a cold
+         read on a network filesystem moves a fraction of the bytes of the
+         raw tiles. Tiles can be added to an existing store at any time;
+         tiles already in it (same size and modification time) are skipped.
+
+         The store can stand in for a TileIndex: store.window(...) returns a
+         MosaicWindow and store.gather(...) samples scattered points, so the
+         transect, smoothing and chunked-mosaic code reads from it unchanged.
+
+         usage: python Tile_Store.py TILE_DIR STORE.nc
+
+Created on Sun Oct 18 12:42:10 2026
+"""
+
+import json
+import os
+import sys
+import threading
+import numpy as np
+from netCDF4 import Dataset
+from Tile_Reader import TILE_SIZE, readTile
+from Tile_Index import (TileIndex, MosaicWindow, tileName, boxToIndices,
+                        rowToLat, colToLon, fillType, LAT_ORIGIN, LON_ORIGIN,
+                        POINTS_PER_DEGREE, GLOBAL_ROWS, GLOBAL_COLS)
+
+CHUNK = 240             # chunk side in points (divides the 1200-point tile)
+COMPLEVEL = 4           # zlib compression level
+FILL = -32768           # height of the cells no tile has been written to
+
+_hdf5_lock = threading.Lock()   # the HDF5 library is not thread safe
+
+
+# This function converts the tiles of a directory into a store, creating the
+# store if needed; only tiles that are new or changed are written
+# Inputs: tile_dir (str), the directory of the topo_30s tiles
+#         store_path (str), the netCDF4 store file
+#         log, a function called with each tile name as it is written
+# Output: the list of the names of the tiles written
+def convertTiles(tile_dir, store_path, log=None):
+    if not os.path.exists(store_path):
+        _createStore(store_path)
+    written = []
+    with _hdf5_lock, Dataset(store_path, 'a') as nc:
+        stamps = json.loads(nc.tiles)
+        height = nc.variables['height']
+        for origin, path in sorted(TileIndex(tile_dir).paths.items()):
+            name = tileName(*origin)
+            stat = os.stat(path)
+            stamp = [stat.st_size, stat.st_mtime_ns]
+            if stamps.get(name) == stamp:
+                continue
+            row0, col0 = origin
+            height[row0:row0 + TILE_SIZE, col0:col0 + TILE_SIZE] = \
+                np.asarray(readTile(path), dtype=np.int16)
+            stamps[name] = stamp
+            # the tile list is updated after each tile, so an interrupted
+            # conversion resumes where it stopped
+            nc.tiles = json.dumps(stamps)
+            nc.sync()
+            written.append(name)
+            if log is not None:
+                log(name)
+    return written
+
+
+def _createStore(store_path):
+    with Dataset(store_path, 'w', format='NETCDF4') as nc:
+        nc.createDimension('lat', GLOBAL_ROWS)
+        nc.createDimension('lon', GLOBAL_COLS)
+        lat = nc.createVariable('lat', 'f8', ('lat',), zlib=True)
+        lat.units = 'degrees_north'
+        lat[:] = rowToLat(np.arange(GLOBAL_ROWS))
+        lon = nc.createVariable('lon', 'f8', ('lon',), zlib=True)
+        lon.units = 'degrees_east'
+        lon[:] = colToLon(np.arange(GLOBAL_COLS))
+        height = nc.createVariable('height', 'i2', ('lat', 'lon'),
+                                   zlib=True, complevel=COMPLEVEL,
+                                   shuffle=True, chunksizes=(CHUNK, CHUNK),
+                                   fill_value=FILL)
+        height.units = 'm'
+        height.long_name = 'topo_30s terrain height'
+        nc.source = 'geogrid topo_30s binary tiles'
+        nc.lat_origin = LAT_ORIGIN      # southern edge of row 0
+        nc.lon_origin = LON_ORIGIN      # western edge of column 0
+        nc.points_per_degree = POINTS_PER_DEGREE
+        nc.tile_size = TILE_SIZE
+        nc.tiles = json.dumps(dict())   # tile name -> [size, mtime] of source
+
+
+class TileStore:
+    """Reader of a compressed topo_30s store, in place of a TileIndex."""
+
+    # Inputs: store_path (str), the netCDF4 store written by convertTiles
+    def __init__(self, store_path):
+        self.store_path = store_path
+        with _hdf5_lock:
+            self._nc = Dataset(store_path, 'r')
+            self._nc.set_auto_mask(False)
+            self._height = self._nc.variables['height']
+            self.tiles = set(json.loads(self._nc.tiles))
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def close(self):
+        with _hdf5_lock:
+            self._nc.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # This method lists the tiles covering a global index range (as for
+    # TileIndex.tilesInRange)
+    def tilesInRange(self, row0, row1, col0, col1):
+        return [(tr * TILE_SIZE, tc * TILE_SIZE)
+                for tr in range(row0 // TILE_SIZE, (row1 - 1) // TILE_SIZE + 1)
+                for tc in range(col0 // TILE_SIZE, (col1 - 1) // TILE_SIZE + 1)]
+
+    # This method reads a block of the global grid, decompressing only the
+    # chunks it overlaps; rows or columns off the grid read as FILL
+    # Inputs: row0, row1, col0, col1, half-open global index ranges
+    # Output: a native int16 array
+    def readBlock(self, row0, row1, col0, col1):
+        out = np.full((row1 - row0, col1 - col0), FILL, dtype=np.int16)
+        r0, r1 = max(row0, 0), min(row1, GLOBAL_ROWS)
+        c0, c1 = max(col0, 0), min(col1, GLOBAL_COLS)
+        if r0 < r1 and c0 < c1:
+            with _hdf5_lock:
+                out[r0 - row0:r1 - row0, c0 - col0:c1 - col0] = \
+                    self._height[r0:r1, c0:c1]
+        return out
+
+    # This method reads the heights at scattered global grid points, one
+    # chunk at a time
+    # Inputs: rows, cols, fill_value, as for TileIndex.gather
+    # Output: an array of heights of the shape of rows
+    def gather(self, rows, cols, fill_value=None):
+        rows, cols = np.broadcast_arrays(np.asarray(rows, dtype=np.int64),
+                                         np.asarray(cols, dtype=np.int64))
+        out = np.empty(rows.shape, dtype=np.int16)
+        if out.size == 0:
+            return out
+        keys = (rows // CHUNK) * (1 << 32) + cols // CHUNK
+        order = np.argsort(keys, axis=None, kind='stable')
+        flat_keys = keys.ravel()[order]
+        starts = np.flatnonzero(np.r_[True, flat_keys[1:] != flat_keys[:-1]])
+        flat_rows, flat_cols = rows.ravel()[order], cols.ravel()[order]
+        flat_out = np.empty(len(order), dtype=np.int16)
+        for start, stop in zip(starts, np.r_[starts[1:], len(order)]):
+            r, c = flat_rows[start:stop], flat_cols[start:stop]
+            r0, c0 = (r[0] // CHUNK) * CHUNK, (c[0] // CHUNK) * CHUNK
+            block = self.readBlock(r0, r0 + CHUNK, c0, c0 + CHUNK)
+            flat_out[start:stop] = block[r - r0, c - c0]
+        out.ravel()[order] = flat_out
+        return _fill(out, fill_value, self.store_path)
+
+    # This method returns a lazily read mosaic window over a bounding box
+    # Inputs: lat_min, lat_max, lon_min, lon_max, fill_value, as for
+    #         TileIndex.window
+    # Output: a MosaicWindow reading from the store
+    def window(self, lat_min, lat_max, lon_min, lon_max, fill_value=None):
+        return StoreWindow(self, *boxToIndices(lat_min, lat_max,
+                                               lon_min, lon_max),
+                           fill_value=fill_value)
+
+
+class StoreWindow(MosaicWindow):
+    """A window of the topo_30s mosaic read from a TileStore."""
+
+    # This method reads the outer product of global rows and columns; each
+    # run of consecutive rows and columns is read as one block
+    # Inputs: rows, cols, 1D arrays of global indices
+    # Output: a native array of shape (len(rows), len(cols)) (int16, or the
+    #         type of fill_value when it is a float)
+    def readPoints(self, rows, cols):
+        rows, cols = np.asarray(rows), np.asarray(cols)
+        out = np.empty((len(rows), len(cols)), dtype=np.int16)
+        for r_at, r0, r1 in _runs(rows):
+            for c_at, c0, c1 in _runs(cols):
+                out[r_at, c_at] = self.index.readBlock(r0, r1, c0, c1)
+        return _fill(out, self.fill_value, self.index.store_path)
+
+
+# split indices into runs of consecutive values
+# Output: a list of (slice of the positions, start, stop) of each run
+def _runs(idx):
+    bounds = np.r_[0, np.flatnonzero(np.diff(idx) != 1) + 1, len(idx)]
+    return [(slice(a, b), int(idx[a]), int(idx[a]) + b - a)
+            for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+# replace the cells no tile covers by fill_value, or raise; the result has
+# the type of Tile_Index.fillType, as for a TileIndex
+def _fill(out, fill_value, store_path):
+    missing = out == FILL
+    if missing.any() and fill_value is None:
+        raise IOError('missing topo_30s tiles in %s' % store_path)
+    out = out.astype(fillType(fill_value), copy=False)
+    if missing.any():
+        out[missing] = fill_value
+    return out
+
+
+"""
+START OF PROGRAM
+"""
+
+if __name__ == '__main__':
+    tile_dir, store_path = sys.argv[1], sys.argv[2]
+    written = convertTiles(tile_dir, store_path,
+                           log=lambda name: print('Added', name))
+    raw_bytes = sum(os.path.getsize(p)
+                    for p in TileIndex(tile_dir).paths.values())
+    print('%d tiles added; %.1f MB of tiles stored in %.1f MB (%s)'
+          % (len(written), raw_bytes / float(1 << 20),
+             os.path.getsize(store_path) / float(1 << 20), store_path))
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: columnar storage of transect tables. A set of transects is kept as
+         a dict of whole arrays and written in one bulk write:
+
+             'latitude'   (n_lat,)                 degrees
+             'longitude'  (n_lon,)                 degrees
+             'raw'        (n_lat, n_lon)           topo_30s raw height (m)
+             'grid_size'  (n_grid,)                WPS grid sizes (str, km)
+             'interp'     (n_lat, n_grid, n_lon)   WPS grid heights (m)
+             'method'     ()                       interpolation method (str)
+
+         The file extension picks the format: .npz (numpy), .nc (netCDF4),
+         .parquet (pyarrow, one row per point) or .csv (one row per point,
+         written with a single vectorized savetxt call).
+
+Created on Sun Oct 18 16:00:00 2026
+"""
+
+import os
+import numpy as np
+
+LAT_LABEL = 'Latitude (degree)'
+LON_LABEL = 'Longitude (degree)'
+RAW_LABEL = 'geotiff Topo_30s Raw Height (m)'
+GRID_LABEL = 'WPS %s km grid size Height (m)'
+
+
+# This function bundles the arrays of a set of transects into one dict
+# Inputs: latitudes, lons, rawElev, grid_size, interpElev, method as
+#         described at the top of this file
+# Output: the transects dict
+def makeTransects(latitudes, lons, rawElev, grid_size, interpElev, method):
+    latitudes = np.atleast_1d(latitudes)
+    return {'latitude': latitudes,
+            'longitude': np.asarray(lons),
+            'raw': np.reshape(rawElev, (len(latitudes), len(lons))),
+            'grid_size': np.asarray(grid_size, dtype=str),
+            'interp': np.reshape(interpElev, (len(latitudes),
+                                              len(grid_size), len(lons))),
+            'method': np.asarray(str(method))}
+
+
+# This function flattens a set of transects into table columns, one row per
+# point, ordered latitude by latitude
+# Inputs: transects, the transects dict
+# Output: list of (label, 1D array) pairs, in the column order of the
+#         extractor CSV files
+def transectTable(transects):
+    n_lat, n_lon = transects['raw'].shape
+    columns = [(LON_LABEL, np.tile(transects['longitude'], n_lat)),
+               (RAW_LABEL, transects['raw'].ravel())]
+    for g, size in enumerate(transects['grid_size']):
+        columns.append((GRID_LABEL % size,
+                        transects['interp'][:, g, :].ravel()))
+    columns.append((LAT_LABEL, np.repeat(transects['latitude'], n_lon)))
+    return columns
+
+
+# This function returns the heights of one WPS grid along one transect
+# Inputs: transects, the transects dict
+#         size (str), the grid size in km, e.g. '0.444'
+#         k (int), the index of the transect (latitude)
+# Output: a 1D array of heights along transects['longitude']
+def gridHeights(transects, size, k=0):
+    g = list(transects['grid_size']).index(size)
+    return transects['interp'][k, g]
+
+
+# This function writes a set of transects in one bulk write
+# Inputs: file_path (str), the output file; its extension picks the format
+#         transects, the transects dict
+def writeTransects(file_path, transects):
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == '.npz':
+        np.savez(file_path, **transects)
+    elif ext == '.nc':
+        _writeNetCDF(file_path, transects)
+    elif ext == '.parquet':
+        _writeParquet(file_path, transects)
+    elif ext == '.csv':
+        writeCSV(file_path, transects)
+    else:
+        raise ValueError('unknown transect file format: %s' % file_path)
+
+
+# This function reads a set of transects written by writeTransects
+# Inputs: file_path (str), the transect file (.npz, .nc, .parquet or .csv)
+# Output: the transects dict
+def readTransects(file_path):
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == '.npz':
+        with np.load(file_path) as data:
+            return {name: data[name] for name in data.files}
+    if ext == '.nc':
+        return _readNetCDF(file_path)
+    if ext == '.parquet':
+        return _readParquet(file_path)
+    if ext == '.csv':
+        return _readCSV(file_path)
+    raise ValueError('unknown transect file format: %s' % file_path)
+
+
+# This function exports a set of transects as a CSV table
+# Inputs: file_path (str), the output csv file
+#         transects, the transects dict
+def writeCSV(file_path, transects):
+    columns = transectTable(transects)
+    header = ','.join(label for label, _ in columns)
+    table = np.column_stack([col.astype(np.float64) for _, col in columns])
+    np.savetxt(file_path, table, fmt='%.10g', delimiter=',',
+               header=header, comments='')
+
+
+# the csv table is read column-wise in one loadtxt call; the method is not
+# stored in the table
+def _readCSV(file_path, method=''):
+    with open(file_path) as csv_file:
+        header = csv_file.readline().strip().split(',')
+    table = np.loadtxt(file_path, delimiter=',', skiprows=1, ndmin=2)
+    column = lambda label: table[:, header.index(label)]
+    prefix, suffix = GRID_LABEL.split('%s')
+    grid_size = np.array([label[len(prefix):-len(suffix)] for label in header
+                          if label.startswith(prefix)
+                          and label.endswith(suffix)])
+    return _fromColumns(column(LAT_LABEL), column(LON_LABEL),
+                        column(RAW_LABEL), grid_size,
+                        [column(GRID_LABEL % size) for size in grid_size],
+                        method)
+
+# rebuild the transects dict from table columns, one row per point ordered
+# latitude by latitude
+def _fromColumns(lat_col, lon_col, raw_col, grid_size, interp_cols, method):
+    latitudes = lat_col[np.sort(np.unique(lat_col, return_index=True)[1])]
+    n_lon = len(lat_col) // len(latitudes)
+    return makeTransects(latitudes, lon_col[:n_lon], raw_col, grid_size,
+                         np.stack(interp_cols).reshape(len(grid_size),
+                                                       len(latitudes), n_lon)
+                                              .transpose(1, 0, 2),
+                         method)
+
+
+def _writeNetCDF(file_path, transects):
+    from netCDF4 import Dataset
+    with Dataset(file_path, 'w') as nc:
+        n_lat, n_grid, n_lon = transects['interp'].shape
+        nc.createDimension('latitude', n_lat)
+        nc.createDimension('grid', n_grid)
+        nc.createDimension('longitude', n_lon)
+        nc.method = str(transects['method'])
+        for name, dims in (('latitude', ('latitude',)),
+                           ('longitude', ('longitude',)),
+                           ('raw', ('latitude', 'longitude')),
+                           ('interp', ('latitude', 'grid', 'longitude'))):
+            var = nc.createVariable(name, transects[name].dtype, dims)
+            var[:] = transects[name]
+        grid = nc.createVariable('grid_size', str, ('grid',))
+        grid[:] = transects['grid_size'].astype(object)
+
+def _readNetCDF(file_path):
+    from netCDF4 import Dataset
+    with Dataset(file_path, 'r') as nc:
+        transects = {name: nc.variables[name][:].filled(np.nan)
+                     if name == 'interp' else np.asarray(nc.variables[name][:])
+                     for name in ('latitude', 'longitude', 'raw', 'interp')}
+        transects['grid_size'] = np.asarray(nc.variables['grid_size'][:],
+                                            dtype=str)
+        transects['method'] = np.asarray(nc.method)
+    return transects
+
+
+def _writeParquet(file_path, transects):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    columns = transectTable(transects)
+    table = pa.table({label: col for label, col in columns})
+    table = table.replace_schema_metadata({
+        'method': str(transects['method']),
+        'grid_size': ','.join(transects['grid_size'])})
+    pq.write_table(table, file_path)
+
+def _readParquet(file_path):
+    import pyarrow.parquet as pq
+    table = pq.read_table(file_path)
+    meta = table.schema.metadata
+    grid_size = np.array(meta[b'grid_size'].decode().split(','))
+    column = lambda label: table.column(label).to_numpy()
+    return _fromColumns(column(LAT_LABEL), column(LON_LABEL),
+                        column(RAW_LABEL), grid_size,
+                        [column(GRID_LABEL % size) for size in grid_size],
+                        meta[b'method'].decode())
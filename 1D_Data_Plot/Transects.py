@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: transects along any path, not only along a latitude line. A path is
+         a great circle between two points or a polyline through several
+         (each leg a great circle), sampled at a fixed spacing along it. The
+         raw topo_30s heights are interpolated bilinearly from the four
+         surrounding 30-arc-second points, gathered for all the samples at
+         once from the tiles they fall in; each geo_em grid is interpolated
+         onto all the samples in one (cached) griddata call. Valley-following
+         and cross-ridge transects are then as cheap as latitude rows.
+
+         A path transect is a dict of whole arrays:
+
+             'latitude', 'longitude', 'distance'  (n,)       degrees, km
+             'raw'                                (n,)       topo_30s height (m)
+             'grid_size'                          (n_grid,)  WPS grid sizes (str)
+             'interp'                             (n_grid, n) WPS heights (m)
+             'method'                             ()         griddata method
+
+Created on Sun Oct 18 22:00:00 2026
+"""
+
+import os
+import numpy as np
+from Tile_Index import LAT_ORIGIN, LON_ORIGIN, POINTS_PER_DEGREE, GLOBAL_COLS
+from Nearest_Grid_Point import EARTH_RADIUS, latLonToXYZ
+from Lambert_Grid import interpolateGrid
+from Dtype_Policy import valueArray
+from Transect_Output import LAT_LABEL, LON_LABEL, RAW_LABEL, GRID_LABEL
+
+
+# This function samples a polyline at a fixed spacing along the path; every
+# leg between two vertices is a great circle, and the vertices themselves
+# are always among the samples
+# Inputs: vertices, a sequence of (lat, lon) points in degrees
+#         spacing (float), the distance between samples in km
+# Outputs: lats, lons, the coordinates of the samples in degrees
+#          distance, the distance of each sample along the path in km
+def polylinePath(vertices, spacing):
+    vertices = np.asarray(vertices, dtype=np.float64)
+    xyz = latLonToXYZ(vertices[:, 0], vertices[:, 1])
+    cos_leg = np.clip(np.einsum('ij,ij->i', xyz[:-1], xyz[1:]), -1.0, 1.0)
+    angles = np.arccos(cos_leg)                       # leg lengths (radians)
+    ends = np.concatenate([[0.0], np.cumsum(angles)]) * EARTH_RADIUS
+
+    distance = np.union1d(np.arange(0.0, ends[-1], spacing), ends)
+    leg = np.clip(np.searchsorted(ends, distance, side='right') - 1,
+                  0, len(angles) - 1)
+    # spherical linear interpolation along each leg
+    angle = angles[leg]
+    moving = np.sin(angle) > 1e-12        # legs of (almost) zero length
+    safe = np.where(moving, angle, 1.0)
+    frac = (distance - ends[leg]) / EARTH_RADIUS / safe
+    wa = np.where(moving, np.sin((1 - frac) * angle) / np.sin(safe), 1 - frac)
+    wb = np.where(moving, np.sin(frac * angle) / np.sin(safe), frac)
+    p = wa[:, None] * xyz[leg] + wb[:, None] * xyz[leg + 1]
+    lats = np.degrees(np.arctan2(p[:, 2], np.hypot(p[:, 0], p[:, 1])))
+    lons = np.degrees(np.arctan2(p[:, 1], p[:, 0]))
+    return lats, lons, distance
+
+
+# This function samples a great circle between two points
+# Inputs: lat1, lon1, lat2, lon2, the end points in degrees
+#         spacing (float), the distance between samples in km
+# Outputs: lats, lons, distance as for polylinePath
+def greatCirclePath(lat1, lon1, lat2, lon2, spacing):
+    return polylinePath([(lat1, lon1), (lat2, lon2)], spacing)
+
+
+# This function interpolates the raw topo_30s heights bilinearly at any
+# points, between the centres of the four surrounding cells
+# Inputs: tiles, the TileIndex of the topo_30s tiles
+#         lats, lons, arrays of the coordinates of the points in degrees
+#         fill_value, the height of points with no tile data (None raises)
+# Output: an array of heights of the shape of lats, in the height type of
+#         the dtype policy (the weights are applied in float64)
+def sampleMosaic(tiles, lats, lons, fill_value=None):
+    fr = (np.asarray(lats) - LAT_ORIGIN) * POINTS_PER_DEGREE - 0.5
+    fc = (np.asarray(lons) - LON_ORIGIN) * POINTS_PER_DEGREE - 0.5
+    r0, c0 = np.floor(fr).astype(np.int64), np.floor(fc).astype(np.int64)
+    wr, wc = fr - r0, fc - c0
+    # the four corners of every point, gathered in one pass over the tiles
+    rows = np.stack([r0, r0, r0 + 1, r0 + 1])
+    cols = np.stack([c0, c0 + 1, c0, c0 + 1]) % GLOBAL_COLS
+    h = tiles.gather(rows, cols, fill_value).astype(np.float64)
+    return valueArray((1 - wr) * ((1 - wc) * h[0] + wc * h[1]) +
+                      wr * ((1 - wc) * h[2] + wc * h[3]))
+
+
+# This function samples the raw heights and every geo_em grid along a path
+# Inputs: tiles, the TileIndex of the topo_30s tiles
+#         grids, the list of grids returned by loadGeoEm
+#         grid_size, the grid sizes (str, km) of the grids
+#         lats, lons, distance, the path (see polylinePath)
+#         method (str), 'nearest', 'linear', 'cubic', 'bilinear' or
+#                       'bicubic'
+#         cache, the InterpCache holding the grid triangulations
+#         persist (bool), False keeps the interpolation weights off the disk
+# Output: the path transect dict
+def pathTransect(tiles, grids, grid_size, lats, lons, distance, method,
+                 cache, persist=True):
+    plot_pts = np.column_stack([lats, lons])
+    interp = [interpolateGrid(cache, g, plot_pts, method, persist)
+              for g in grids]
+    return {'latitude': np.asarray(lats), 'longitude': np.asarray(lons),
+            'distance': np.asarray(distance),
+            'raw': sampleMosaic(tiles, lats, lons),
+            'grid_size': np.asarray(grid_size, dtype=str),
+            'interp': np.reshape(interp, (len(grids), len(lats))),
+            'method': np.asarray(str(method))}
+
+
+# This function writes a path transect, as .npz or as a CSV table with one
+# row per sample
+# Inputs: file_path (str), the output file
+#         transect, the path transect dict
+def writePathTransect(file_path, transect):
+    if os.path.splitext(file_path)[1].lower() == '.npz':
+        np.savez(file_path, **transect)
+        return
+    columns = [(LAT_LABEL, transect['latitude']),
+               (LON_LABEL, transect['longitude']),
+               ('Distance (km)', transect['distance']),
+               (RAW_LABEL, transect['raw'])]
+    columns += [(GRID_LABEL % size, transect['interp'][g])
+                for g, size in enumerate(transect['grid_size'])]
+    np.savetxt(file_path, np.column_stack([c for _, c in columns]),
+               fmt='%.10g', delimiter=',',
+               header=','.join(label for label, _ in columns), comments='')
+
+
+"""
+START OF PROGRAM
+"""
+
+if __name__ == '__main__':
+    from Tile_Index import TileIndex
+    from Interp_Cache import InterpCache
+    from Batch_Transects import loadGeoEmFiles
+
+    ## Assign file path and directory for the binary tile files and geo_em files
+    tile_dir = '/Users/JZC/Desktop/EOAS_Research_Assistant/Project_2/tifReader/Pacific_Northwest_Files'
+    geo_dir = '/Users/JZC/Desktop/EOAS_Research_Assistant/Project_2/netcdfReader/geogrid_files_mc'
+    grid_size = ['0.444', '1.333', '4', '9', '12', '27', '36', '108']
+
+    # the Fraser valley from Hope up the canyon to Lytton (a polyline),
+    # and a cross-ridge line over the Coast Mountains (a great circle)
+    paths = {'Fraser_Valley': [(49.38, -121.44), (49.79, -121.44),
+                               (50.23, -121.58)],
+             'Coast_Mountains': [(49.30, -124.00), (50.50, -121.00)]}
+    spacing = 0.5    # km between samples
+    method = 'linear'
+
+    tiles = TileIndex(tile_dir)
+    grids = loadGeoEmFiles([os.path.join(geo_dir, 'geo_em.%s.nc' % size)
+                            for size in grid_size])
+    cache = InterpCache()
+    for name, vertices in paths.items():
+        lats, lons, distance = polylinePath(vertices, spacing)
+        transect = pathTransect(tiles, grids, grid_size, lats, lons, distance,
+                                method, cache)
+        writePathTransect('%s_%s.npz' % (name, method), transect)
+        print('Wrote %s: %d samples over %.1f km' % (name, len(lats),
+                                                     distance[-1]))
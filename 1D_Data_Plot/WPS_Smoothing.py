@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: the terrain smoothers of WPS geogrid (smooth_option = '1-2-1' or
+         'smth-desmth', repeated smooth_passes times), as vectorized numpy
+         stencils. Each pass smooths along the west-east direction, then
+         along the south-north direction; the points on the domain boundary
+         are left as they are in the direction being smoothed, as geogrid
+         does.
+
+             1-2-1         a(i) = 0.50 a(i) + 0.25 (a(i-1) + a(i+1))
+             smth-desmth   the 1-2-1 step, then the desmoothing step
+                           a(i) = 1.52 a(i) - 0.26 (a(i-1) + a(i+1))
+
+         smoothTiles runs the filter over a topo_30s mosaic tile by tile.
+         A tile is read with the 3-cell halo stored around it on disk, which
+         covers the reach of three 1-2-1 passes (or one smth-desmth pass);
+         after that many passes the halos are refreshed from the smoothed
+         neighbouring tiles. The result is identical to smoothing the whole
+         window at once, and the tiles of each round can be smoothed in
+         parallel.
+
+Created on Sun Oct 18 20:00:00 2026
+"""
+
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from Tile_Reader import TILE_SIZE, HALO
+
+# the steps of each smoother: (weight of the point, weight of each neighbour)
+SMOOTH_STEPS = {'1-2-1': [(0.5, 0.25)],
+                'smth-desmth': [(0.5, 0.25), (1.52, -0.26)]}
+
+
+# This function applies one 3-point step of a smoother along one axis
+# Inputs: arr, a 2D float array, updated in place
+#         axis (int), 1 for west-east, 0 for south-north
+#         centre, side (float), the weights of the point and its neighbours
+#         lo, hi (int), the first and last+1 index of the domain along the
+#                       axis; only the points strictly inside are updated
+def smoothStep(arr, axis, centre, side, lo=0, hi=None):
+    hi = arr.shape[axis] if hi is None else hi
+    lo, hi = max(lo, 0), min(hi, arr.shape[axis])
+    if hi - lo < 3:
+        return arr
+    a = np.moveaxis(arr, axis, 0)
+    a[lo + 1:hi - 1] = centre * a[lo + 1:hi - 1] + \
+        side * (a[lo:hi - 2] + a[lo + 2:hi])
+    return arr
+
+
+# This function runs a WPS smoother over a 2D field
+# Inputs: arr, a 2D array (rows south to north, columns west to east)
+#         option (str), '1-2-1' or 'smth-desmth'
+#         passes (int), the number of passes (smooth_passes)
+#         bounds, (row_lo, row_hi, col_lo, col_hi), the domain inside arr
+#                 (default: all of arr); points outside it are never used
+# Output: the smoothed field (float32 array of the shape of arr)
+def wpsSmooth(arr, option='smth-desmth', passes=1, bounds=None):
+    if option not in SMOOTH_STEPS:
+        raise ValueError('unknown smooth_option: %s' % option)
+    arr = np.array(arr, dtype=np.float32)
+    row_lo, row_hi, col_lo, col_hi = bounds or (0, arr.shape[0],
+                                                0, arr.shape[1])
+    for _ in range(passes):
+        for centre, side in SMOOTH_STEPS[option]:
+            smoothStep(arr, 1, centre, side, col_lo, col_hi)
+            smoothStep(arr, 0, centre, side, row_lo, row_hi)
+    return arr
+
+
+# This function runs a WPS smoother over a mosaic window tile by tile
+# Inputs: window, the MosaicWindow to smooth
+#         option (str), '1-2-1' or 'smth-desmth'
+#         passes (int), the number of passes (smooth_passes)
+#         workers (int), the number of tiles smoothed at once (threads)
+# Output: the smoothed window (float32 array of window.shape), equal to
+#         wpsSmooth(window.read(), option, passes)
+def smoothTiles(window, option='smth-desmth', passes=1, workers=4):
+    if option not in SMOOTH_STEPS:
+        raise ValueError('unknown smooth_option: %s' % option)
+    # each pass moves the edge error of a tile one cell in per step
+    per_round = max(HALO // len(SMOOTH_STEPS[option]), 1)
+    pieces = _tilePieces(window)
+    current = None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while passes > 0:
+            n = min(per_round, passes)
+            smoothed = np.empty(window.shape, dtype=np.float32)
+            list(pool.map(lambda piece: _smoothPiece(window, current,
+                                                     smoothed, piece,
+                                                     option, n), pieces))
+            current = smoothed
+            passes -= n
+    return window.read().astype(np.float32) if current is None else current
+
+
+# This function splits a window along the tile edges
+# Output: a list of (r0, r1, c0, c1), the window indices of each piece
+def _tilePieces(window):
+    def cuts(start, stop):
+        edges = range((start // TILE_SIZE + 1) * TILE_SIZE, stop, TILE_SIZE)
+        bounds = [start] + list(edges) + [stop]
+        return [(a - start, b - start) for a, b in zip(bounds, bounds[1:])]
+    return [(r0, r1, c0, c1) for r0, r1 in cuts(window.row0, window.row1)
+            for c0, c1 in cuts(window.col0, window.col1)]
+
+
+# This function smooths one piece of a window, read with a halo of HALO
+# cells, and writes its interior to out
+# Inputs: window, the MosaicWindow
+#         current, the window smoothed so far (None before the first round,
+#                  when the piece and its halo are read from the tile file)
+#         out, the float32 array of window.shape to write to
+#         piece, (r0, r1, c0, c1), the window indices of the piece
+#         option (str), passes (int), as for wpsSmooth
+def _smoothPiece(window, current, out, piece, option, passes):
+    r0, r1, c0, c1 = piece
+    if current is None:
+        rows = np.arange(r0 - HALO, r1 + HALO) + window.row0
+        cols = np.arange(c0 - HALO, c1 + HALO) + window.col0
+        block = window.readPoints(rows, cols)
+    else:
+        # points past the window edge are never used, so any value will do
+        pad = [(max(HALO - r0, 0), max(r1 + HALO - window.shape[0], 0)),
+               (max(HALO - c0, 0), max(c1 + HALO - window.shape[1], 0))]
+        block = np.pad(current[max(r0 - HALO, 0):r1 + HALO,
+                               max(c0 - HALO, 0):c1 + HALO], pad, mode='edge')
+    # the domain is the window, in the indices of the block
+    bounds = (HALO - r0, HALO - r0 + window.shape[0],
+              HALO - c0, HALO - c0 + window.shape[1])
+    block = wpsSmooth(block, option, passes, bounds)
+    out[r0:r1, c0:c1] = block[HALO:-HALO, HALO:-HALO]
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: the original loop implementations of the core operations, as they
+         were in the extractor scripts and Fourier_CSV_Filtering.py before
+         the memmap, k-d tree and FFT rewrites. They are kept here, unchanged
+         apart from the Python 3 fix in spectrum, as the reference the
+         benchmarks time the current implementations against.
+
+Created on Sun Oct 18 18:00:00 2026
+"""
+
+import math
+import struct
+import numpy as np
+from math import radians, cos, sin, asin, sqrt
+
+
+# This function reads a binary file, converts into a 2D array of signed integers
+# Inputs: str, the path of the binary file
+# Output: arr, a 2D square array of signed int
+def binaryTo2DArray(file_path):
+    with open(file_path, "rb") as binary_file:
+        data = binary_file.read()
+
+    byte_order = ">"              # represent the big-endian bypte order
+    elem_count = str(1206 * 1206) # represent the number of elements in the tile
+    format_char = "h"             # represent short int of size 2 bytes
+
+    arr_1d = struct.unpack(byte_order + elem_count + format_char, data)
+    arr_2d = np.reshape(arr_1d, (1206, 1206))
+    return arr_2d
+
+
+# This function reads two 2D arrays and fuse them into one single 2D array side by side
+# Inputs: arrW, arrE (two 2D arrays)
+# Output: arrFinal, a 2D array composed of elements from arrW on the left
+#         and elements from arrE on the right
+# Requires: both arrays must all be square arrays witht same size
+def fuseTwoArray(arrW, arrE):
+    size = len(arrW)
+    listWE =[]
+    for i in range(0, size):
+        row_i = np.concatenate([arrW[i], arrE[i]])
+        listWE.append(row_i)
+
+    arrFinal = np.asarray(listWE)
+    return arrFinal
+
+
+# This function calculate the great circle distance between twop points on Earth
+# (specified in decimal degrees)
+# Inputs: lat1, latitude of point 1
+#         lon1, longitude of point 1
+#         lat2, latitude of point 2
+#         lon2, longitude of point 2
+# Output: distance between point 1 and 2 in km
+def haversine(lat1, lon1, lat2, lon2):
+    # convert decimal degrees to radians
+    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
+
+    # haversie formula
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    c = 2 * asin(sqrt(a))
+    r = 6371 # Radius of Earth in km
+    return c * r
+
+# This function returns the indice where the coordinate is
+# closest to the given latitude and longitude
+# Inputs: lats2D, a 2D array that stores the latitudes of several points
+#          lons2D, a 2D array that stores the longitudes of several points
+#          lat, the latitude of the point to compare against
+#          lon, the longitude of the point to compare against
+# Outputs: the index that holds the closest distance
+# Requires: lats2D and lons2D must have the same dimension (shape)
+def closestIndex(lats, lons, lat, lon):
+    dists = np.zeros((len(lats), len(lats[0])))
+    for row in range(0, len(lats)):
+        for col in range(0, len(lats[0])):
+            dist = haversine(lats[row][col], lons[row][col],lat, lon)
+            dists[row][col] = dist
+    return np.where(dists == dists.min())
+
+
+# This function merge two arrays of latitudes and longitudes into one single array of coordinates
+# Inputs: lats, a 2D array that stores the latitudes of several points
+#         lons, a 2D array that stores the longitudes of several points
+# Outputs: a 2D array of points made by merging lats and lons
+# Requires: lats and lons must have the same shapes (dimensions)
+def mergeLatsLons(lats, lons):
+    points = np.zeros(shape=(len(lats) * len(lats[0]), 2))
+    num = 0
+    for row in range(0, len(lats)):
+        for col in range(0, len(lats[0])):
+            points[num][0] = lats[row][col]
+            points[num][1] = lons[row][col]
+            num += 1
+    return points
+
+
+# This function carrys out a discrete Fourier transform (DFT)
+# Inputs: samples    (array),    the sample points for DFT
+# Output: the real part of the DFT (array of size len(samples))
+def realDFT(samples):
+    N = len(samples)
+    realComp = np.zeros(N)
+
+    for k in range(N):
+        sum = 0
+        for n in range(N):
+            sum += samples[n] * math.cos(2 * math.pi * k * n / N)
+        realComp[k] = sum / N
+
+    return realComp
+
+# This function carrys out a discrete Fourier transform (DFT)
+# Inputs: samples    (array),    the sample points for DFT
+# Output: the imaginary part of the DFT (array of size len(samples))
+def imagDFT(samples):
+    N = len(samples)
+    imagComp = np.zeros(N)
+
+    for k in range(N):
+        sum = 0
+        for n in range(N):
+            sum += samples[n] * math.sin(2 * math.pi * k * n / N)
+        imagComp[k] =  - 1.0 * sum / N
+
+    return imagComp
+
+# This function computes the variance spectrum of a DFT
+# Inputs: reals (array), the real components of the DFT
+#         imags (array), the imaginary component of the DFT
+# Output: the variance spectrum of the DFT (array)
+# Requires: length of reals must equals length of imags
+def spectrum(reals, imags):
+    nyquist = len(reals) // 2
+    spec = np.zeros(nyquist + 1)
+
+    for i in range(nyquist + 1):
+        spec[i] = reals[i]**2 + imags[i]**2
+    return spec
+
+# This function carrys out an inverse discrete Fourier transform (IDFT)
+# Inputs: reals (array), the real components of the DFT
+#         imags (array), the imaginary component of the DFT
+#         threshold (int), assign zero filter weights to all wavenumbers
+#                          below this threshold
+# Outputs: the filtered space series (array of size(threshold + 1))
+def inverseDFT(reals, imags, threshold):
+    N = len(reals)
+    filteredReals = np.zeros(threshold + 1)
+    filteredImags = np.zeros(threshold + 1)
+    filteredSeries = np.zeros(N)
+
+    for i in range(threshold + 1):
+        filteredReals[i] = reals[i]
+        filteredImags[i] = imags[i]
+
+    for n in range(N):
+        sum = 0;
+        for k in range(threshold + 1):
+            sum += filteredReals[k] * math.cos(2 * math.pi * k * n / N)
+            sum -= filteredImags[k] * math.sin(2 * math.pi * k * n / N)
+        filteredSeries[n] = sum
+
+    return filteredSeries
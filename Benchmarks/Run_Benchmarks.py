@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: benchmark suite for the core operations of the terrain pipeline.
+         Synthetic topo_30s tiles and geo_em files are generated locally
+         (Synthetic_Fixtures.py), then every operation is timed at several
+         sizes, for the original loop implementation (Legacy_Reference.py)
+         and for the current one:
+
+             binaryTo2DArray   1 - 4 tiles
+             fuseTwoArray      2 - 4 tile mosaics
+             mergeLatsLons     geo_em grids of 50 x 50 to 400 x 400 points
+             closestIndex      the same grids, 1 and 1200 query points
+             griddata          the same grids, per method, 1200 query points
+             lambertGrid       the same grids, 1200 query points, analytic
+                               projection lookup and sampling
+             realDFT           128 - 16384 samples
+             inverseDFT        128 - 16384 samples
+
+         The results (best and median time per call, and whether the two
+         implementations agree) are written to a JSON file together with
+         the versions and machine they were measured on; --compare prints
+         the speed ratios against an earlier results file.
+
+         usage: python Run_Benchmarks.py [--quick] [--only NAME,...]
+                    [--output FILE] [--fixtures DIR] [--compare OLD.json]
+
+Created on Sun Oct 18 18:00:00 2026
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+import scipy
+from scipy.interpolate import griddata
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(here, os.pardir, '1D_Data_Plot'))
+sys.path.append(os.path.join(here, os.pardir, 'Discrete_Fourier_Transform'))
+
+import Legacy_Reference as legacy
+import FFT_Filtering
+from Synthetic_Fixtures import makeTileSet, makeGeoEm, readGeoEm
+from Tile_Reader import binaryTo2DArray, TILE_SIZE
+from Tile_Index import TileIndex
+from Interp_Cache import InterpCache, mergeLatsLons
+from Nearest_Grid_Point import NearestGridPoint
+from Lambert_Grid import LambertGrid
+
+MIN_SAMPLE = 0.05       # seconds each timing sample should at least last
+SLOW_CALL = 2.0         # calls slower than this are timed only once
+
+# tiles of the fixture set: the 2 x 2 block around 50N 120W
+TILE_BOX = (40.0, 60.0, -130.0, -110.0)
+TRANSECT_LAT = 50.12    # latitude of the interpolation queries
+GRID_DX = 4000.0        # spacing of the geo_em fixtures (m)
+
+# sizes timed in full and in --quick runs, and the largest size the legacy
+# loops are run at (they are quadratic, or slow per point)
+SIZES = {'binaryTo2DArray': ([1, 2, 4], [1, 2], 4),
+         'fuseTwoArray': ([2, 4], [2], 4),
+         'mergeLatsLons': ([50, 100, 200, 400], [50, 100], 400),
+         'closestIndex': ([50, 100, 200, 400], [50, 100], 200),
+         'griddata': ([50, 100, 200, 400], [50, 100], 400),
+         'lambertGrid': ([50, 100, 200, 400], [50, 100], 400),
+         'realDFT': ([128, 512, 1024, 4096, 16384], [128, 512, 1024], 1024),
+         'inverseDFT': ([128, 512, 1024, 4096, 16384], [128, 512, 1024], 1024)}
+
+
+# This function times a call
+# Inputs: func, the function to time (no arguments)
+#         repeat (int), the number of timing samples
+# Output: a dict of the best and median seconds per call, the number of
+#         calls per sample and the number of samples
+def timeCall(func, repeat):
+    start = time.perf_counter()
+    func()
+    first = time.perf_counter() - start
+    if first > SLOW_CALL:
+        return {'best_s': first, 'median_s': first, 'number': 1, 'repeat': 1}
+    number = max(1, int(MIN_SAMPLE / max(first, 1e-9)))
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return {'best_s': min(samples), 'median_s': float(np.median(samples)),
+            'number': number, 'repeat': repeat}
+
+
+class Suite:
+    """The fixtures, settings and results of one benchmark run."""
+
+    def __init__(self, fixture_dir, quick=False, repeat=5):
+        self.fixture_dir = fixture_dir
+        self.quick = quick
+        self.repeat = repeat
+        self.results = []
+        self.tile_dir = os.path.join(fixture_dir, 'topo_30s')
+        self.tile_paths = makeTileSet(self.tile_dir, *TILE_BOX)
+        self._grids = dict()
+
+    def sizes(self, name):
+        full, quick, legacy_max = SIZES[name]
+        return (quick if self.quick else full), legacy_max
+
+    # This method returns the path of the fixture geo_em file with n x n
+    # points, writing it if needed
+    def gridPath(self, n):
+        path = os.path.join(self.fixture_dir, 'geo_em_%dx%d.nc' % (n, n))
+        if not os.path.exists(path):
+            makeGeoEm(path, n, n, GRID_DX)
+        return path
+
+    # This method returns the fixture geo_em grid with n x n points
+    def grid(self, n):
+        if n not in self._grids:
+            self._grids[n] = readGeoEm(self.gridPath(n))
+        return self._grids[n]
+
+    # This method times one implementation and records the result
+    # Inputs: name, impl (str), the operation and implementation timed
+    #         size (int), size_unit (str), the problem size
+    #         func, the function to time
+    #         match (bool or None), whether the result agrees with legacy
+    def run(self, name, impl, size, size_unit, func, match=None):
+        result = dict(benchmark=name, impl=impl, size=size,
+                      size_unit=size_unit, match=match)
+        result.update(timeCall(func, self.repeat))
+        self.results.append(result)
+        print('%-16s %-28s %6d %-8s %12.6f s%s'
+              % (name, impl, size, size_unit, result['best_s'],
+                 '' if match is None else '  match=%s' % match))
+
+    def benchBinaryTo2DArray(self):
+        sizes, legacy_max = self.sizes('binaryTo2DArray')
+        for n in sizes:
+            paths = self.tile_paths[:n]
+            if n <= legacy_max:
+                self.run('binaryTo2DArray', 'legacy struct.unpack', n, 'tiles',
+                         lambda: [legacy.binaryTo2DArray(p) for p in paths])
+            match = all(np.array_equal(legacy.binaryTo2DArray(p),
+                                       binaryTo2DArray(p)) for p in paths)
+            self.run('binaryTo2DArray', 'memmap full read', n, 'tiles',
+                     lambda: [np.array(binaryTo2DArray(p)) for p in paths],
+                     match)
+            self.run('binaryTo2DArray', 'memmap one row', n, 'tiles',
+                     lambda: [np.array(binaryTo2DArray(p)[600])
+                              for p in paths])
+
+    def benchFuseTwoArray(self):
+        sizes, legacy_max = self.sizes('fuseTwoArray')
+        lat_min, _, lon_min, lon_max = TILE_BOX
+        index = TileIndex(self.tile_dir)
+        for n in sizes:
+            # the southern 1 x 2 strip of tiles, or the whole 2 x 2 block
+            # (self.tile_paths go west to east, then south to north)
+            interiors = [[legacy.binaryTo2DArray(p)[3:-3, 3:-3]
+                          for p in self.tile_paths[k:k + 2]]
+                         for k in range(0, n, 2)]
+
+            def fuseLegacy():
+                return np.concatenate([legacy.fuseTwoArray(*row)
+                                       for row in interiors])
+            if n <= legacy_max:
+                self.run('fuseTwoArray', 'legacy row loop', n, 'tiles',
+                         fuseLegacy)
+            window = index.window(lat_min, lat_min + 10.0 * n // 2,
+                                  lon_min, lon_max)
+            match = np.array_equal(fuseLegacy(), window.read())
+            self.run('fuseTwoArray', 'MosaicWindow.read', n, 'tiles',
+                     window.read, match)
+            self.run('fuseTwoArray', 'np.block', n, 'tiles',
+                     lambda: np.block(interiors))
+
+    def benchMergeLatsLons(self):
+        sizes, legacy_max = self.sizes('mergeLatsLons')
+        for n in sizes:
+            lats, lons, _ = self.grid(n)
+            if n <= legacy_max:
+                self.run('mergeLatsLons', 'legacy loop', n, 'grid side',
+                         lambda: legacy.mergeLatsLons(lats, lons))
+            match = np.array_equal(legacy.mergeLatsLons(lats, lons),
+                                   mergeLatsLons(lats, lons))
+            self.run('mergeLatsLons', 'float32 columns', n, 'grid side',
+                     lambda: mergeLatsLons(lats, lons), match)
+
+    def benchClosestIndex(self):
+        sizes, legacy_max = self.sizes('closestIndex')
+        for n in sizes:
+            lats, lons, _ = self.grid(n)
+            lat, lon = TRANSECT_LAT, -122.0
+            if n <= legacy_max:
+                self.run('closestIndex', 'legacy haversine loop', n,
+                         'grid side',
+                         lambda: legacy.closestIndex(lats, lons, lat, lon))
+                rows, cols = legacy.closestIndex(lats, lons, lat, lon)
+                match = NearestGridPoint(lats, lons).query(lat, lon)[:2] == \
+                    (rows[0], cols[0])
+            else:
+                match = None
+            self.run('closestIndex', 'k-d tree build + 1 query', n,
+                     'grid side',
+                     lambda: NearestGridPoint(lats, lons).query(lat, lon),
+                     match)
+            finder = NearestGridPoint(lats, lons)
+            qlons = np.linspace(lons.min(), lons.max(), TILE_SIZE)
+            self.run('closestIndex', 'k-d tree 1200 queries', n, 'grid side',
+                     lambda: finder.query(np.full(TILE_SIZE, lat), qlons))
+
+    def benchGriddata(self):
+        sizes, legacy_max = self.sizes('griddata')
+        for n in sizes:
+            lats, lons, elev = self.grid(n)
+            points = mergeLatsLons(lats, lons)
+            values = elev.ravel()
+            xi = np.column_stack([np.full(TILE_SIZE, TRANSECT_LAT),
+                                  np.linspace(lons.min(), lons.max(),
+                                              TILE_SIZE)])
+            cache_root = tempfile.mkdtemp(dir=self.fixture_dir)
+            try:
+                for method in ('nearest', 'linear', 'cubic'):
+                    name = 'griddata %s' % method
+                    expected = griddata(points, values, xi, method=method)
+                    if n <= legacy_max:
+                        self.run(name, 'scipy griddata', n, 'grid side',
+                                 lambda: griddata(points, values, xi,
+                                                  method=method))
+
+                    def cold():
+                        cache_dir = tempfile.mkdtemp(dir=cache_root)
+                        try:
+                            return InterpCache(cache_dir).griddata(
+                                'grid', points, values, xi, method)
+                        finally:
+                            shutil.rmtree(cache_dir)
+                    match = bool(np.allclose(cold(), expected,
+                                             equal_nan=True))
+                    self.run(name, 'InterpCache cold', n, 'grid side', cold,
+                             match)
+                    warm_dir = os.path.join(cache_root, 'warm')
+                    InterpCache(warm_dir).griddata('grid', points, values,
+                                                   xi, method)
+                    self.run(name, 'InterpCache warm (new run)', n,
+                             'grid side',
+                             lambda: InterpCache(warm_dir).griddata(
+                                 'grid', points, values, xi, method))
+            finally:
+                shutil.rmtree(cache_root)
+
+    def benchLambertGrid(self):
+        sizes, _ = self.sizes('lambertGrid')
+        for n in sizes:
+            lats, lons, elev = self.grid(n)
+            path = self.gridPath(n)
+            qlats = np.full(TILE_SIZE, TRANSECT_LAT)
+            qlons = np.linspace(lons.min(), lons.max(), TILE_SIZE)
+            self.run('lambertGrid', 'fromGeoEm', n, 'grid side',
+                     lambda: LambertGrid.fromGeoEm(path))
+            grid = LambertGrid.fromGeoEm(path)
+            match = all(np.array_equal(a, b) for a, b in zip(
+                grid.query(qlats, qlons)[:2],
+                NearestGridPoint(lats, lons).query(qlats, qlons)[:2]))
+            self.run('lambertGrid', 'query (nearest point)', n, 'grid side',
+                     lambda: grid.query(qlats, qlons), match)
+            for method in ('bilinear', 'bicubic'):
+                self.run('lambertGrid', method, n, 'grid side',
+                         lambda: grid.sample(elev, qlats, qlons, method))
+
+    def benchDFT(self):
+        rng = np.random.RandomState(0)
+        for name in ('realDFT', 'inverseDFT'):
+            sizes, legacy_max = self.sizes(name)
+            for N in sizes:
+                samples = rng.normal(1000.0, 300.0, N)
+                threshold = N // 10
+                if name == 'realDFT':
+                    old = lambda: legacy.realDFT(samples)
+                    new = lambda: FFT_Filtering.realDFT(samples)
+                else:
+                    reals = FFT_Filtering.realDFT(samples)
+                    imags = FFT_Filtering.imagDFT(samples)
+                    old = lambda: legacy.inverseDFT(reals, imags, threshold)
+                    new = lambda: FFT_Filtering.inverseDFT(reals, imags,
+                                                           threshold)
+                match = None
+                if N <= legacy_max:
+                    self.run(name, 'legacy loop', N, 'samples', old)
+                    match = bool(np.allclose(old(), new(), atol=1e-6))
+                self.run(name, 'rfft', N, 'samples', new, match)
+
+
+BENCHMARKS = {'binaryTo2DArray': Suite.benchBinaryTo2DArray,
+              'fuseTwoArray': Suite.benchFuseTwoArray,
+              'mergeLatsLons': Suite.benchMergeLatsLons,
+              'closestIndex': Suite.benchClosestIndex,
+              'griddata': Suite.benchGriddata,
+              'lambertGrid': Suite.benchLambertGrid,
+              'DFT': Suite.benchDFT}
+
+
+# This function describes the code and machine a run was measured on
+def runInfo(quick):
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                         cwd=here, stderr=subprocess.DEVNULL)
+        commit = commit.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'date': datetime.now(timezone.utc).isoformat(),
+            'commit': commit,
+            'quick': quick,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'scipy': scipy.__version__,
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()}
+
+
+# This function prints the speed ratios of a run against an earlier run
+# Inputs: results, the results of this run
+#         old_file (str), the results file of the earlier run
+def compare(results, old_file):
+    with open(old_file) as f:
+        old = {(r['benchmark'], r['impl'], r['size']): r
+               for r in json.load(f)['results']}
+    print('\n%-16s %-28s %6s %10s' % ('benchmark', 'impl', 'size',
+                                      'old / new'))
+    for r in results:
+        before = old.get((r['benchmark'], r['impl'], r['size']))
+        if before is None:
+            continue
+        ratio = before['best_s'] / r['best_s']
+        flag = '  SLOWER' if ratio < 0.8 else ''
+        print('%-16s %-28s %6d %9.2fx%s' % (r['benchmark'], r['impl'],
+                                             r['size'], ratio, flag))
+
+
+"""
+START OF PROGRAM
+"""
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--quick', action='store_true',
+                        help='smaller sizes and fewer samples')
+    parser.add_argument('--only', default=','.join(BENCHMARKS),
+                        help='comma separated benchmarks to run (%(default)s)')
+    parser.add_argument('--output', default='bench_results.json',
+                        help='results file (%(default)s)')
+    parser.add_argument('--fixtures', default=os.path.join(here, 'fixtures'),
+                        help='directory of the synthetic data (kept between '
+                             'runs)')
+    parser.add_argument('--compare', metavar='OLD_JSON',
+                        help='print speed ratios against an earlier run')
+    args = parser.parse_args()
+
+    os.makedirs(args.fixtures, exist_ok=True)
+    suite = Suite(args.fixtures, quick=args.quick,
+                  repeat=3 if args.quick else 5)
+    for name in args.only.split(','):
+        BENCHMARKS[name](suite)
+
+    with open(args.output, 'w') as out:
+        json.dump({'run': runInfo(args.quick), 'results': suite.results},
+                  out, indent=2)
+    print('Results written to', args.output)
+    if args.compare:
+        compare(suite.results, args.compare)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: synthetic stand-ins for the topo_30s tiles and the geo_em files, so
+         the benchmarks (and anyone without the /Users/JZC data) can run the
+         pipeline locally. The terrain is one analytic field of latitude and
+         longitude (a sum of ridges and valleys of 1 to 300 km wavelength),
+         sampled at the topo_30s cell centres for the tiles and at the
+         Lambert conformal grid points for the geo_em files, so the two agree
+         the way the real data does and neighbouring tiles share their halos.
+
+         Tiles are written as 1206 x 1206 big-endian int16 files named like
+         the geogrid tiles ('06001-07200.16801-18000'); geo_em files hold
+         XLAT_M, XLONG_M and HGT_M (Time, south_north, west_east) and the
+         MAP_PROJ, TRUELAT1/2, STAND_LON, DX/DY, CEN_LAT/LON global
+         attributes geogrid writes.
+
+Created on Sun Oct 18 18:00:00 2026
+"""
+
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, '1D_Data_Plot'))
+
+from Tile_Reader import TILE_DIM, TILE_SIZE, HALO, TILE_DTYPE
+from Tile_Index import tileName, rowToLat, colToLon, latToRow, lonToCol
+
+EARTH_RADIUS_WRF = 6370000.0  # sphere radius used by WPS projections (m)
+
+# (amplitude m, wavelength degrees, direction degrees) of the terrain waves
+_WAVES = [(900.0, 2.70, 20.0), (600.0, 1.10, 75.0), (350.0, 0.45, 140.0),
+          (180.0, 0.16, 35.0), (90.0, 0.05, 110.0), (40.0, 0.011, 60.0)]
+
+
+# This function evaluates the synthetic terrain height
+# Inputs: lats, lons, arrays of latitudes and longitudes (degrees)
+# Output: an array of heights (m) of the broadcast shape of lats and lons
+def terrainHeight(lats, lons):
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    height = np.full(np.broadcast(lats, lons).shape, 1200.0)
+    rng = np.random.RandomState(30)
+    for amp, wavelength, direction in _WAVES:
+        angle = np.radians(direction)
+        phase = rng.uniform(0, 2 * np.pi)
+        along = lons * np.cos(angle) + lats * np.sin(angle)
+        height += amp * np.sin(2 * np.pi * along / wavelength + phase)
+    return np.clip(height, 0.0, None)
+
+
+# This function writes one synthetic topo_30s tile, halo included
+# Inputs: tile_dir (str), the directory to write into
+#         row0, col0 (int), the 0-based global origin of the tile interior
+# Output: the path of the tile file
+def makeTile(tile_dir, row0, col0):
+    rows = np.arange(row0 - HALO, row0 - HALO + TILE_DIM)
+    cols = np.arange(col0 - HALO, col0 - HALO + TILE_DIM)
+    height = terrainHeight(rowToLat(rows)[:, None], colToLon(cols)[None, :])
+    path = os.path.join(tile_dir, tileName(row0, col0))
+    np.rint(height).astype(TILE_DTYPE).tofile(path)
+    return path
+
+
+# This function writes the synthetic tiles covering a lat/lon box
+# Inputs: tile_dir (str), the directory to write into (created if needed)
+#         lat_min, lat_max, lon_min, lon_max, the box in degrees
+# Output: a list of the tile paths
+def makeTileSet(tile_dir, lat_min, lat_max, lon_min, lon_max):
+    os.makedirs(tile_dir, exist_ok=True)
+    first_row = latToRow(lat_min) // TILE_SIZE * TILE_SIZE
+    first_col = lonToCol(lon_min) // TILE_SIZE * TILE_SIZE
+    paths = []
+    for row0 in range(first_row, latToRow(lat_max - 1e-9) + 1, TILE_SIZE):
+        for col0 in range(first_col, lonToCol(lon_max - 1e-9) + 1, TILE_SIZE):
+            path = os.path.join(tile_dir, tileName(row0, col0))
+            paths.append(path if os.path.exists(path)
+                         else makeTile(tile_dir, row0, col0))
+    return paths
+
+
+# This function returns the constants of a Lambert conformal projection
+# on the WPS sphere: the cone constant n and the scale factor R * F
+def _lambertCone(truelat1, truelat2):
+    phi1, phi2 = np.radians(truelat1), np.radians(truelat2)
+    if abs(truelat1 - truelat2) < 1e-9:
+        n = np.sin(phi1)
+    else:
+        n = (np.log(np.cos(phi1) / np.cos(phi2)) /
+             np.log(np.tan(np.pi / 4 + phi2 / 2) / np.tan(np.pi / 4 + phi1 / 2)))
+    F = np.cos(phi1) * np.tan(np.pi / 4 + phi1 / 2)**n / n
+    return n, EARTH_RADIUS_WRF * F
+
+
+# This function computes the latitudes and longitudes of a Lambert conformal
+# grid centred on a point
+# Inputs: nx, ny (int), grid points in the west_east and south_north directions
+#         dx (float), the grid spacing (m)
+#         cen_lat, cen_lon, the centre of the grid (degrees)
+#         truelat1, truelat2, stand_lon, the projection parameters (degrees)
+# Outputs: lats, lons, 2D arrays (ny, nx) of the grid point coordinates
+def lambertGrid(nx, ny, dx, cen_lat, cen_lon, truelat1, truelat2, stand_lon):
+    n, RF = _lambertCone(truelat1, truelat2)
+    rho_c = RF / np.tan(np.pi / 4 + np.radians(cen_lat) / 2)**n
+    theta_c = n * np.radians(cen_lon - stand_lon)
+    x = rho_c * np.sin(theta_c) + (np.arange(nx) - (nx - 1) / 2.0) * dx
+    y = -rho_c * np.cos(theta_c) + (np.arange(ny) - (ny - 1) / 2.0) * dx
+    x, y = np.meshgrid(x, y)
+    rho = np.hypot(x, y)
+    lats = np.degrees(2 * np.arctan((RF / rho)**(1 / n)) - np.pi / 2)
+    lons = stand_lon + np.degrees(np.arctan2(x, -y) / n)
+    return lats, lons
+
+
+# This function writes a small geo_em-like netCDF file on a Lambert
+# conformal grid whose terrain is the synthetic field sampled at the grid
+# points (no smoothing, as if the grid were interpolated with 'average_gcell'
+# from an infinitely fine source)
+# Inputs: file_path (str), the path of the netCDF file
+#         nx, ny (int), grid points in the west_east and south_north directions
+#         dx (float), the grid spacing (m)
+#         cen_lat, cen_lon, the centre of the grid (degrees)
+#         truelat1, truelat2, stand_lon, the projection parameters (degrees)
+# Output: file_path
+def makeGeoEm(file_path, nx, ny, dx, cen_lat=50.0, cen_lon=-122.0,
+              truelat1=49.0, truelat2=54.0, stand_lon=-122.0):
+    from netCDF4 import Dataset
+    lats, lons = lambertGrid(nx, ny, dx, cen_lat, cen_lon,
+                             truelat1, truelat2, stand_lon)
+    with Dataset(file_path, 'w') as nc:
+        nc.createDimension('Time', None)
+        nc.createDimension('south_north', ny)
+        nc.createDimension('west_east', nx)
+        for name, values, units in (('XLAT_M', lats, 'degrees latitude'),
+                                    ('XLONG_M', lons, 'degrees longitude'),
+                                    ('HGT_M', terrainHeight(lats, lons),
+                                     'meters MSL')):
+            var = nc.createVariable(name, 'f4',
+                                    ('Time', 'south_north', 'west_east'))
+            var.units = units
+            var.stagger = 'M'
+            var[0] = values
+        nc.TITLE = 'OUTPUT FROM GEOGRID (synthetic)'
+        nc.GRIDTYPE = 'C'
+        nc.MAP_PROJ = np.int32(1)
+        nc.MAP_PROJ_CHAR = 'Lambert Conformal'
+        nc.DX = np.float32(dx)
+        nc.DY = np.float32(dx)
+        nc.CEN_LAT = np.float32(cen_lat)
+        nc.CEN_LON = np.float32(cen_lon)
+        nc.TRUELAT1 = np.float32(truelat1)
+        nc.TRUELAT2 = np.float32(truelat2)
+        nc.STAND_LON = np.float32(stand_lon)
+        nc.MOAD_CEN_LAT = np.float32(cen_lat)
+        nc.POLE_LAT = np.float32(90.0)
+        nc.POLE_LON = np.float32(0.0)
+        nc.corner_lats = np.float32([lats[0, 0], lats[-1, 0],
+                                     lats[-1, -1], lats[0, -1]])
+        nc.corner_lons = np.float32([lons[0, 0], lons[-1, 0],
+                                     lons[-1, -1], lons[0, -1]])
+    return file_path
+
+
+# This function reads the grid of a geo_em file without wrf-python
+# Inputs: file_path (str), the path of the geo_em netCDF file
+# Outputs: lats, lons, elev, 2D arrays of the grid point coordinates and
+#          terrain height
+def readGeoEm(file_path):
+    from netCDF4 import Dataset
+    with Dataset(file_path, 'r') as nc:
+        return tuple(np.asarray(nc.variables[name][0])
+                     for name in ('XLAT_M', 'XLONG_M', 'HGT_M'))
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: real-FFT versions of the DFT routines in Fourier_CSV_Filtering.py.
+         They return the same real/imaginary components, variance spectrum
+         and low-pass filtered series, in O(N log N) instead of O(N^2).
+         Every function works along the last axis, so a 2D array holding
+         one transect per row is filtered in a single call.
+
+Created on Sun Oct 18 13:00:00 2026
+"""
+
+import numpy as np
+
+
+# This function carrys out both parts of the DFT with one real FFT
+# Inputs: samples    (array),    the sample points for DFT (one series per row)
+# Output: reals, imags, the real and imaginary parts of the DFT for the
+#         wavenumbers 0 to N/2 (arrays of last dimension N // 2 + 1)
+def halfDFT(samples):
+    samples = np.asarray(samples, dtype=np.float64)
+    coeffs = np.fft.rfft(samples) / samples.shape[-1]
+    return coeffs.real, coeffs.imag
+
+
+# This function carrys out a discrete Fourier transform (DFT)
+# Inputs: samples    (array),    the sample points for DFT (one series per row)
+# Output: the real part of the DFT (array of the shape of samples)
+def realDFT(samples):
+    reals = halfDFT(samples)[0]
+    return _mirrorHalf(reals, np.shape(samples)[-1])
+
+
+# This function carrys out a discrete Fourier transform (DFT)
+# Inputs: samples    (array),    the sample points for DFT (one series per row)
+# Output: the imaginary part of the DFT (array of the shape of samples)
+def imagDFT(samples):
+    imags = halfDFT(samples)[1]
+    return _mirrorHalf(imags, np.shape(samples)[-1], sign=-1.0)
+
+
+# This function extends the wavenumbers 0 to N/2 of a real DFT component to
+# all N wavenumbers, using the symmetry of the DFT of a real series
+# (wavenumber N - k holds the complex conjugate of wavenumber k)
+def _mirrorHalf(half, N, sign=1.0):
+    mirror = sign * half[..., 1:(N + 1) // 2][..., ::-1]
+    return np.concatenate([half, mirror], axis=-1)
+
+
+# This function computes the variance spectrum of a DFT
+# Inputs: reals (array), the real components of the DFT
+#         imags (array), the imaginary component of the DFT
+# Output: the variance spectrum of the DFT for wavenumbers 0 to N/2 (array)
+# Requires: length of reals must equals length of imags
+def spectrum(reals, imags):
+    nyquist = np.shape(reals)[-1] // 2
+    reals = np.asarray(reals)[..., :nyquist + 1]
+    imags = np.asarray(imags)[..., :nyquist + 1]
+    return reals**2 + imags**2
+
+
+# This function filters the variance spectrum of a DFT
+# Inputs: reals (array), the real components of the DFT
+#         imags (array), the imaginary component of the DFT
+#         threshold (int), assign zero filter weights to all wavenumbers
+#                          from this threshold up
+# Output: the filtered variance spectrum of the DFT (array of last
+#         dimension len(reals) + 1)
+# Requires: length of reals must equals length of imags
+#           threshold <= len(reals)
+def filterSpectrum(reals, imags, threshold):
+    reals = np.asarray(reals)
+    imags = np.asarray(imags)
+    filteredSpec = np.zeros(reals.shape[:-1] + (reals.shape[-1] + 1,))
+    filteredSpec[..., :threshold] = (reals[..., :threshold]**2
+                                     + imags[..., :threshold]**2)
+    return filteredSpec
+
+
+# This function carrys out an inverse discrete Fourier transform (IDFT),
+# summing (as the loop version does) the components of wavenumbers 0 to
+# threshold only, then evaluating the sum with one inverse real FFT
+# Inputs: reals (array), the real components of the DFT
+#         imags (array), the imaginary component of the DFT
+#         threshold (int), assign zero filter weights to all wavenumbers
+#                          above this threshold
+# Outputs: the filtered space series (array of the shape of reals)
+def inverseDFT(reals, imags, threshold):
+    N = np.shape(reals)[-1]
+    half = N // 2 + 1
+    coeffs = (np.asarray(reals, dtype=np.float64)[..., :half]
+              + 1j * np.asarray(imags, dtype=np.float64)[..., :half])
+    return _inverseHalfDFT(coeffs, N, threshold)
+
+
+# This function low-pass filters space series directly from their samples
+# Inputs: samples    (array),    the sample points (one series per row)
+#         threshold (int), assign zero filter weights to all wavenumbers
+#                          above this threshold
+# Outputs: the filtered space series (array of the shape of samples),
+#          identical to inverseDFT(realDFT(samples), imagDFT(samples), threshold)
+def lowPassFilter(samples, threshold):
+    samples = np.asarray(samples, dtype=np.float64)
+    N = samples.shape[-1]
+    return _inverseHalfDFT(np.fft.rfft(samples) / N, N, threshold)
+
+
+# This function evaluates the truncated DFT sum from the coefficients of
+# wavenumbers 0 to N/2. Wavenumbers k and N - k carry conjugate coefficients
+# and contribute the same cosine wave, so each is weighted by how many of
+# the two are kept; irfft doubles every wavenumber except 0 and (for even N)
+# the Nyquist one, hence the factor 0.5 on the others.
+def _inverseHalfDFT(coeffs, N, threshold):
+    k = np.arange(N // 2 + 1)
+    kept = (k <= threshold).astype(np.float64)
+    kept += (k > 0) & (N - k <= threshold) & (N - k != k)
+    weights = np.where((k == 0) | (2 * k == N), 1.0, 0.5) * kept
+    return np.fft.irfft(coeffs * weights * N, n=N)
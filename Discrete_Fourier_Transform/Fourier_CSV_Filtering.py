@@ -14,138 +14,80 @@ Created on Sun Jan 14 11:47:33 2018
 """
 
 import csv 
-import numpy as np
-import math 
+import os
+import sys
 import matplotlib.pyplot as plt
+from FFT_Filtering import realDFT, imagDFT, inverseDFT
 
-# This function carrys out a discrete Fourier transform (DFT)
-# Inputs: samples    (array),    the sample points for DFT
-# Output: the real part of the DFT (array of size len(samples))
-def realDFT(samples):
-    N = len(samples)
-    realComp = np.zeros(N) 
-    
-    for k in range(N):
-        sum = 0
-        for n in range(N):
-            sum += samples[n] * math.cos(2 * math.pi * k * n / N)
-        realComp[k] = sum / N
-    
-    return realComp
-            
-# This function carrys out a discrete Fourier transform (DFT)
-# Inputs: samples    (array),    the sample points for DFT
-# Output: the imaginary part of the DFT (array of size len(samples))
-def imagDFT(samples):
-    N = len(samples)
-    imagComp = np.zeros(N) 
-    
-    for k in range(N):
-        sum = 0
-        for n in range(N):
-            sum += samples[n] * math.sin(2 * math.pi * k * n / N)
-        imagComp[k] =  - 1.0 * sum / N 
-    
-    return imagComp
-
-# This function computes the variance spectrum of a DFT
-# Inputs: reals (array), the real components of the DFT
-#         imags (array), the imaginary component of the DFT
-# Output: the variance spectrum of the DFT (array)
-# Requires: length of reals must equals length of imags
-def spectrum(reals, imags):
-    nyquist = len(reals) / 2
-    spec = np.zeros(nyquist + 1)
-    
-    for i in range(nyquist + 1):
-        spec[i] = reals[i]**2 + imags[i]**2 
-    return spec
-
-# This function filters the variance spectrum of a DFT
-# Inputs: reals (array), the real components of the DFT
-#         imags (array), the imaginary component of the DFT
-#         threshold (int), assign zero filter weights to all wavenumbers 
-#                          below this threshold
-# Output: the filtered variance spectrum of the DFT (array)
-# Requires: length of reals must equals length of imags
-#           threshold <= len(reals)
-def filterSpectrum(reals, imags, threshold):
-    filteredSpec = np.zeros(len(reals) + 1)
-    
-    for i in range(threshold):
-        filteredSpec[i] = reals[i]**2 + imags[i]**2 
-    return filteredSpec
-        
-# This function carrys out an inverse discrete Fourier transform (IDFT)
-# Inputs: reals (array), the real components of the DFT
-#         imags (array), the imaginary component of the DFT
-#         threshold (int), assign zero filter weights to all wavenumbers 
-#                          below this threshold
-# Outputs: the filtered space series (array of size(threshold + 1))
-def inverseDFT(reals, imags, threshold):
-    N = len(reals)
-    filteredReals = np.zeros(threshold + 1)
-    filteredImags = np.zeros(threshold + 1)
-    filteredSeries = np.zeros(N)
-    
-    for i in range(threshold + 1):
-        filteredReals[i] = reals[i]
-        filteredImags[i] = imags[i]
-        
-    for n in range(N):
-        sum = 0;
-        for k in range(threshold + 1): 
-            sum += filteredReals[k] * math.cos(2 * math.pi * k * n / N)
-            sum -= filteredImags[k] * math.sin(2 * math.pi * k * n / N)
-        filteredSeries[n] = sum
-
-    return filteredSeries 
-
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, '1D_Data_Plot'))
+from Transect_Output import readTransects
+from Stage_Cache import StageCache
+from Pipeline_Timer import timer, parseFlags
 
 """
 START OF PROGRAM
 
 """
 
-with open('BC_Elevation_Longitude_124-122.csv') as csvfile: 
-    readCSV = csv.reader(csvfile, delimiter=',') 
+input_file = 'BC_Elevation_Longitude_124-122.csv' # a latitude, longitude, elevation csv
+                                                  # or a transect file (.npz, .nc, .parquet)
+threshold = 10;
+timer.quiet = parseFlags(sys.argv[1:])[2] # add --quiet to skip printing the DFT components
+cache = StageCache('stage_cache') # stage results reused while their inputs and parameters are unchanged
+
+if input_file.endswith('.csv'):
+    with open(input_file) as csvfile: 
+        readCSV = csv.reader(csvfile, delimiter=',') 
 
-    longitudes = [] # longitudes in degree decimal (DD) format
-    elevations = [] # elevations in metres 
-    
-    for row in readCSV:
-        latitude  = float(row[0])
-        longitude = float(row[1])
-        elevation = float(row[2])
+        longitudes = [] # longitudes in degree decimal (DD) format
+        elevations = [] # elevations in metres 
         
-        longitudes.append(longitude)
-        elevations.append(elevation)
+        for row in readCSV:
+            latitude  = float(row[0])
+            longitude = float(row[1])
+            elevation = float(row[2])
+            
+            longitudes.append(longitude)
+            elevations.append(elevation)
+else:
+    # raw heights of the first transect, read as whole columns
+    transects = readTransects(input_file)
+    latitude = transects['latitude'][0]
+    longitudes = transects['longitude']
+    elevations = transects['raw'][0]
 
 
-    reals = realDFT(elevations)
-    imags = imagDFT(elevations)
-    threshold = 10;
-    filtered = inverseDFT(reals, imags, threshold)
-    
+reals = realDFT(elevations)
+imags = imagDFT(elevations)
+
+# the filtered series is kept per input file and threshold, and the figure
+# is only drawn again when one of them changes
+filtered, filter_key = cache.run('low-pass filter',
+                                 lambda: {'filtered': inverseDFT(reals, imags, threshold)},
+                                 [input_file], threshold=threshold)
+filtered = filtered['filtered']
+
+def plot(file_path):
     # Set figure width to 12.0 and height to 4.0
     fig_size = plt.rcParams["figure.figsize"] 
     fig_size[0] = 12
     fig_size[1] = 4
     plt.rcParams["figure.figsize"] = fig_size
-    
+
     # Plot the figure 
     plt.plot(longitudes, elevations, 'b')
     plt.plot(longitudes, filtered, 'r')
-    
+
     plt.xlabel('Longitude ($^\circ$)')
     plt.ylabel('Terrain Elevation (m)')
     plt.title('British Columbia %.2f$^\circ$N Terrain Elevation' %latitude)
     plt.grid()
-    plt.savefig('BC Terrain Elevation.pdf')
-    
-    for i in range(len(reals)):
-        print("number: %d" %i)
-        print("real component: %f" %reals[i]) 
-        print("imaginary component: %f" %imags[i])
-        print("\n") 
-    
\ No newline at end of file
+    plt.savefig(file_path)
+
+cache.output('plot', 'BC Terrain Elevation.pdf', plot, filtered=filter_key)
+
+for i in range(len(reals)):
+    timer.log("number: %d" %i)
+    timer.log("real component: %f" %reals[i]) 
+    timer.log("imaginary component: %f" %imags[i])
+    timer.log("\n") 
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: 2D radially averaged power spectra of the geo_em model terrain
+         ('ter') against the raw topo_30s terrain of the same region, for
+         every grid size in one run. Unlike a transect, the 2D spectrum sees
+         the terrain structure in every direction.
+
+         Each field is detrended (its mean and best-fit plane removed),
+         tapered with a 2D Hann window and transformed with one real 2D FFT
+         on all the CPUs. The field is held as float32 and windowed in
+         place, so the FFT makes the only complex (complex64) copy of it,
+         which is dropped once its power has been binned. The power is
+         binned a block of rows at a time by radial wavenumber, on bins
+         shared by all the grids, so the spectra can be overlaid directly:
+
+             'wavenumber'  (n_bin,)          bin centres, cycles per km
+             'raw'         (n_grid, n_bin)   topo_30s spectrum of the window
+                                             around each geo_em domain
+             'grid'        (n_grid, n_bin)   geo_em terrain spectrum
+             'grid_size'   (n_grid,)         grid sizes (str, km)
+
+         The power is a spectral density (m^2 km^2), so spectra of fields of
+         different spacing are comparable; bins beyond the Nyquist
+         wavenumber of a field (or with no wavenumber in them) are NaN.
+
+         usage: python Radial_Spectrum.py TILE_DIR GEO_EM_FILE...
+                       [--bins N] [--output radial_spectra.npz|.csv]
+
+Created on Sun Oct 18 12:40:49 2026
+"""
+
+import math
+import os
+import re
+import sys
+import numpy as np
+from scipy import fft
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, '1D_Data_Plot'))
+from Tile_Index import TileIndex
+from Spectral_Smoothing_2D import ROW_SPACING
+from Dtype_Policy import valueArray
+
+BINS = 60               # logarithmic wavenumber bins
+ROW_BLOCK = 1024        # FFT rows binned at a time
+GEO_EM_NAME = re.compile(r'^geo_em\.(.+)\.nc$')
+
+
+# This function returns logarithmic radial wavenumber bins covering fields
+# of the given extents and spacings
+# Inputs: longest (float), the longest wavelength (km) to resolve
+#         shortest (float), the shortest spacing (km) of the fields
+#         n (int), the number of bins
+# Output: the bin edges (n + 1,), cycles per km
+def logBins(longest, shortest, n=BINS):
+    return np.logspace(math.log10(1.0 / longest),
+                       math.log10(0.5 / shortest), n + 1)
+
+
+# This function removes the mean and the best-fit plane of a field in place
+# Inputs: field, a 2D float32 array
+def detrendPlane(field):
+    rows, cols = field.shape
+    y = np.arange(rows, dtype=np.float64) - (rows - 1) / 2.0
+    x = np.arange(cols, dtype=np.float64) - (cols - 1) / 2.0
+    mean = field.mean(dtype=np.float64)
+    # the row and column coordinates are centred, so the plane fit splits
+    # into two independent slopes
+    slope_y = (field.sum(axis=1, dtype=np.float64) @ y) / (cols * (y @ y))
+    slope_x = (field.sum(axis=0, dtype=np.float64) @ x) / (rows * (x @ x))
+    field -= np.float32(mean)
+    field -= (slope_y * y).astype(np.float32)[:, None]
+    field -= (slope_x * x).astype(np.float32)[None, :]
+
+
+# This function computes the radially averaged power spectrum of a field
+# Inputs: field, a 2D array (it is copied once, to float32)
+#         dy, dx (float), the grid spacing (km) along the rows and columns
+#         edges, the radial wavenumber bin edges (cycles per km)
+#         workers (int), the number of FFT threads (-1 uses all CPUs)
+# Output: an array (len(edges) - 1,), the mean power spectral density of
+#         the wavenumbers in each bin (NaN for empty bins)
+def radialSpectrum(field, dy, dx, edges, workers=-1):
+    field = np.array(field, dtype=np.float32)
+    rows, cols = field.shape
+    detrendPlane(field)
+    wy = np.hanning(rows).astype(np.float32)
+    wx = np.hanning(cols).astype(np.float32)
+    field *= wy[:, None]
+    field *= wx[None, :]
+    norm = dy * dx / (rows * cols * float(wy @ wy) / rows *
+                      float(wx @ wx) / cols)
+    spec = fft.rfft2(field, workers=workers, overwrite_x=True)
+    del field
+
+    ky = fft.fftfreq(rows, d=dy)
+    kx = fft.rfftfreq(cols, d=dx)
+    # the columns 1 .. cols/2 - 1 of a real FFT stand for their mirror too
+    mirror = np.where((np.arange(len(kx)) > 0) &
+                      (2 * np.arange(len(kx)) != cols), 2.0, 1.0)
+    nyquist = min(0.5 / dy, 0.5 / dx)   # the corners beyond are left out
+    n_bin = len(edges) - 1
+    power, count = np.zeros(n_bin), np.zeros(n_bin)
+    for r0 in range(0, rows, ROW_BLOCK):
+        block = spec[r0:r0 + ROW_BLOCK]
+        p = block.real**2 + block.imag**2
+        k = np.hypot(ky[r0:r0 + ROW_BLOCK, None], kx[None, :])
+        idx = np.searchsorted(edges, k, side='right') - 1
+        inside = (idx >= 0) & (idx < n_bin) & (k <= nyquist)
+        weights = np.broadcast_to(mirror, p.shape)[inside]
+        power += np.bincount(idx[inside], weights=p[inside] * weights,
+                             minlength=n_bin)
+        count += np.bincount(idx[inside], weights=weights, minlength=n_bin)
+    with np.errstate(invalid='ignore'):
+        return np.where(count > 0, power * norm / count, np.nan)
+
+
+# This function reads the model terrain of a geo_em file
+# Inputs: file_path (str), the path of the geo_em netCDF file
+# Outputs: ter, lats, lons, the 2D terrain height (m) and coordinates
+#          dx (float), the grid spacing in km
+def readTerrain(file_path):
+    from netCDF4 import Dataset
+    from wrf import to_np, getvar, latlon_coords
+    with Dataset(file_path, 'r') as nc:
+        hgt = getvar(nc, 'ter')  # Model terrain height (from wrf-python)
+        lats, lons = latlon_coords(hgt, as_np=True)
+        return valueArray(to_np(hgt)), lats, lons, float(nc.DX) / 1000.0
+
+
+# This function computes the spectra of several geo_em grids and of the
+# topo_30s terrain around each of them
+# Inputs: tiles, the TileIndex of the topo_30s tiles
+#         geo_files, the paths of the geo_em files
+#         bins (int), the number of wavenumber bins
+#         workers (int), the number of FFT threads (-1 uses all CPUs)
+# Output: the spectra dict described at the top of this file
+def radialSpectra(tiles, geo_files, bins=BINS, workers=-1):
+    grids = []
+    for path in geo_files:
+        ter, lats, lons, dx = readTerrain(path)
+        grids.append((ter, (lats.min(), lats.max(), lons.min(), lons.max()),
+                      dx))
+    longest = max(max(ter.shape) * dx for ter, _, dx in grids)
+    raw_dx = ROW_SPACING * math.cos(math.radians(
+        max(max(abs(box[0]), abs(box[1])) for _, box, _ in grids)))
+    edges = logBins(longest, min([raw_dx] + [dx for _, _, dx in grids]),
+                    bins)
+
+    raw, grid = [], []
+    for ter, box, dx in grids:
+        grid.append(radialSpectrum(ter, dx, dx, edges, workers))
+        # the window is read as int16 and converted once to float32 inside
+        # radialSpectrum; its column spacing is taken at the centre latitude
+        window = tiles.window(*box)
+        centre = math.radians(0.5 * (box[0] + box[1]))
+        raw.append(radialSpectrum(window.read(), ROW_SPACING,
+                                  ROW_SPACING * math.cos(centre), edges,
+                                  workers))
+    return {'wavenumber': np.sqrt(edges[:-1] * edges[1:]),
+            'raw': np.array(raw), 'grid': np.array(grid),
+            'grid_size': np.array([_gridSize(p) for p in geo_files])}
+
+
+def _gridSize(file_path):
+    name = os.path.basename(file_path)
+    match = GEO_EM_NAME.match(name)
+    return match.group(1) if match else name
+
+
+# This function writes the spectra, as .npz or as a CSV table with one row
+# per wavenumber bin
+def writeSpectra(file_path, spectra):
+    if os.path.splitext(file_path)[1].lower() == '.npz':
+        np.savez(file_path, **spectra)
+        return
+    columns = [('Wavenumber (cycles/km)', spectra['wavenumber'])]
+    for g, size in enumerate(spectra['grid_size']):
+        columns.append(('topo_30s around %s km grid (m2 km2)' % size,
+                        spectra['raw'][g]))
+        columns.append(('WPS %s km grid (m2 km2)' % size, spectra['grid'][g]))
+    np.savetxt(file_path, np.column_stack([c for _, c in columns]),
+               fmt='%.6g', delimiter=',',
+               header=','.join(label for label, _ in columns), comments='')
+
+
+"""
+START OF PROGRAM
+"""
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    options = {'--bins': str(BINS), '--output': 'radial_spectra.npz'}
+    for flag in options:
+        if flag in args:
+            k = args.index(flag)
+            options[flag] = args[k + 1]
+            del args[k:k + 2]
+    tile_dir, geo_files = args[0], args[1:]
+
+    spectra = radialSpectra(TileIndex(tile_dir), geo_files,
+                            int(options['--bins']))
+    writeSpectra(options['--output'], spectra)
+    print('Wrote the spectra of %d grids to %s' % (len(geo_files),
+                                                   options['--output']))
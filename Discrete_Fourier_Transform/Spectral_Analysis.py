@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: averaged variance spectra of many transects per WPS grid size, and
+         the effective resolution of each geo_em grid. Every transect (raw
+         topo_30s and each grid) is cut into overlapping segments (Welch's
+         method), each segment is detrended, Hann-windowed and transformed
+         with a real FFT, and the segment spectra are averaged over all the
+         segments of all the transects. The spacing of a constant-latitude
+         transect shrinks with cos(latitude), so the transects are first
+         resampled (linearly) to the finest spacing among them; every
+         segment then covers the same distance and its power falls in the
+         same wavenumber bins. Segments where a grid has no data
+         (NaN outside its domain) are left out, and the raw spectrum a grid
+         is compared with is averaged over exactly the segments that grid
+         kept. All the transects of a chunk are transformed in one call.
+
+         The effective resolution of a grid is the longest wavelength at
+         which the grid spectrum falls below a fraction (default 1/2) of the
+         raw spectrum, i.e. where the grid has lost most of the terrain
+         variance; it is usually quoted in multiples of the grid size.
+
+         usage: python Spectral_Analysis.py TRANSECT_FILE... [--segment N]
+                       [--fraction F] [--output FILE.npz]
+
+Created on Sun Oct 18 12:39:37 2026
+"""
+
+import math
+import os
+import sys
+import numpy as np
+from scipy import fft
+from numpy.lib.stride_tricks import sliding_window_view
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, '1D_Data_Plot'))
+from Transect_Output import readTransects
+
+EARTH_RADIUS = 6371.0       # km
+SEGMENT = 1024              # samples per Welch segment
+FRACTION = 0.5
+
+
+# This function computes the spectra of the overlapping segments of series
+# Inputs: series, an array (..., N) of series (one per row)
+#         segment (int), step (int), the length of and the step between
+#                        the segments
+#         workers (int), the number of FFT threads (-1 uses all CPUs)
+# Outputs: power, an array (..., n_segment, segment // 2 + 1) of the
+#                 variance of each wavenumber (m^2; one-sided, so a
+#                 segment's power sums to its windowed variance)
+#          valid, a boolean array (..., n_segment), False where a segment
+#                 holds a NaN (its power is then 0)
+def segmentPower(series, segment, step, workers=-1):
+    segs = sliding_window_view(np.asarray(series, dtype=np.float64),
+                               segment, axis=-1)[..., ::step, :]
+    valid = np.isfinite(segs).all(axis=-1)
+    segs = np.where(valid[..., None], segs, 0.0)
+    # remove the mean and the linear trend of every segment
+    t = np.arange(segment) - (segment - 1) / 2.0
+    segs = segs - segs.mean(axis=-1, keepdims=True)
+    segs -= (segs @ t / (t @ t))[..., None] * t
+    window = np.hanning(segment)
+    coeffs = fft.rfft(segs * window, axis=-1, workers=workers)
+    power = coeffs.real**2 + coeffs.imag**2
+    power[..., 1:(segment + 1) // 2] *= 2.0    # the mirrored wavenumbers
+    power /= segment * (window**2).sum()
+    return power, valid
+
+
+# This function returns the sample spacing (km) of every transect
+# Inputs: transects, a transects dict (see Transect_Output.py) or a path
+#         transect dict (see Transects.py)
+# Output: an array (n_transect,) of spacings
+def sampleSpacing(transects):
+    if 'distance' in transects:
+        return np.atleast_1d(np.mean(np.diff(transects['distance'])))
+    step = abs(transects['longitude'][1] - transects['longitude'][0])
+    return (math.radians(step) * EARTH_RADIUS *
+            np.cos(np.radians(np.atleast_1d(transects['latitude']))))
+
+
+# This function resamples series to a finer sample spacing by linear
+# interpolation; samples past the end of a series are NaN
+# Inputs: series, an array (n_transect, ..., N) of series
+#         ratio, an array (n_transect,) of the new spacing of each series in
+#                units of its own spacing (<= 1; 1 keeps the series as is)
+#         length (int), the number of samples of the resampled series
+# Output: an array (n_transect, ..., length)
+def resample(series, ratio, length):
+    series = np.asarray(series, dtype=np.float64)
+    n = series.shape[-1]
+    ratio = np.asarray(ratio, dtype=np.float64)
+    pos = np.arange(length) * ratio.reshape((-1,) + (1,) * (series.ndim - 1))
+    pos = np.broadcast_to(pos, series.shape[:-1] + (length,))
+    i0 = np.clip(np.floor(pos), 0, n - 1).astype(np.intp)
+    w = pos - i0
+    y0 = np.take_along_axis(series, i0, axis=-1)
+    y1 = np.take_along_axis(series, np.minimum(i0 + 1, n - 1), axis=-1)
+    # a sample that falls on a source sample is copied, so a NaN next to it
+    # does not spread
+    out = np.where(w > 0, y0 * (1.0 - w) + y1 * w, y0)
+    out[pos > n - 1] = np.nan
+    return out
+
+
+# This function computes the Welch-averaged spectra of a set of transects
+# Inputs: transects, a transects dict or a path transect dict
+#         segment (int), samples per segment
+#         overlap (float), the fraction of a segment shared with the next
+#         chunk (int), transects transformed at a time (bounds the memory)
+#         workers (int), the number of FFT threads (-1 uses all CPUs)
+# Output: a dict of
+#         'wavenumber' (F,)          cycles per km
+#         'raw'        (F,)          raw spectrum over all raw segments
+#         'raw_matched' (n_grid, F)  raw spectrum over each grid's segments
+#         'grid'       (n_grid, F)   grid spectra
+#         'segments'   (n_grid,)     segments averaged for each grid
+#         'grid_size'  (n_grid,)     the grid sizes (str, km)
+def welchSpectra(transects, segment=SEGMENT, overlap=0.5, chunk=256,
+                 workers=-1):
+    raw = np.atleast_2d(transects['raw'])
+    interp = transects['interp']
+    if interp.ndim == 2:                # a single path transect
+        interp = interp[None]
+    # resample every transect to the finest spacing among them
+    spacings = np.broadcast_to(sampleSpacing(transects), raw.shape[:1])
+    spacing = spacings.min()
+    ratio = spacing / spacings
+    length = int(math.floor((raw.shape[-1] - 1) / ratio.min() + 1e-9)) + 1
+    segment = min(segment, length)
+    step = max(int(round(segment * (1.0 - overlap))), 1)
+    n_grid, n_freq = interp.shape[1], segment // 2 + 1
+
+    raw_sum, raw_count = np.zeros(n_freq), 0
+    matched_sum = np.zeros((n_grid, n_freq))
+    grid_sum = np.zeros((n_grid, n_freq))
+    counts = np.zeros(n_grid, dtype=np.int64)
+    for t0 in range(0, raw.shape[0], chunk):
+        r = ratio[t0:t0 + chunk]
+        raw_power, raw_valid = segmentPower(
+            resample(raw[t0:t0 + chunk], r, length), segment, step, workers)
+        grid_power, grid_valid = segmentPower(
+            resample(interp[t0:t0 + chunk], r, length), segment, step,
+            workers)
+        both = (raw_valid[:, None, :] & grid_valid).astype(np.float64)
+        raw_sum += np.einsum('tsf,ts->f', raw_power, raw_valid)
+        raw_count += raw_valid.sum()
+        matched_sum += np.einsum('tsf,tgs->gf', raw_power, both)
+        grid_sum += np.einsum('tgsf,tgs->gf', grid_power, both)
+        counts += both.sum(axis=(0, 2)).astype(np.int64)
+
+    per_grid = np.where(counts > 0, counts, 1)[:, None]
+    with np.errstate(invalid='ignore'):
+        return {'wavenumber': fft.rfftfreq(segment, d=spacing),
+                'raw': raw_sum / raw_count if raw_count else
+                np.full(n_freq, np.nan),
+                'raw_matched': np.where(counts[:, None] > 0,
+                                        matched_sum / per_grid, np.nan),
+                'grid': np.where(counts[:, None] > 0, grid_sum / per_grid,
+                                 np.nan),
+                'segments': counts,
+                'grid_size': np.asarray(transects['grid_size'], dtype=str)}
+
+
+# This function estimates the effective resolution of every grid: the
+# longest wavelength where the grid spectrum drops below fraction times the
+# raw spectrum (interpolated in log wavenumber between the two spectral
+# bins on either side of the drop)
+# Inputs: spectra, the dict returned by welchSpectra
+#         fraction (float), the variance ratio that counts as resolved
+# Output: an array (n_grid,) of wavelengths in km (NaN where the ratio never
+#         drops below fraction, or the grid had no segments)
+def effectiveResolution(spectra, fraction=FRACTION):
+    k = spectra['wavenumber']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = spectra['grid'] / spectra['raw_matched']
+    below = ratio[:, 1:] < fraction          # the mean (k = 0) is skipped
+    found = below.any(axis=1)
+    i = below.argmax(axis=1) + 1
+    rows = np.arange(len(i))
+    r0, r1 = ratio[rows, i - 1], ratio[rows, i]
+    k0, k1 = k[np.maximum(i - 1, 1)], k[i]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        frac = np.clip((r0 - fraction) / (r0 - r1), 0.0, 1.0)
+        k_eff = np.where(i > 1, np.exp(np.log(k0) + frac *
+                                       (np.log(k1) - np.log(k0))), k1)
+    return np.where(found, 1.0 / k_eff, np.nan)
+
+
+# This function formats the effective resolutions as a table
+# Output: the table (str), comma separated with a header line
+def resolutionTable(spectra, wavelengths):
+    lines = ['grid_size,effective_wavelength_km,grid_lengths,segments']
+    for size, wavelength, n in zip(spectra['grid_size'], wavelengths,
+                                   spectra['segments']):
+        try:
+            multiple = '%.3g' % (wavelength / float(size))
+        except ValueError:
+            multiple = ''
+        lines.append('%s,%.6g,%s,%d' % (size, wavelength, multiple, n))
+    return '\n'.join(lines)
+
+
+"""
+START OF PROGRAM
+"""
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    options = {'--segment': str(SEGMENT), '--fraction': str(FRACTION),
+               '--output': None}
+    for flag in options:
+        if flag in args:
+            k = args.index(flag)
+            options[flag] = args[k + 1]
+            del args[k:k + 2]
+
+    # transects read from several files are pooled, as long as they share
+    # the grid sizes and the longitudes
+    sets = [readTransects(path) for path in args]
+    pooled = dict(sets[0])
+    pooled['raw'] = np.concatenate([np.atleast_2d(t['raw']) for t in sets])
+    pooled['interp'] = np.concatenate([t['interp'] if np.ndim(t['raw']) == 2
+                                       else t['interp'][None] for t in sets])
+    if 'distance' not in pooled:
+        pooled['latitude'] = np.concatenate([np.atleast_1d(t['latitude'])
+                                             for t in sets])
+
+    spectra = welchSpectra(pooled, int(options['--segment']))
+    wavelengths = effectiveResolution(spectra, float(options['--fraction']))
+    print(resolutionTable(spectra, wavelengths))
+    if options['--output'] is not None:
+        np.savez(options['--output'], effective_wavelength=wavelengths,
+                 **spectra)
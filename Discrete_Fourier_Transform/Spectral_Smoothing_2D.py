@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Author:  Chris Jing
+Email:   zjing@eoas.ubc.ca
+For:     UBC EOAS WFRT
+Purpose: 2D spectral smoothing of the topo_30s terrain. A response function
+         of the horizontal wavelength (a sharp cutoff, a Gaussian or a
+         Butterworth low-pass, or any function of the radial wavenumber) is
+         applied to a mosaic window with 2D real FFTs.
+
+         Large windows are filtered block by block (overlap-save): each
+         block is read together with a margin of its neighbours, filtered,
+         and only its core is kept, so memory stays bounded by the block
+         size whatever the size of the region. Beyond the edges of the
+         window the terrain is mirrored. The grid spacing of each block is
+         taken at its own centre latitude, so the filter has the same
+         physical wavelength everywhere in the region.
+
+         The smoothed field can be sampled (bilinearly) along any transect.
+
+Created on Sun Oct 18 19:00:00 2026
+"""
+
+import math
+import os
+import sys
+import numpy as np
+from scipy import fft
+from scipy.ndimage import map_coordinates
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, '1D_Data_Plot'))
+from Tile_Index import TileIndex, POINTS_PER_DEGREE
+
+EARTH_RADIUS = 6371.0                                       # km
+ROW_SPACING = 2 * math.pi * EARTH_RADIUS / (360 * POINTS_PER_DEGREE)  # km
+
+
+# These functions return response functions of the radial wavenumber k
+# (cycles per km); wavelength (km) is the wavelength of the cutoff
+# A sharp cutoff keeps every wave longer than wavelength and removes the rest
+def sharpCutoff(wavelength):
+    return lambda k: (k * wavelength <= 1.0).astype(np.float64)
+
+# A Gaussian low-pass halves the amplitude of waves of the given wavelength
+def gaussianResponse(wavelength):
+    return lambda k: np.exp(-math.log(2.0) * (k * wavelength)**2)
+
+# A Butterworth low-pass halves the power of waves of the given wavelength
+def butterworthResponse(wavelength, order=4):
+    return lambda k: 1.0 / np.sqrt(1.0 + (k * wavelength)**(2 * order))
+
+
+# This function returns the radial wavenumbers of a real 2D FFT
+# Inputs: shape, the shape (rows, cols) of the transformed block
+#         dy, dx (float), the grid spacing (km) along the rows and columns
+# Output: a 2D array (rows, cols // 2 + 1) of wavenumbers in cycles per km
+def radialWavenumber(shape, dy, dx):
+    ky = fft.fftfreq(shape[0], d=dy)
+    kx = fft.rfftfreq(shape[1], d=dx)
+    return np.hypot(ky[:, None], kx[None, :])
+
+
+# This function applies a response function to a 2D field with one FFT
+# Inputs: field, a 2D array
+#         response, a function of the radial wavenumber (cycles per km)
+#         dy, dx (float), the grid spacing (km) along the rows and columns
+#         workers (int), the number of FFT threads (-1 uses all CPUs)
+# Output: the filtered field (float32 array of the shape of field); the
+#         field is treated as periodic, so pad it first if it is not
+def filterField(field, response, dy, dx, workers=-1):
+    field = np.asarray(field, dtype=np.float32)
+    shape = tuple(fft.next_fast_len(n, real=True) for n in field.shape)
+    spec = fft.rfft2(field, s=shape, workers=workers)
+    spec *= response(radialWavenumber(shape, dy, dx)).astype(np.float32)
+    return fft.irfft2(spec, s=shape, workers=workers)[:field.shape[0],
+                                                      :field.shape[1]]
+
+
+# This function smooths a mosaic window block by block
+# Inputs: window, the MosaicWindow (or any 2D array) to smooth
+#         response, a function of the radial wavenumber (cycles per km)
+#         lats, the latitudes of the rows (default: window.lats)
+#         block (int), the side of the core of each block in points (>= 8)
+#         margin (int), points of neighbouring data read around each block;
+#                       it must exceed the reach of the filter kernel (256
+#                       points, about 240 km, suits Gaussian and Butterworth
+#                       cutoffs up to ~100 km; a sharp cutoff rings further)
+#         out, an optional 2D float array (e.g. a np.memmap) to write into
+#         workers (int), the number of FFT threads (-1 uses all CPUs)
+# Output: the smoothed field (float32 array of the shape of the window)
+def smoothMosaic(window, response, lats=None, block=1024, margin=256,
+                 out=None, workers=-1):
+    # the cross-fade below needs 1 <= blend <= block / 2
+    if block < 8:
+        raise ValueError('block must be at least 8 points, not %d' % block)
+    lats = window.lats if lats is None else np.asarray(lats)
+    n_rows, n_cols = window.shape
+    if out is None:
+        out = np.empty((n_rows, n_cols), dtype=np.float32)
+    # consecutive rows of blocks are filtered with different east-west
+    # spacings, so they overlap by 2 * blend rows and are cross-faded there
+    blend = block // 8
+    done = 0    # rows of out written so far
+    for r0 in range(0, n_rows, block):
+        r1 = min(r0 + block, n_rows)
+        e0, e1 = max(r0 - blend, 0), min(r1 + blend, n_rows)
+        weight = np.ones(e1 - e0, dtype=np.float32)
+        rows = np.arange(e0, e1) + 0.5
+        if r0 > 0:
+            weight = np.minimum(weight, (rows - (r0 - blend)) / (2 * blend))
+        if r1 < n_rows:
+            weight = np.minimum(weight, ((r1 + blend) - rows) / (2 * blend))
+        dx = ROW_SPACING * math.cos(math.radians(lats[(r0 + r1 - 1) // 2]))
+        for c0 in range(0, n_cols, block):
+            c1 = min(c0 + block, n_cols)
+            smooth = _smoothBlock(window, response, e0, e1, c0, c1, margin,
+                                  dx, workers)
+            out[done:e1, c0:c1] = 0.0
+            out[e0:e1, c0:c1] += weight[:, None] * smooth
+        done = e1
+    return out
+
+
+# This function filters one block of a window, reading it with a margin of
+# its neighbours (mirrored where the margin falls outside the window)
+def _smoothBlock(window, response, r0, r1, c0, c1, margin, dx, workers):
+    n_rows, n_cols = window.shape
+    pr0, pr1 = max(r0 - margin, 0), min(r1 + margin, n_rows)
+    pc0, pc1 = max(c0 - margin, 0), min(c1 + margin, n_cols)
+    data = np.asarray(window[pr0:pr1, pc0:pc1], dtype=np.float32)
+    pad = ((margin - (r0 - pr0), margin - (pr1 - r1)),
+           (margin - (c0 - pc0), margin - (pc1 - c1)))
+    smooth = filterField(_mirrorPad(data, pad), response, ROW_SPACING, dx,
+                         workers)
+    return smooth[margin:margin + r1 - r0, margin:margin + c1 - c0]
+
+
+# This function pads a block by mirroring it at its edges, repeating the
+# mirror image when the padding is wider than the block
+def _mirrorPad(data, pad):
+    while any(p > n - 1 for (a, b), n in zip(pad, data.shape)
+              for p in (a, b)):
+        step = tuple((min(a, n - 1), min(b, n - 1))
+                     for (a, b), n in zip(pad, data.shape))
+        data = np.pad(data, step, mode='reflect')
+        pad = tuple((a - sa, b - sb) for (a, b), (sa, sb) in zip(pad, step))
+    return np.pad(data, pad, mode='reflect')
+
+
+# This function samples a field on the topo_30s grid at arbitrary points
+# with bilinear interpolation
+# Inputs: field, a 2D array on the rows and columns of window
+#         window, the MosaicWindow the field was computed on
+#         lats, lons, arrays of the latitudes and longitudes of the points
+# Output: the field values at the points (NaN outside the window)
+def sampleField(field, window, lats, lons):
+    rows = (np.asarray(lats) - window.lats[0]) * POINTS_PER_DEGREE
+    cols = (np.asarray(lons) - window.lons[0]) * POINTS_PER_DEGREE
+    return map_coordinates(field, [rows, cols], order=1, mode='constant',
+                           cval=np.nan)
+
+
+# This function samples a field along a constant-latitude transect
+# Inputs: field, window, as for sampleField
+#         latitude (float), the latitude of the transect
+#         lon_start, lon_end (float), the longitudes it starts and ends at
+#         n (int), the number of points (default: one per topo_30s column)
+# Outputs: lons, the longitudes of the points
+#          heights, the field values at the points
+def sampleTransect(field, window, latitude, lon_start, lon_end, n=None):
+    if n is None:
+        n = int(round(abs(lon_end - lon_start) * POINTS_PER_DEGREE)) + 1
+    lons = np.linspace(lon_start, lon_end, n)
+    return lons, sampleField(field, window, np.full(n, latitude), lons)
+
+
+"""
+START OF PROGRAM
+"""
+
+if __name__ == '__main__':
+    import time
+    import matplotlib.pyplot as plt
+
+    tile_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                            'data', 'topo_30s_binary_files')
+    region = (48.0, 60.0, -130.0, -114.0)     # lat_min, lat_max, lon_min, lon_max
+    cutoff = 20.0                             # wavelength of the cutoff (km)
+    response = gaussianResponse(cutoff)
+    latitude = 50.12                          # transect to plot
+    output = 'Smoothed_Terrain.npz'
+
+    window = TileIndex(tile_dir).window(*region, fill_value=0)
+    start = time.perf_counter()
+    smoothed = smoothMosaic(window, response)
+    print('Smoothed %d x %d points in %.1f s' % (window.shape + (time.perf_counter() - start,)))
+    np.savez(output, smoothed=smoothed, lats=window.lats, lons=window.lons)
+
+    lons, raw = sampleTransect(window.read(), window, latitude, region[2], region[3])
+    lons, smooth = sampleTransect(smoothed, window, latitude, region[2], region[3])
+
+    fig_size = plt.rcParams["figure.figsize"]
+    fig_size[0] = 12
+    fig_size[1] = 4
+    plt.rcParams["figure.figsize"] = fig_size
+
+    plt.plot(lons, raw, 'b')
+    plt.plot(lons, smooth, 'r')
+    plt.xlabel('Longitude ($^\\circ$)')
+    plt.ylabel('Terrain Elevation (m)')
+    plt.title('British Columbia %.2f$^\\circ$N Terrain Elevation, %g km smoothing' % (latitude, cutoff))
+    plt.grid()
+    plt.savefig('BC Terrain Elevation 2D Smoothed.pdf')